@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""
+Benchmarks of the pytest-tmux hot paths
+
+Each benchmark is run `--repeat` times (after one warm-up run) on a
+dedicated tmux server and the timings are written to a JSON file, so two
+runs (ex: before and after a change) can be compared with `--compare`.
+
+The `client_*` benchmarks time the TmuxClient methods inside a pytest run
+using the tmux fixture, the `libtmux_*` ones time the same tmux commands
+sent with libtmux.Server.cmd() as a baseline.
+
+Example:
+    python benchmarks/bench.py -o after.json --compare before.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import textwrap
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+import libtmux
+
+from pytest_tmux.cells import TmuxCells
+from pytest_tmux.output import TmuxOutput
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Dict, List, Optional
+
+    Benchmark = Callable[["BenchServer"], Dict[str, float]]
+
+SHELL = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+PANE_SIZES = ((80, 24), (200, 50), (400, 100))
+DELAYS = (0.01, 0.1, 0.5)
+SEND_KEYS = 100
+
+CLIENT_TESTS = """
+import json
+import os
+from time import perf_counter
+
+SEND_KEYS = {send_keys}
+
+
+def _record(**metrics):
+    with open(os.environ["PYTEST_TMUX_BENCH_OUTPUT"], "w") as f:
+        json.dump(metrics, f)
+
+
+def _fill(tmux, tmp_path, x, y):
+    path = tmp_path / "fill.txt"
+    path.write_text(("x" * (x - 1) + "\\n") * (y - 1))
+    tmux.config.session.x = x
+    tmux.config.session.y = y
+    tmux.config.session.window_command = f"sh -c 'cat {{path}}; exec cat'"
+    expected = "\\n".join(["x" * (x - 1)] * (y - 1))
+    assert tmux.screen(timeout=10, delay=0.01) == expected
+    return expected
+
+
+def test_send_keys(tmux):
+    tmux.config.session.window_command = "cat > /dev/null"
+    tmux.session
+    start = perf_counter()
+    for i in range(SEND_KEYS):
+        tmux.send_keys(f"line {{i}}")
+    elapsed = perf_counter() - start
+    _record(time=elapsed, keys_per_second=SEND_KEYS / elapsed)
+
+
+def test_batch(tmux):
+    tmux.config.session.window_command = "cat > /dev/null"
+    tmux.session
+    start = perf_counter()
+    with tmux.batch():
+        for i in range(SEND_KEYS):
+            tmux.send_keys(f"line {{i}}")
+    elapsed = perf_counter() - start
+    _record(time=elapsed, keys_per_second=SEND_KEYS / elapsed)
+
+
+def test_screen(tmux, tmp_path):
+    expected = _fill(tmux, tmp_path, {x}, {y})
+    start = perf_counter()
+    assert tmux.screen() == expected
+    _record(time=perf_counter() - start)
+
+
+def test_row(tmux, tmp_path):
+    expected = _fill(tmux, tmp_path, {x}, {y})
+    start = perf_counter()
+    assert tmux.row({y} // 2) == expected.split("\\n")[0]
+    _record(time=perf_counter() - start)
+"""
+CLIENT_PANE_SIZE = (200, 50)
+
+
+class BenchServer:
+    """
+    A tmux server on its own socket, killed on exit
+
+    Args:
+        tmpdir: directory of the socket
+    """
+
+    def __init__(self, tmpdir: str) -> None:
+        self.socket_path = os.path.join(tmpdir, "bench.sock")
+        self.server = libtmux.Server(socket_path=self.socket_path)
+        self.tmpdir = tmpdir
+
+    def __enter__(self) -> BenchServer:
+        self.server.cmd("start-server", ";", "set-option", "-g", "exit-empty", "off")
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        if self.server.is_alive():
+            self.server.kill_server()
+
+    def session(
+        self, x: int = 80, y: int = 24, command: str = SHELL
+    ) -> libtmux.Session:
+        return self.server.new_session(x=x, y=y, window_command=command)
+
+    def pane_id(self, session: libtmux.Session) -> str:
+        pane = session.attached_pane
+        assert pane is not None
+        return str(pane.pane_id)
+
+    def kill(self, session: libtmux.Session) -> None:
+        self.server.cmd("kill-session", "-t", str(session.session_id))
+
+
+def bench_server_start(bench: BenchServer) -> Dict[str, float]:
+    """
+    Start a new server with its first session, then kill it
+    """
+    server = libtmux.Server(socket_path=os.path.join(bench.tmpdir, "start.sock"))
+    start = perf_counter()
+    server.new_session(window_command="cat")
+    elapsed = perf_counter() - start
+    server.kill_server()
+    return {"time": elapsed}
+
+
+def bench_new_session(bench: BenchServer) -> Dict[str, float]:
+    """
+    Create a session on a running server
+    """
+    start = perf_counter()
+    session = bench.session(command="cat")
+    elapsed = perf_counter() - start
+    bench.kill(session)
+    return {"time": elapsed}
+
+
+def bench_kill_session(bench: BenchServer) -> Dict[str, float]:
+    """
+    Kill a session on a running server
+    """
+    session = bench.session(command="cat")
+    start = perf_counter()
+    bench.kill(session)
+    return {"time": perf_counter() - start}
+
+
+def _bench_capture_pane(x: int, y: int) -> Benchmark:
+    def _bench(bench: BenchServer) -> Dict[str, float]:
+        path = os.path.join(bench.tmpdir, f"fill_{x}x{y}.txt")
+        if not os.path.exists(path):
+            with open(path, "w") as f:
+                f.write(f"{'x' * (x - 1)}\n" * y)
+        session = bench.session(x=x, y=y, command=f"sh -c 'cat {path}; exec cat'")
+        pane_id = bench.pane_id(session)
+        lines = []  # type: List[str]
+        while len(lines) < y - 1:
+            lines = bench.server.cmd("capture-pane", "-p", "-t", pane_id).stdout
+        start = perf_counter()
+        bench.server.cmd("capture-pane", "-p", "-t", pane_id)
+        elapsed = perf_counter() - start
+        bench.kill(session)
+        return {"time": elapsed}
+
+    _bench.__doc__ = f"Capture a full {x}x{y} pane with libtmux (baseline)"
+    return _bench
+
+
+def bench_cells(bench: BenchServer) -> Dict[str, float]:
+    """
+    Capture a 500x200 pane with a style change every 10 cells and parse it
+    into a cells grid
+    """
+    x, y = 500, 200
+    path = os.path.join(bench.tmpdir, f"cells_{x}x{y}.txt")
+    if not os.path.exists(path):
+        styles = ("1;31", "7", "38;5;100", "48;2;10;20;30", "0")
+        with open(path, "w") as f:
+            for row in range(y - 1):
+                f.write(
+                    "".join(
+                        f"\x1b[{styles[(row + i) % len(styles)]}m{'x' * 10}"
+                        for i in range((x - 1) // 10)
+                    )
+                    + "\x1b[0m\n"
+                )
+
+    session = bench.session(x=x, y=y, command=f"sh -c 'cat {path}; exec cat'")
+    pane_id = bench.pane_id(session)
+    lines = []  # type: List[str]
+    while len(lines) < y - 1:
+        lines = bench.server.cmd("capture-pane", "-p", "-t", pane_id).stdout
+    start = perf_counter()
+    lines = bench.server.cmd("capture-pane", "-p", "-e", "-t", pane_id).stdout
+    captured = perf_counter()
+    TmuxCells(lines, x, y)
+    end = perf_counter()
+    bench.kill(session)
+    return {"time": end - start, "parse": end - captured}
+
+
+def bench_send_keys(bench: BenchServer) -> Dict[str, float]:
+    """
+    Send short inputs one by one to a pane running cat with libtmux
+    (baseline)
+    """
+    session = bench.session(command="cat > /dev/null")
+    pane_id = bench.pane_id(session)
+    start = perf_counter()
+    for i in range(SEND_KEYS):
+        bench.server.cmd("send-keys", "-t", pane_id, f"line {i}", "Enter")
+    elapsed = perf_counter() - start
+    bench.kill(session)
+    return {"time": elapsed, "keys_per_second": SEND_KEYS / elapsed}
+
+
+def _bench_time_to_match(delay: float, policy: str) -> Benchmark:
+    def _bench(bench: BenchServer) -> Dict[str, float]:
+        session = bench.session()
+        pane_id = bench.pane_id(session)
+
+        def _capture() -> str:
+            return "\n".join(
+                bench.server.cmd("capture-pane", "-p", "-t", pane_id).stdout
+            )
+
+        assert TmuxOutput(_capture, timeout=5, delay=0.01) == "$"
+        start = perf_counter()
+        bench.server.cmd("send-keys", "-t", pane_id, "sleep 0.05; echo ready", "Enter")
+        output = TmuxOutput(_capture, timeout=5, delay=delay, policy=policy)
+        assert "\nready" in output
+        elapsed = perf_counter() - start
+        bench.kill(session)
+        return {"time": elapsed}
+
+    _bench.__doc__ = (
+        f"Time between a command output (after 50ms) and a matching TmuxOutput "
+        f"(delay={delay}, policy={policy})"
+    )
+    return _bench
+
+
+def _bench_client(test: str, description: str) -> Benchmark:
+    def _bench(bench: BenchServer) -> Dict[str, float]:
+        path = os.path.join(bench.tmpdir, "test_client.py")
+        if not os.path.exists(path):
+            x, y = CLIENT_PANE_SIZE
+            with open(path, "w") as f:
+                f.write(CLIENT_TESTS.format(send_keys=SEND_KEYS, x=x, y=y))
+        output = os.path.join(bench.tmpdir, f"client_{test}.json")
+        subprocess.run(
+            [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider"]
+            + [f"{path}::test_{test}"],
+            cwd=bench.tmpdir,
+            env={**os.environ, "PYTEST_TMUX_BENCH_OUTPUT": output},
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        with open(output) as f:
+            return json.load(f)
+
+    _bench.__doc__ = description
+    return _bench
+
+
+def bench_fixture(bench: BenchServer) -> Dict[str, float]:
+    """
+    Run a pytest session with one test using the tmux fixture
+    """
+    path = os.path.join(bench.tmpdir, "test_fixture.py")
+    if not os.path.exists(path):
+        with open(path, "w") as f:
+            f.write(
+                textwrap.dedent(
+                    """
+                    def test_fixture(tmux):
+                        assert tmux.screen() != "nothing"
+                    """
+                )
+            )
+    start = perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", path],
+        cwd=bench.tmpdir,
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+    return {"time": perf_counter() - start}
+
+
+def bench_plugin_import(bench: BenchServer) -> Dict[str, float]:
+    """
+    Import the plugin module in a new interpreter where pytest is already
+    imported (as in a pytest run), time reported by python -X importtime
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import pytest, pytest_tmux.plugin"],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == "pytest_tmux.plugin":
+            return {"time": int(parts[1]) / 1e6}
+    raise RuntimeError("pytest_tmux.plugin import time not found")
+
+
+def bench_collect_only(bench: BenchServer) -> Dict[str, float]:
+    """
+    Run pytest --collect-only on tests who do not use tmux
+    """
+    path = os.path.join(bench.tmpdir, "test_collect_only.py")
+    if not os.path.exists(path):
+        with open(path, "w") as f:
+            f.write("".join(f"def test_{i}():\n    pass\n\n" for i in range(100)))
+    start = perf_counter()
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "pytest",
+            "-q",
+            "-p",
+            "no:cacheprovider",
+            "--collect-only",
+            path,
+        ],
+        cwd=bench.tmpdir,
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+    return {"time": perf_counter() - start}
+
+
+BENCHMARKS = {
+    "server_start": bench_server_start,
+    "new_session": bench_new_session,
+    "kill_session": bench_kill_session,
+    **{
+        f"libtmux_capture_pane_{x}x{y}": _bench_capture_pane(x, y)
+        for x, y in PANE_SIZES
+    },
+    "cells_500x200": bench_cells,
+    "libtmux_send_keys": bench_send_keys,
+    "client_send_keys": _bench_client(
+        "send_keys", "Send short inputs one by one with TmuxClient.send_keys"
+    ),
+    "client_batch": _bench_client("batch", "Send short inputs in one TmuxClient.batch"),
+    "client_screen_200x50": _bench_client(
+        "screen", "Capture and compare a full 200x50 pane with TmuxClient.screen"
+    ),
+    "client_row_200x50": _bench_client(
+        "row", "Capture and compare one row of a 200x50 pane with TmuxClient.row"
+    ),
+    **{
+        f"time_to_match_{policy}_{delay}": _bench_time_to_match(delay, policy)
+        for policy in ("fixed", "adaptive")
+        for delay in DELAYS
+    },
+    "fixture": bench_fixture,
+    "plugin_import": bench_plugin_import,
+    "collect_only": bench_collect_only,
+}  # type: Dict[str, Benchmark]
+
+
+def run(names: List[str], repeat: int) -> Dict[str, Any]:
+    """
+    Args:
+        names: the benchmarks to run
+        repeat: number of measured runs of each benchmark
+
+    Returns:
+        the results, with the environment and the summary of each
+        benchmark metric (min, median, mean, max, stdev)
+    """
+    results = {}  # type: Dict[str, Any]
+    with tempfile.TemporaryDirectory(prefix="pytest_tmux_bench_") as tmpdir:
+        with BenchServer(tmpdir) as bench:
+            for name in names:
+                BENCHMARKS[name](bench)
+                runs = [BENCHMARKS[name](bench) for _ in range(repeat)]
+                results[name] = {
+                    "description": (BENCHMARKS[name].__doc__ or "").strip(),
+                    "runs": repeat,
+                    **{
+                        metric: _summarize([r[metric] for r in runs])
+                        for metric in runs[0]
+                    },
+                }
+                print(f"{name:<32} {results[name]['time']['median'] * 1000:>10.3f}ms")
+    return {"environment": _environment(), "benchmarks": results}
+
+
+def _summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "min": min(values),
+        "median": statistics.median(values),
+        "mean": statistics.mean(values),
+        "max": max(values),
+        "stdev": statistics.stdev(values) if len(values) > 1 else 0.0,
+    }
+
+
+def _environment() -> Dict[str, str]:
+    tmux = subprocess.run(
+        ["tmux", "-V"], stdout=subprocess.PIPE, universal_newlines=True
+    ).stdout.strip()
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "tmux": tmux,
+        "libtmux": str(libtmux.__version__),
+    }
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> bool:
+    """
+    Print the median time of each benchmark against the baseline
+
+    Args:
+        results: the results of this run
+        baseline: the results of a previous run
+        threshold: maximum ratio between this run and the baseline
+
+    Returns:
+        False if a benchmark is slower than `threshold` times the baseline
+    """
+    ok = True
+    for name, result in results["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if before is None:
+            continue
+        ratio = result["time"]["median"] / before["time"]["median"]
+        status = "REGRESSION" if ratio > threshold else "ok"
+        ok = ok and ratio <= threshold
+        print(f"{name:<32} {ratio:>6.2f}x {status}")
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "-o", "--output", default="bench.json", help="JSON results file"
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=10, help="measured runs of each benchmark"
+    )
+    parser.add_argument(
+        "-b",
+        "--benchmark",
+        action="append",
+        choices=list(BENCHMARKS),
+        help="benchmark to run (can be repeated, default to every benchmark)",
+    )
+    parser.add_argument("--compare", metavar="JSON", help="baseline results file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="maximum ratio of a median time against the baseline",
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.benchmark or list(BENCHMARKS), args.repeat)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,353 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import shutil
+from time import monotonic
+from typing import TYPE_CHECKING
+
+from libtmux.exc import LibTmuxException
+from libtmux.pane import Pane as TmuxPane
+
+from pytest_tmux.control import server_args
+from pytest_tmux.output import compile_pattern, retry
+
+if TYPE_CHECKING:
+    from typing import Any, Awaitable, Callable, List, Match, Optional, Pattern, Union
+
+    import libtmux
+
+    from pytest_tmux.client import TmuxClient
+    from pytest_tmux.config import TmuxConfig, TmuxConfigAssert
+
+
+async def tmux_cmd(server: libtmux.server.Server, *args: str) -> List[str]:
+    """
+    Run a tmux command in an asyncio subprocess, like
+    libtmux.server.Server.cmd()
+
+    Args:
+        server: a libtmux.server.Server object
+        args: the command and its arguments
+
+    Returns:
+        the output of the command, without the trailing empty lines
+
+    Raises:
+        LibTmuxException: if tmux is not found or if the command failed
+    """
+    tmux_bin = shutil.which("tmux")
+    if tmux_bin is None:
+        raise LibTmuxException("tmux not found")
+    env = os.environ.copy()
+    env.pop("TMUX", None)
+    process = await asyncio.create_subprocess_exec(
+        tmux_bin,
+        *server_args(server),
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env=env,
+    )
+    stdout, stderr = await process.communicate()
+    if stderr:
+        raise LibTmuxException(stderr.decode("utf-8", "replace").splitlines())
+    lines = stdout.decode("utf-8", "replace").split("\n")
+    while lines and lines[-1] == "":
+        lines.pop()
+    return lines
+
+
+class AsyncTmuxOutput(object):
+    """
+    Awaitable counterpart of [TmuxOutput][pytest_tmux.output.TmuxOutput]
+
+    Operators can not be awaited, each of them is replaced by a coroutine
+    method who retries with asyncio.sleep() between two captures, so several
+    outputs could be awaited concurrently (ex: with asyncio.gather()).
+
+    Args:
+        func: coroutine function used to capture the value
+        timeout: how long to wait for the assertion to fail
+        delay: how long before retrying the assertion
+        policy: how delays between two retries are computed
+            (see [retry][pytest_tmux.output.retry])
+    """
+
+    def __init__(
+        self,
+        func: Callable[[], Awaitable[str]],
+        timeout: Union[int, float],
+        delay: Union[int, float],
+        policy: str = "fixed",
+    ) -> None:
+        self.func = func
+        self.value = None  # type: Optional[str]
+        self.__timeout = timeout
+        self.__delay = delay
+        self.__policy = policy
+
+    def __str__(self) -> str:
+        return str(self.value)
+
+    def __repr__(self) -> str:
+        return str(self.value)
+
+    async def satisfies(self, predicate: Callable[[str], Any]) -> Any:
+        """
+        Retry until `predicate` returns a true value for the output
+
+        Args:
+            predicate: a function called with the captured value
+
+        Returns:
+            the last value returned by the predicate
+        """
+        delays = retry(
+            timeout=self.__timeout, delay=self.__delay, policy=self.__policy
+        ).delays()
+        deadline = monotonic() + self.__timeout
+        while True:
+            self.value = await self.func()
+            result = predicate(self.value)
+            remaining = deadline - monotonic()
+            if result or remaining <= 0:
+                return result
+            await asyncio.sleep(min(next(delays), remaining))
+
+    async def equals(self, other: object) -> bool:
+        """
+        Awaitable `==`, a compiled regular expression is matched with
+        fullmatch()
+        """
+        if isinstance(other, re.Pattern):
+            return bool(await self.satisfies(other.fullmatch))
+        return bool(await self.satisfies(lambda value: value == other))
+
+    async def not_equals(self, other: object) -> bool:
+        """
+        Awaitable `!=`, a compiled regular expression is matched with
+        fullmatch()
+        """
+        if isinstance(other, re.Pattern):
+            pattern = other
+            return bool(
+                await self.satisfies(lambda value: pattern.fullmatch(value) is None)
+            )
+        return bool(await self.satisfies(lambda value: value != other))
+
+    async def contains(self, other: Union[str, Pattern[str]]) -> bool:
+        """
+        Awaitable `in`, a compiled regular expression is searched
+        """
+        if isinstance(other, re.Pattern):
+            return bool(await self.satisfies(other.search))
+        substring = other
+        return bool(await self.satisfies(lambda value: substring in value))
+
+    async def matches(
+        self, pattern: Union[str, Pattern[str]], flags: int = 0
+    ) -> Optional[Match[str]]:
+        """
+        Awaitable [matches][pytest_tmux.output.TmuxOutput.matches]
+        """
+        if isinstance(pattern, str):
+            pattern = compile_pattern(pattern, flags)
+        result = await self.satisfies(pattern.match)  # type: Optional[Match[str]]
+        return result
+
+    async def search(
+        self, pattern: Union[str, Pattern[str]], flags: int = 0
+    ) -> Optional[Match[str]]:
+        """
+        Awaitable [search][pytest_tmux.output.TmuxOutput.search]
+        """
+        if isinstance(pattern, str):
+            pattern = compile_pattern(pattern, flags)
+        result = await self.satisfies(pattern.search)  # type: Optional[Match[str]]
+        return result
+
+
+class AsyncTmuxClient:
+    """
+    asyncio variant of [TmuxClient][pytest_tmux.client.TmuxClient]
+
+    The session is still created by the wrapped
+    [TmuxClient][pytest_tmux.client.TmuxClient] (on first need), then every
+    command of the hot path (send keys, captures) is run in an asyncio
+    subprocess and waits are done with asyncio.sleep(), so one test can
+    drive and wait on many panes concurrently.
+
+    Args:
+        tmux: the [TmuxClient][pytest_tmux.client.TmuxClient] used for the
+            config, the server and the session
+        pane: the pane driven by this client, default to the pane of `tmux`
+    """
+
+    def __init__(
+        self, tmux: TmuxClient, pane: Optional[libtmux.pane.Pane] = None
+    ) -> None:
+        self.tmux = tmux
+        self._pane = pane
+
+    @property
+    def config(self) -> TmuxConfig:
+        """
+        The config of the wrapped [TmuxClient][pytest_tmux.client.TmuxClient]
+        """
+        return self.tmux.config
+
+    @property
+    def pane(self) -> libtmux.pane.Pane:
+        """
+        The pane driven by this client
+        """
+        if self._pane is None:
+            assert isinstance(self.tmux.pane, TmuxPane)
+            self._pane = self.tmux.pane
+        return self._pane
+
+    def for_pane(self, pane: libtmux.pane.Pane) -> AsyncTmuxClient:
+        """
+        Args:
+            pane: another pane of the server (ex: from
+                libtmux.window.Window.split_window())
+
+        Returns:
+            an [AsyncTmuxClient][pytest_tmux.async_client.AsyncTmuxClient]
+            driving `pane`
+        """
+        return AsyncTmuxClient(self.tmux, pane)
+
+    async def cmd(self, *args: str) -> List[str]:
+        """
+        Run a tmux command on the server in an asyncio subprocess
+
+        Returns:
+            the output of the command
+        """
+        return await tmux_cmd(self.tmux.server, *args)
+
+    async def send_keys(
+        self,
+        cmd: Union[str, List[str]],
+        enter: bool = True,
+        suppress_history: bool = False,
+        literal: bool = False,
+    ) -> None:
+        """
+        Awaitable [send_keys][pytest_tmux.client.TmuxClient.send_keys]
+        """
+        keys = [cmd] if isinstance(cmd, str) else list(cmd)
+        self.tmux.debug(
+            """
+                    Send "{}" to tmux session
+                    """.format(
+                cmd
+            )
+        )
+        pane_id = str(self.pane.pane_id)
+        if suppress_history and keys:
+            keys = [" " + keys[0], *keys[1:]]
+        args = []  # type: List[str]
+        if keys:
+            args += ["send-keys", "-t", pane_id, *(["-l"] if literal else []), *keys]
+        if enter:
+            args += [";"] if args else []
+            args += ["send-keys", "-t", pane_id, "Enter"]
+        if args:
+            await self.cmd(*args)
+
+    def _output(
+        self,
+        capture: Callable[[], Awaitable[str]],
+        timeout: Optional[Union[int, float]] = None,
+        delay: Optional[Union[int, float]] = None,
+        policy: Optional[str] = None,
+    ) -> AsyncTmuxOutput:
+        if TYPE_CHECKING:
+            assert isinstance(self.config.assertion, TmuxConfigAssert)
+        if timeout is None:
+            timeout = self.config.assertion.timeout
+        if delay is None:
+            delay = self.config.assertion.delay
+        if policy is None:
+            policy = self.config.assertion.policy
+        return AsyncTmuxOutput(capture, timeout=timeout, delay=delay, policy=policy)
+
+    def screen(
+        self,
+        timeout: Optional[Union[int, float]] = None,
+        delay: Optional[Union[int, float]] = None,
+        policy: Optional[str] = None,
+    ) -> AsyncTmuxOutput:
+        """
+        Get screen content from pane with awaitable retry methods
+
+        Args:
+            timeout: how long to wait for the assertion to failed
+            delay: how long before retrying the assertion
+            policy: how delays between two retries are computed
+                (see [retry][pytest_tmux.output.retry])
+
+        Returns:
+            a [AsyncTmuxOutput][pytest_tmux.async_client.AsyncTmuxOutput] instance
+        """
+
+        async def _capture() -> str:
+            lines = await self.cmd("capture-pane", "-p", "-t", str(self.pane.pane_id))
+            return "\n".join(lines)
+
+        return self._output(_capture, timeout=timeout, delay=delay, policy=policy)
+
+    def row(
+        self,
+        row: int,
+        timeout: Optional[Union[int, float]] = None,
+        delay: Optional[Union[int, float]] = None,
+        policy: Optional[str] = None,
+    ) -> AsyncTmuxOutput:
+        """
+        Get row content from pane with awaitable retry methods
+
+        Args:
+            row: which row of the pane to capture (negative rows are counted
+                from the last non empty row)
+            timeout: how long to wait for the assertion to failed
+            delay: how long before retrying the assertion
+            policy: how delays between two retries are computed
+                (see [retry][pytest_tmux.output.retry])
+
+        Returns:
+            a [AsyncTmuxOutput][pytest_tmux.async_client.AsyncTmuxOutput] instance
+        """
+        if not isinstance(row, int):
+            raise TypeError("row should be an integer")
+
+        async def _capture() -> str:
+            pane_id = str(self.pane.pane_id)
+            if row < 0:
+                lines = await self.cmd("capture-pane", "-p", "-t", pane_id)
+                return lines[row] if -row <= len(lines) else ""
+            lines = await self.cmd(
+                "display-message",
+                "-p",
+                "-t",
+                pane_id,
+                "#{pane_height}",
+                ";",
+                "capture-pane",
+                "-p",
+                "-t",
+                pane_id,
+                "-S",
+                str(row),
+                "-E",
+                str(row),
+            )
+            if not lines or int(lines[0]) <= row or len(lines) < 2:
+                return ""
+            return lines[1]
+
+        return self._output(_capture, timeout=timeout, delay=delay, policy=policy)
@@ -0,0 +1,382 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from array import array
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Iterator, List, Sequence, Tuple, Union
+
+    TmuxCellsKey = Union[int, slice, Tuple[Union[int, slice], Union[int, slice]]]
+
+DEFAULT = -1
+RGB = 1 << 24
+
+BOLD = 1 << 0
+DIM = 1 << 1
+ITALIC = 1 << 2
+UNDERLINE = 1 << 3
+BLINK = 1 << 4
+REVERSE = 1 << 5
+HIDDEN = 1 << 6
+STRIKETHROUGH = 1 << 7
+OVERLINE = 1 << 8
+
+# a wide character takes two cells, the second one holds this placeholder
+WIDE = "\x00"
+
+_SET = {
+    1: BOLD,
+    2: DIM,
+    3: ITALIC,
+    4: UNDERLINE,
+    5: BLINK,
+    7: REVERSE,
+    8: HIDDEN,
+    9: STRIKETHROUGH,
+    21: UNDERLINE,
+    53: OVERLINE,
+}
+_CLEAR = {
+    22: BOLD | DIM,
+    23: ITALIC,
+    24: UNDERLINE,
+    25: BLINK,
+    27: REVERSE,
+    28: HIDDEN,
+    29: STRIKETHROUGH,
+    55: OVERLINE,
+}
+
+# SGR sequences are captured, any other escape sequence is skipped
+_SEQUENCE = re.compile(
+    r"\x1b\[([0-9;:]*)m"
+    r"|\x1b(?:\[[0-9;:?<=>]*[ -/]*[@-~]|\][^\x07\x1b]*(?:\x07|\x1b\\)|[^\[\]])"
+)
+
+
+def rgb(r: int, g: int, b: int) -> int:
+    """
+    Args:
+        r: red component (0-255)
+        g: green component (0-255)
+        b: blue component (0-255)
+
+    Returns:
+        the packed value of a true color, as stored in
+        [fg][pytest_tmux.cells.TmuxCellsRegion.fg] and
+        [bg][pytest_tmux.cells.TmuxCellsRegion.bg]
+    """
+    return RGB | (r << 16) | (g << 8) | b
+
+
+def _color(params: List[str]) -> int:
+    """
+    Args:
+        params: the parameters of an extended color after 38/48
+            (`5;n` or `2;r;g;b`, with an optional color space for `2:`)
+
+    Returns:
+        the packed color, DEFAULT if it can not be parsed
+    """
+    try:
+        if params[0] == "5":
+            return int(params[1])
+        if params[0] == "2":
+            r, g, b = (int(value or 0) for value in params[-3:])
+            return rgb(r, g, b)
+    except (IndexError, ValueError):
+        pass
+    return DEFAULT
+
+
+@lru_cache(maxsize=4096)
+def sgr(params: str, fg: int, bg: int, attr: int) -> Tuple[int, int, int]:
+    """
+    Apply a Select Graphic Rendition sequence (`ESC [ params m`) to a style.
+
+    Args:
+        params: the parameters of the sequence (ex: `1;38;5;196`)
+        fg: the actual foreground color
+        bg: the actual background color
+        attr: the actual attributes
+
+    Returns:
+        the new (fg, bg, attr) style, cached as a screen usually repeats
+        the same transitions
+    """
+    groups = params.split(";")
+    i = 0
+    while i < len(groups):
+        group = groups[i]
+        i += 1
+        if ":" in group:
+            sub = group.split(":")
+            if sub[0] == "38":
+                fg = _color(sub[1:])
+            elif sub[0] == "48":
+                bg = _color(sub[1:])
+            elif sub[0] == "4":
+                attr = attr & ~UNDERLINE if sub[1] in ("", "0") else attr | UNDERLINE
+            continue
+        code = int(group) if group else 0
+        if code == 0:
+            fg, bg, attr = DEFAULT, DEFAULT, 0
+        elif code in _SET:
+            attr |= _SET[code]
+        elif code in _CLEAR:
+            attr &= ~_CLEAR[code]
+        elif 30 <= code <= 37:
+            fg = code - 30
+        elif 40 <= code <= 47:
+            bg = code - 40
+        elif 90 <= code <= 97:
+            fg = code - 82
+        elif 100 <= code <= 107:
+            bg = code - 92
+        elif code == 39:
+            fg = DEFAULT
+        elif code == 49:
+            bg = DEFAULT
+        elif code in (38, 48, 58):
+            if i < len(groups) and groups[i] in ("5", "2"):
+                stop = i + (2 if groups[i] == "5" else 4)
+                color, i = _color(groups[i:stop]), stop
+            else:
+                continue
+            if code == 38:
+                fg = color
+            elif code == 48:
+                bg = color
+    return fg, bg, attr
+
+
+@lru_cache(maxsize=4096)
+def _fill(value: int, n: int) -> array[int]:
+    """
+    Returns:
+        an array of `n` times `value`, cached to fill the runs of cells who
+        share a style
+    """
+    return array("l", [value]) * n
+
+
+def _cells(text: str) -> str:
+    """
+    Args:
+        text: printable characters
+
+    Returns:
+        the characters with one code point per cell: wide characters are
+        followed by a [WIDE][pytest_tmux.cells.WIDE] placeholder and
+        combining characters are merged with the previous one when
+        possible (or dropped)
+    """
+    text = unicodedata.normalize("NFC", text)
+    cells = []  # type: List[str]
+    for char in text:
+        if unicodedata.combining(char) or char in "\u200b\u200c\u200d\ufe0f":
+            continue
+        cells.append(char)
+        if unicodedata.east_asian_width(char) in ("W", "F"):
+            cells.append(WIDE)
+    return "".join(cells)
+
+
+class TmuxCells:
+    """
+    Screen of a pane with the style of each cell, parsed from the output of
+    `capture-pane -e` (see [cells][pytest_tmux.client.TmuxClient.cells]).
+
+    The characters are stored as one string per row, the styles in three
+    flat arrays of `width * height` ints (row major):
+
+      - `fg` / `bg`: [DEFAULT][pytest_tmux.cells.DEFAULT], a palette index
+        (0-255) or a true color (see [rgb][pytest_tmux.cells.rgb])
+      - `attr`: a bit mask of [BOLD][pytest_tmux.cells.BOLD],
+        [DIM][pytest_tmux.cells.DIM], [ITALIC][pytest_tmux.cells.ITALIC],
+        [UNDERLINE][pytest_tmux.cells.UNDERLINE],
+        [BLINK][pytest_tmux.cells.BLINK],
+        [REVERSE][pytest_tmux.cells.REVERSE],
+        [HIDDEN][pytest_tmux.cells.HIDDEN],
+        [STRIKETHROUGH][pytest_tmux.cells.STRIKETHROUGH] and
+        [OVERLINE][pytest_tmux.cells.OVERLINE]
+
+    The style of a run of characters between two escape sequences is
+    written with one slice assignment per array (skipped for the default
+    style), so no Python object is created per cell.
+
+    Regions are selected with `cells[row]`, `cells[row, col]` or
+    `cells[rows, cols]` (slices without step), ex:
+    `cells[0, 10:20].fg`.
+
+    Args:
+        lines: the lines printed by `capture-pane -p -e`
+        width: the pane width
+        height: the pane height
+    """
+
+    def __init__(self, lines: Sequence[str], width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.rows = []  # type: List[str]
+        self.fg = array("l", [DEFAULT]) * (width * height)
+        self.bg = array("l", [DEFAULT]) * (width * height)
+        self.attr = array("l", [0]) * (width * height)
+        self._parse(lines)
+
+    def _parse(self, lines: Sequence[str]) -> None:
+        width = self.width
+        fg, bg, attr = DEFAULT, DEFAULT, 0
+        for y, line in enumerate(lines[: self.height]):
+            # split() alternates text and SGR parameters (None for the
+            # other escape sequences)
+            parts = _SEQUENCE.split(line)
+            chars = []  # type: List[str]
+            x = y * width
+            end = x + width
+            for i in range(0, len(parts), 2):
+                text = parts[i]
+                if text:
+                    if not text.isascii():
+                        text = _cells(text)
+                    n = len(text)
+                    if x + n > end:
+                        n = end - x
+                        text = text[:n]
+                    chars.append(text)
+                    stop = x + n
+                    if fg != DEFAULT:
+                        self.fg[x:stop] = _fill(fg, n)
+                    if bg != DEFAULT:
+                        self.bg[x:stop] = _fill(bg, n)
+                    if attr:
+                        self.attr[x:stop] = _fill(attr, n)
+                    x = stop
+                if i + 1 < len(parts) and parts[i + 1] is not None:
+                    fg, bg, attr = sgr(parts[i + 1], fg, bg, attr)
+            self.rows.append("".join(chars).ljust(width))
+        self.rows += [" " * width] * (self.height - len(self.rows))
+
+    def _range(self, key: Union[int, slice], size: int) -> range:
+        if isinstance(key, slice):
+            if key.step not in (None, 1):
+                raise IndexError("cells slices do not support step")
+            return range(*key.indices(size))
+        index = key + size if key < 0 else key
+        if not 0 <= index < size:
+            raise IndexError(f"cells index {key} out of range")
+        return range(index, index + 1)
+
+    def __getitem__(self, key: TmuxCellsKey) -> TmuxCellsRegion:
+        if isinstance(key, tuple):
+            rows, cols = key
+        else:
+            rows, cols = key, slice(None)
+        return TmuxCellsRegion(
+            self, self._range(rows, self.height), self._range(cols, self.width)
+        )
+
+    @property
+    def text(self) -> str:
+        """
+        The screen, without trailing spaces and trailing empty rows like
+        [screen][pytest_tmux.client.TmuxClient.screen]
+        """
+        return self[:, :].text.rstrip("\n")
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __repr__(self) -> str:
+        return f"<TmuxCells {self.width}x{self.height}>"
+
+
+class TmuxCellsRegion:
+    """
+    A rectangle of a [TmuxCells][pytest_tmux.cells.TmuxCells] grid.
+
+    Args:
+        cells: the grid
+        rows: the rows of the region
+        cols: the columns of the region
+    """
+
+    def __init__(self, cells: TmuxCells, rows: range, cols: range) -> None:
+        self.cells = cells
+        self.rows = rows
+        self.cols = cols
+
+    def _values(self, values: array[int]) -> array[int]:
+        width, size = self.cells.width, len(self.cols)
+        region = array("l")
+        for row in self.rows:
+            start = row * width + self.cols.start
+            stop = start + size
+            if len(self.rows) == 1:
+                return values[start:stop]
+            region += values[start:stop]
+        return region
+
+    @property
+    def text(self) -> str:
+        """
+        The characters of the region, one line per row without trailing
+        spaces
+        """
+        start, stop = self.cols.start, self.cols.stop
+        return "\n".join(
+            self.cells.rows[row][start:stop].replace(WIDE, "").rstrip()
+            for row in self.rows
+        )
+
+    @property
+    def fg(self) -> array[int]:
+        """
+        The foreground color of each cell, row by row
+        """
+        return self._values(self.cells.fg)
+
+    @property
+    def bg(self) -> array[int]:
+        """
+        The background color of each cell, row by row
+        """
+        return self._values(self.cells.bg)
+
+    @property
+    def attr(self) -> array[int]:
+        """
+        The attributes of each cell, row by row
+        """
+        return self._values(self.cells.attr)
+
+    def has(self, attr: int) -> bool:
+        """
+        Args:
+            attr: one or several attributes (ex: `BOLD | REVERSE`)
+
+        Returns:
+            True if every cell of the region has the attributes
+        """
+        return all(value & attr == attr for value in self.attr)
+
+    def __iter__(self) -> Iterator[Tuple[str, int, int, int]]:
+        """
+        Yields:
+            the (char, fg, bg, attr) of each cell, row by row
+        """
+        cells = self.cells
+        for row in self.rows:
+            line = cells.rows[row]
+            for col in self.cols:
+                i = row * cells.width + col
+                yield line[col], cells.fg[i], cells.bg[i], cells.attr[i]
+
+    def __len__(self) -> int:
+        return len(self.rows) * len(self.cols)
+
+    def __repr__(self) -> str:
+        return f"<TmuxCellsRegion rows={self.rows} cols={self.cols}>"
@@ -1,17 +1,54 @@
 from __future__ import annotations
 
+import contextlib
+import functools
+import os
+import re
+import shlex
+import sys
+from collections.abc import Mapping
+from contextlib import contextmanager
+from functools import partial
 from inspect import cleandoc
+from itertools import count
+from tempfile import NamedTemporaryFile, mkdtemp
+from time import monotonic, sleep
 from typing import TYPE_CHECKING
+from uuid import uuid4
 
+from libtmux.exc import LibTmuxException
 from libtmux.pane import Pane as TmuxPane
 from libtmux.server import Server as TmuxServer
+from libtmux.window import Window as TmuxWindow
 from pytest import exit as Exit
 
-from pytest_tmux.config import TmuxConfig
-from pytest_tmux.output import TmuxOutput
+from pytest_tmux.cells import TmuxCells
+from pytest_tmux.config import TmuxConfig, cmd_options
+from pytest_tmux.control import TmuxControl, TmuxControlServer
+from pytest_tmux.output import TmuxOutput, retry
+from pytest_tmux.pool import TmuxSessionPool
+from pytest_tmux.snapshot import SNAPSHOTS_DIR, TmuxSnapshot, TmuxSnapshots
+from pytest_tmux.stats import TmuxDurations, TmuxStats
+from pytest_tmux.stream import TmuxStream
+from pytest_tmux.trace import TmuxTrace
 
 if TYPE_CHECKING:
-    from typing import Any, Dict, Optional, Union
+    from typing import (
+        Any,
+        Callable,
+        Dict,
+        Hashable,
+        Iterable,
+        Iterator,
+        List,
+        Optional,
+        Pattern,
+        Sequence,
+        Tuple,
+        Union,
+    )
+
+    TmuxCondition = Union[str, Pattern[str], Callable[[str], Any]]
 
     import libtmux
     import pytest
@@ -23,6 +60,66 @@ if TYPE_CHECKING:
         TmuxConfigSession,
     )
 
+# frames skipped to find the caller of a timed call: pytest-tmux itself and
+# the standard library helpers it goes through (contextmanager, partial)
+_PACKAGE_DIR = os.path.dirname(os.path.realpath(__file__))
+_HELPER_FILES = {
+    os.path.realpath(contextlib.__file__),
+    os.path.realpath(functools.__file__),
+}
+
+
+def check(condition: TmuxCondition, value: str) -> bool:
+    """
+    Check a condition of [wait_for_any][pytest_tmux.client.TmuxClient.wait_for_any]
+    and [wait_for_all][pytest_tmux.client.TmuxClient.wait_for_all]
+
+    Args:
+        condition: a substring, a compiled regular expression (searched) or
+            a function called with the value
+        value: the captured value
+
+    Returns:
+        whether the condition is fulfilled
+    """
+    if isinstance(condition, str):
+        return condition in value
+    if isinstance(condition, re.Pattern):
+        return condition.search(value) is not None
+    return bool(condition(value))
+
+
+def new_server(
+    config: TmuxConfig, trace: Optional[TmuxTrace] = None
+) -> libtmux.server.Server:
+    """
+    Create a libtmux.server.Server object according to the server and plugin
+    config.
+
+    Args:
+        config: a [TmuxConfig][pytest_tmux.config.TmuxConfig] instance
+        trace: a [TmuxTrace][pytest_tmux.trace.TmuxTrace] who records every
+            command sent to the server
+
+    Returns:
+        a libtmux.server.Server object, or a
+        [TmuxControlServer][pytest_tmux.control.TmuxControlServer] when the
+        plugin transport is 'control'
+    """
+    if TYPE_CHECKING:
+        assert isinstance(config.server, TmuxConfigServer)
+        assert isinstance(config.plugin, TmuxConfigPlugin)
+    transport = config.plugin.transport
+    if transport == "subprocess":
+        server = TmuxServer(**config.server)
+    elif transport == "control":
+        server = TmuxControlServer(**config.server)
+    else:
+        raise ValueError(f"Unknown transport '{transport}'")
+    if trace is not None:
+        trace.server(server)
+    return server
+
 
 class TmuxClient:
     """
@@ -43,6 +140,8 @@ class TmuxClient:
         server_cfg_fixture: a server config dictionary
         session_cfg_fixture: a session config dictionary
         assertion_cfg_fixture: a assertion config dictionary
+        pool: a [TmuxSessionPool][pytest_tmux.pool.TmuxSessionPool] used to
+            get the session
     """
 
     def __init__(
@@ -54,6 +153,7 @@ class TmuxClient:
         server_cfg_fixture: Optional[Dict[str, Union[str, int]]] = None,
         session_cfg_fixture: Optional[Dict[str, Union[str, int]]] = None,
         assertion_cfg_fixture: Optional[Dict[str, Union[str, int]]] = None,
+        pool: Optional[TmuxSessionPool] = None,
     ) -> None:
         """State"""
         self._server = server
@@ -61,6 +161,21 @@ class TmuxClient:
         self._window = None  # type: Optional[ libtmux.window.Window ]
         self._pane = None  # type: Optional[ libtmux.pane.Pane ]
         self._debug = None  # type: Optional[ bool ]
+        self._control = None  # type: Optional[ TmuxControl ]
+        self._pool = pool
+        self._batch = None  # type: Optional[ List[List[str]] ]
+        self._buffers = count()
+        self._stream = None  # type: Optional[ TmuxStream ]
+        self._stream_path = None  # type: Optional[ str ]
+        plugin = pytestconfig.pluginmanager.getplugin("tmux")
+        self._stats = getattr(plugin, "stats", None)  # type: Optional[ TmuxStats ]
+        self._durations = getattr(
+            plugin, "durations", None
+        )  # type: Optional[ TmuxDurations ]
+        self._trace = getattr(plugin, "trace", None)  # type: Optional[ TmuxTrace ]
+        self._snapshots = getattr(
+            plugin, "snapshots", None
+        )  # type: Optional[ TmuxSnapshots ]
         self._interrupted = False
         self.sessions = 0
 
@@ -118,6 +233,7 @@ class TmuxClient:
             assert isinstance(self.config, TmuxConfig)
             assert isinstance(self.config.plugin, TmuxConfigPlugin)
         if self.config.plugin.debug:
+            start = monotonic()
             try:
                 if self._debug is None:
                     with self.suspend_capture(self._request):
@@ -166,13 +282,93 @@ class TmuxClient:
             except KeyboardInterrupt:
                 self._interrupted = True
                 Exit("CTRL+C detected.")
+            finally:
+                self._record("debug", monotonic() - start)
+
+    def _record(self, name: str, duration: float, **details: Any) -> None:
+        """
+        Record an operation of the actual test when the stats are enabled
+        (see [TmuxStats][pytest_tmux.stats.TmuxStats]), the assertions
+        when the durations are enabled (see
+        [TmuxDurations][pytest_tmux.stats.TmuxDurations]) and both when the
+        trace is enabled (see [TmuxTrace][pytest_tmux.trace.TmuxTrace])
+
+        Args:
+            name: the operation
+            duration: how long the operation lasted
+            details: details of an assertion given by
+                [retry][pytest_tmux.output.retry]
+        """
+        nodeid = self._request.node.nodeid
+        if self._stats is not None:
+            self._stats.record(nodeid, name, duration)
+        if self._trace is not None:
+            if name in ("match", "timeout"):
+                label = f"{details.get('op', '?')} {name}"
+            else:
+                label = name
+            category = "operation" if name == "debug" else "retry"
+            self._trace.complete(label, category, duration, **details)
+        if self._durations is not None and name in ("match", "timeout"):
+            self._durations.record(
+                nodeid,
+                self._location(),
+                details.get("op", "?"),
+                duration,
+                polls=details.get("polls", 1),
+                timeout=details.get("timeout", 0),
+                passed=name == "match",
+                last_chance=details.get("last_chance", False),
+            )
+
+    def _location(self) -> str:
+        """
+        Returns:
+            the first caller outside of pytest-tmux (ex: tests/test_x.py:12)
+        """
+        frame = sys._getframe(1)  # type: Optional[Any]
+        filename = ""
+        while frame is not None:
+            filename = os.path.abspath(frame.f_code.co_filename)
+            path = os.path.realpath(filename)
+            if not path.startswith(_PACKAGE_DIR + os.sep) and path not in _HELPER_FILES:
+                break
+            frame = frame.f_back
+        if frame is None:
+            return "?"
+        rootdir = str(self._pytestconfig.rootpath)
+        if filename.startswith(rootdir + os.sep):
+            filename = os.path.relpath(filename, rootdir)
+        return f"{filename}:{frame.f_lineno}"
+
+    @property
+    def _recorder(self) -> Optional[Callable[..., None]]:
+        if self._stats is None and self._durations is None and self._trace is None:
+            return None
+        return self._record
+
+    @contextmanager
+    def _timed(self, name: str) -> Iterator[None]:
+        if self._stats is None and self._trace is None:
+            yield
+            return
+        start = monotonic()
+        try:
+            yield
+        finally:
+            end = monotonic()
+            if self._stats is not None:
+                self._stats.record(self._request.node.nodeid, name, end - start)
+            if self._trace is not None:
+                self._trace.complete(name, "operation", end - start, end=end)
 
     @property
     def session(self) -> libtmux.session.Session:
         """
         A direct link to libtmux.session.Session created for the actual test.
 
-        The object is created on the first call who need it.
+        The object is created on the first call who need it, or taken from
+        the session pool when enabled.
 
         Returns:
             a libtmux.session.Session object
@@ -180,12 +376,97 @@ class TmuxClient:
         if TYPE_CHECKING:
             assert isinstance(self.config, TmuxConfig)
             assert isinstance(self.config.session, TmuxConfigSession)
+            assert isinstance(self.config.plugin, TmuxConfigPlugin)
         if self._session is None:
-            self._session = self.server.new_session(**self.config.session)
+            with self._timed("session"):
+                if self.config.plugin.stream:
+                    self._session = self._new_streamed_session()
+                elif self._pool is not None:
+                    self._session = self._pool.session(self.config.session)
+                else:
+                    self._session = self.server.new_session(**self.config.session)
             self.sessions += 1
 
         return self._session
 
+    def _new_streamed_session(self) -> libtmux.session.Session:
+        """
+        Create the session with its pane output logged for
+        [stream][pytest_tmux.client.TmuxClient.stream] (plugin `stream`
+        setting).
+
+        `pipe-pane` is run by a temporary `after-new-session` hook, while
+        tmux handles the session creation, so the first output of the
+        window command is logged. The session is never taken from the
+        pool, its command would have run before.
+
+        Returns:
+            a libtmux.session.Session object
+        """
+        if TYPE_CHECKING:
+            assert isinstance(self.config.session, TmuxConfigSession)
+        path = self._stream_log()
+        name = str(self.config.session.session_name or "")
+        if not re.fullmatch(r"[\w.-]+", name) or not re.fullmatch(r"[\w./-]+", path):
+            # can not be quoted in the hook, attached after the creation
+            session = self.server.new_session(**self.config.session)
+            pane = session.attached_pane
+            assert pane is not None
+            self._pipe(str(pane.pane_id), path)
+            return session
+        hook = "after-new-session[9999]"
+        # the server is kept alive without sessions to hold the hook until
+        # the session is created, then the user setting is restored
+        proc = self.server.cmd(
+            "start-server",
+            ";",
+            "show-options",
+            "-gv",
+            "exit-empty",
+            ";",
+            "set-option",
+            "-g",
+            "exit-empty",
+            "off",
+            ";",
+            "set-hook",
+            "-g",
+            hook,
+            f"if-shell -F '#{{==:#{{session_name}},{name}}}' "
+            f"\"pipe-pane -o 'cat >> {path}'\"",
+        )
+        if proc.stderr:
+            raise LibTmuxException(proc.stderr)
+        exit_empty = proc.stdout[0] if proc.stdout else "on"
+        try:
+            return self.server.new_session(**self.config.session)
+        finally:
+            self._run(
+                ["set-hook", "-gu", hook],
+                ["set-option", "-g", "exit-empty", exit_empty],
+                now=True,
+            )
+
+    def _stream_log(self) -> str:
+        """
+        Returns:
+            a new empty file of the test where the pane output is logged
+        """
+        if self._tmpdir_factory is not None:
+            directory = str(self._tmpdir_factory.mktemp("tmux_stream"))
+        else:
+            directory = mkdtemp(prefix="pytest_tmux_stream_")
+        path = os.path.join(directory, "pane.log")
+        open(path, "wb").close()
+        self._stream_path = path
+        return path
+
+    def _pipe(self, pane_id: str, path: str) -> None:
+        self._run(
+            ["pipe-pane", "-o", "-t", pane_id, f"cat >> {shlex.quote(path)}"],
+            now=True,
+        )
+
     @property
     def window(self) -> libtmux.window.Window:
         """
@@ -215,6 +496,18 @@ class TmuxClient:
 
         return self._pane
 
+    @property
+    def panes(self) -> List[libtmux.pane.Pane]:
+        """
+        The panes of the actual window, in layout order (pane index).
+
+        The list is fetched on each call.
+
+        Returns:
+            a list of libtmux.pane.Pane objects
+        """
+        return sorted(self.window.panes, key=lambda pane: int(pane.pane_index or 0))
+
     @property
     def server(self) -> libtmux.server.Server:
         """
@@ -223,33 +516,164 @@ class TmuxClient:
 
         The object is created on the first call who need it.
 
+        When the plugin transport is 'control', a
+        [TmuxControlServer][pytest_tmux.control.TmuxControlServer] is used to
+        send every commands through one tmux control mode client.
+
         Returns:
             a libtmux.server.Server object
         """
-        if TYPE_CHECKING:
-            assert isinstance(self.config, TmuxConfig)
-            assert isinstance(self.config.server, TmuxConfigServer)
         if self._server is None:
-            self._server = TmuxServer(**self.config.server)
+            self._server = new_server(self.config, trace=self._trace)
         return self._server
 
+    @property
+    def pool(self) -> Optional[TmuxSessionPool]:
+        """
+        A session pool on the server, when enabled with the plugin
+        `session_pool` setting.
+
+        The pool is created on the first call who need it and filled with
+        sessions spawned with the session cmd args.
+
+        Returns:
+            a [TmuxSessionPool][pytest_tmux.pool.TmuxSessionPool] object or None
+        """
+        if TYPE_CHECKING:
+            assert isinstance(self.config, TmuxConfig)
+            assert isinstance(self.config.plugin, TmuxConfigPlugin)
+        if self._pool is None and self.config.plugin.session_pool:
+            self._pool = TmuxSessionPool(
+                self.server, int(self.config.plugin.session_pool), trace=self._trace
+            )
+            self._pool.fill(cmd_options(self._pytestconfig)["session"])
+        return self._pool
+
+    @property
+    def control(self) -> TmuxControl:
+        """
+        A tmux control mode client attached to the session of the actual test.
+
+        The client is started on the first call who need it.
+
+        Returns:
+            a [TmuxControl][pytest_tmux.control.TmuxControl] object
+        """
+        if self._control is None:
+            self._control = TmuxControl(self.server, str(self.session.session_id))
+            self._control.start()
+        return self._control
+
+    def _wait(self) -> Optional[Callable[[float], Optional[bool]]]:
+        """
+        Get the function used by [TmuxOutput][pytest_tmux.output.TmuxOutput]
+        to wait between two retries according to the assertion engine.
+
+        Returns:
+            None to sleep between retries ('poll' engine) or a
+            [TmuxControlWaiter][pytest_tmux.control.TmuxControlWaiter] who
+            wake up on pane output ('control' engine)
+        """
+        if TYPE_CHECKING:
+            assert isinstance(self.config, TmuxConfig)
+            assert isinstance(self.config.assertion, TmuxConfigAssert)
+        engine = self.config.assertion.engine
+        if engine == "poll":
+            return None
+        elif engine == "control":
+            assert isinstance(self.pane, TmuxPane)
+            return self.control.waiter(str(self.pane.pane_id))
+        else:
+            raise ValueError(f"Unknown assertion engine '{engine}'")
+
+    def _run(self, *commands: List[str], now: bool = False) -> None:
+        """
+        Run tmux commands, or queue them while a
+        [batch][pytest_tmux.client.TmuxClient.batch] is opened.
+
+        Args:
+            commands: tmux commands with their arguments
+            now: run the commands even if a batch is opened
+        """
+        if self._batch is not None and not now:
+            self._batch.extend(commands)
+            return
+        args = []  # type: List[str]
+        for command in commands:
+            args += [";", *command] if args else command
+        if args:
+            proc = self.server.cmd(*args)
+            if proc.stderr:
+                raise LibTmuxException(proc.stderr)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Queue [send_keys][pytest_tmux.client.TmuxClient.send_keys],
+        [paste][pytest_tmux.client.TmuxClient.paste],
+        [clear][pytest_tmux.client.TmuxClient.clear] and
+        [resize][pytest_tmux.client.TmuxClient.resize] calls and send them
+        as one `;` chained tmux command when leaving the context.
+
+        Nested batches are sent with the outermost one.
+
+        Example:
+            with tmux.batch():
+                tmux.send_keys("vim", enter=True)
+                tmux.send_keys([":q", "Enter"], enter=False)
+        """
+        if self._batch is not None:
+            yield
+            return
+        self._batch = []
+        try:
+            yield
+        finally:
+            commands, self._batch = self._batch, None
+            self._run(*commands)
+
     def clear(self) -> None:
         """
-        Shortcut for libtmux.pane.Pane.clear()
+        Same as libtmux.pane.Pane.clear(), send `reset` to the actual pane
         """
-        assert isinstance(self.pane, TmuxPane)
-        self.pane.clear()
+        self._run(*self._keys(["reset"]))
+
+    def resize(self, x: Optional[int] = None, y: Optional[int] = None) -> None:
+        """
+        Resize the actual window
+
+        Args:
+            x: new width of the window
+            y: new height of the window
+        """
+        assert isinstance(self.window, TmuxWindow)
+        args = ["resize-window", "-t", str(self.window.window_id)]
+        if x is not None:
+            args += ["-x", str(x)]
+        if y is not None:
+            args += ["-y", str(y)]
+        self._run(args)
 
-    def send_keys(self, cmd: str, **kwargs: Any) -> None:
+    def send_keys(
+        self,
+        cmd: Union[str, Sequence[str]],
+        enter: bool = True,
+        suppress_history: bool = False,
+        literal: bool = False,
+    ) -> None:
         """
         Send commands to the actual pane
 
+        A list of key sequences is sent with one `send-keys` command, Enter
+        being sent once after the last sequence.
+
         Args:
-            cmd: Text or input into pane
-            kwargs: every arguments accepted by libtmux.pane.Pane.send_keys()
+            cmd: Text or input into pane, or a list of them
+            enter: send Enter after the input
+            suppress_history: prepend a space to the input
+            literal: send keys literally
         """
-        if "suppress_history" not in kwargs:
-            kwargs["suppress_history"] = False
+        keys = [cmd] if isinstance(cmd, str) else list(cmd)
         self.debug(
             """
                     Send "{}" to tmux session
@@ -257,84 +681,765 @@ class TmuxClient:
                 cmd
             )
         )
+        with self._timed("send_keys"):
+            self._run(*self._keys(keys, enter, suppress_history, literal))
+
+    def paste(
+        self, data: Union[str, bytes, os.PathLike], bracketed: bool = True
+    ) -> None:
+        """
+        Paste data into the actual pane through a tmux buffer, which is much
+        faster than [send_keys][pytest_tmux.client.TmuxClient.send_keys] for
+        large inputs.
+
+        The data is loaded in a dedicated buffer with `load-buffer`, then
+        pasted and deleted with `paste-buffer -d` (queued while a
+        [batch][pytest_tmux.client.TmuxClient.batch] is opened).
+
+        Args:
+            data: the text to paste, or the path of a file to paste
+            bracketed: surround the paste with bracketed paste sequences
+                when the application requested them (`paste-buffer -p`)
+        """
+        self.debug(
+            """
+                    Paste {} to tmux session
+                    """.format(
+                data if isinstance(data, os.PathLike) else f"{len(data)} characters"
+            )
+        )
         assert isinstance(self.pane, TmuxPane)
-        self.pane.send_keys(cmd, **kwargs)
+        pane_id = str(self.pane.pane_id)
+        buffer = f"pytest_tmux_{pane_id.lstrip('%')}_{next(self._buffers)}"
+        if isinstance(data, os.PathLike):
+            self._run(["load-buffer", "-b", buffer, os.path.abspath(data)])
+        else:
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+            with NamedTemporaryFile(prefix="pytest_tmux_", delete=False) as f:
+                f.write(data)
+            try:
+                # Loaded now, outside of any batch, to remove the file
+                self._run(["load-buffer", "-b", buffer, f.name], now=True)
+            finally:
+                os.unlink(f.name)
+        args = ["paste-buffer", "-d", "-b", buffer, "-t", pane_id]
+        if bracketed:
+            args.append("-p")
+        with self._timed("paste"):
+            self._run(args)
 
-    def screen(
-        self, timeout: Optional[int] = None, delay: Optional[Union[int, float]] = None
+    def _keys(
+        self,
+        keys: List[str],
+        enter: bool = True,
+        suppress_history: bool = False,
+        literal: bool = False,
+    ) -> List[List[str]]:
+        """
+        Build the `send-keys` commands sent by
+        [send_keys][pytest_tmux.client.TmuxClient.send_keys]
+
+        Returns:
+            a list of tmux commands with their arguments
+        """
+        assert isinstance(self.pane, TmuxPane)
+        pane_id = str(self.pane.pane_id)
+        if suppress_history and keys:
+            keys = [" " + keys[0], *keys[1:]]
+        commands = []
+        if keys:
+            args = ["send-keys", "-t", pane_id]
+            if literal:
+                args.append("-l")
+            commands.append(args + keys)
+        if enter:
+            commands.append(["send-keys", "-t", pane_id, "Enter"])
+        return commands
+
+    def _output(
+        self,
+        capture: Callable[[], Any],
+        timeout: Optional[Union[int, float]] = None,
+        delay: Optional[Union[int, float]] = None,
+        policy: Optional[str] = None,
     ) -> TmuxOutput:
         """
-        Get screen content from pane with retry capability on operators
+        Build a [TmuxOutput][pytest_tmux.output.TmuxOutput] using the
+        assertion config for every unset argument.
 
         Args:
+            capture: function used to capture the value
             timeout: how long to wait for the assertion to failed
             delay: how long before retrying the assertion
+            policy: how delays between two retries are computed
 
         Returns:
             a [TmuxOutput][pytest_tmux.output.TmuxOutput] instance
         """
-
         if TYPE_CHECKING:
             assert isinstance(self.config, TmuxConfig)
-            assert isinstance(self.config.server, TmuxConfigAssert)
+            assert isinstance(self.config.assertion, TmuxConfigAssert)
         if timeout is None:
             timeout = self.config.assertion.timeout
         if delay is None:
             delay = self.config.assertion.delay
+        if policy is None:
+            policy = self.config.assertion.policy
+
+        return TmuxOutput(
+            capture,
+            timeout=timeout,
+            delay=delay,
+            wait=self._wait(),
+            policy=policy,
+            record=self._recorder,
+        )
+
+    def _capture_rows(self, start: int, end: Optional[int] = None) -> List[str]:
+        """
+        Capture only rows `start` to `end` (excluded) of the pane with
+        `capture-pane -S/-E`.
+
+        The pane height is fetched in the same tmux call to return nothing
+        for rows below the pane (tmux would return the last row).
+
+        Args:
+            start: first row to capture
+            end: row where to stop the capture (excluded), default to the
+                end of the pane
+
+        Returns:
+            the captured rows, without the trailing empty rows
+        """
+        assert isinstance(self.pane, TmuxPane)
+        if start < 0 or (end is not None and end < 0):
+            with self._timed("capture"):
+                return list(self.pane.capture_pane())[start:end]
+        if end is not None and end <= start:
+            return []
+        pane_id = str(self.pane.pane_id)
+        args = ["display-message", "-p", "-t", pane_id, "#{pane_height}"]
+        args += [";", "capture-pane", "-p", "-t", pane_id, "-S", str(start)]
+        if end is not None:
+            args += ["-E", str(end - 1)]
+        with self._timed("capture"):
+            stdout = self.server.cmd(*args).stdout
+        if not stdout or int(stdout[0]) <= start:
+            return []
+        return stdout[1:]
+
+    def capture_panes(
+        self, panes: Optional[Sequence[Union[str, libtmux.pane.Pane]]] = None
+    ) -> List[str]:
+        """
+        Capture several panes, of any session of the server, with one
+        chained tmux command.
+
+        Each capture is followed by a marker printed with `display-message`
+        to split the output. Panes who do not exist are captured as an
+        empty string: tmux stops a chain at the first error, so the chain is
+        sent again for the panes after the missing one.
+
+        Args:
+            panes: pane objects or tmux targets (ex: %1, session:0.1),
+                default to [panes][pytest_tmux.client.TmuxClient.panes]
+
+        Returns:
+            the content of each pane, without trailing empty rows
+        """
+        targets = [
+            str(pane.pane_id) if isinstance(pane, TmuxPane) else str(pane)
+            for pane in (self.panes if panes is None else panes)
+        ]
+        if not targets:
+            return []
+        marker = f"pytest_tmux_{uuid4().hex}"
+        captures = []  # type: List[List[str]]
+        with self._timed("capture"):
+            while len(captures) < len(targets):
+                args = []  # type: List[str]
+                done = len(captures)
+                for target in targets[done:]:
+                    args += [";"] if args else []
+                    args += ["capture-pane", "-p", "-t", target]
+                    args += [";", "display-message", "-p", "-t", target, marker]
+                capture = []  # type: List[str]
+                for line in self.server.cmd(*args).stdout:
+                    if line == marker:
+                        captures.append(capture)
+                        capture = []
+                    else:
+                        capture.append(line)
+                if len(captures) < len(targets):
+                    # the chain stopped on this pane
+                    captures.append([])
+        screens = []
+        for capture in captures:
+            while capture and capture[-1] == "":
+                capture.pop()
+            screens.append("\n".join(capture))
+        return screens
+
+    def screens(
+        self,
+        panes: Optional[Sequence[Union[str, libtmux.pane.Pane]]] = None,
+        timeout: Optional[int] = None,
+        delay: Optional[Union[int, float]] = None,
+        policy: Optional[str] = None,
+    ) -> TmuxOutput:
+        """
+        Get screen content of several panes with retry capability on
+        operators
+
+        The panes are resolved once, then all of them are captured with one
+        tmux command on each retry (see
+        [capture_panes][pytest_tmux.client.TmuxClient.capture_panes]). The
+        value is a list of screens, in the order of `panes`.
+
+        Args:
+            panes: pane objects or tmux targets, default to the panes of
+                the actual window in layout order
+            timeout: how long to wait for the assertion to failed
+            delay: how long before retrying the assertion
+            policy: how delays between two retries are computed
+                (see [retry][pytest_tmux.output.retry])
+
+        Returns:
+            a [TmuxOutput][pytest_tmux.output.TmuxOutput] instance
+        """
+        self.debug(
+            """
+            Check tmux screens
+            """
+        )
+        targets = list(self.panes if panes is None else panes)
+
+        def _capture() -> List[str]:
+            return self.capture_panes(targets)
+
+        return self._output(_capture, timeout=timeout, delay=delay, policy=policy)
+
+    def screen(
+        self,
+        timeout: Optional[int] = None,
+        delay: Optional[Union[int, float]] = None,
+        policy: Optional[str] = None,
+    ) -> TmuxOutput:
+        """
+        Get screen content from pane with retry capability on operators
 
+        Args:
+            timeout: how long to wait for the assertion to failed
+            delay: how long before retrying the assertion
+            policy: how delays between two retries are computed
+                (see [retry][pytest_tmux.output.retry])
+
+        Returns:
+            a [TmuxOutput][pytest_tmux.output.TmuxOutput] instance
+        """
         self.debug(
             """
             Check tmux screen
             """
         )
 
-        def _capture() -> str:
-            assert isinstance(self.pane, TmuxPane)
-            return "\n".join(self.pane.capture_pane())
+        return self._output(
+            self._capture_screen, timeout=timeout, delay=delay, policy=policy
+        )
+
+    def snapshot(self, name: str) -> TmuxSnapshot:
+        """
+        Golden screen to compare with `==` to a captured screen, stored in
+        the `__tmux_snapshots__` directory of the test module (see
+        [TmuxSnapshots][pytest_tmux.snapshot.TmuxSnapshots])
+
+        Snapshots who do not exist or do not match are written when pytest
+        is run with `--tmux-snapshot-update`.
+
+        Example:
+            assert tmux.screen() == tmux.snapshot("prompt")
+
+        Args:
+            name: name of the snapshot, unique in the test
+
+        Returns:
+            a [TmuxSnapshot][pytest_tmux.snapshot.TmuxSnapshot] instance
+        """
+        if self._snapshots is None:
+            self._snapshots = TmuxSnapshots()
+        path = str(self._request.node.fspath)
+        index = os.path.join(
+            os.path.dirname(path),
+            SNAPSHOTS_DIR,
+            os.path.splitext(os.path.basename(path))[0] + ".json",
+        )
+        # node id without the module (ex: TestClass::test_name[param])
+        test = self._request.node.nodeid.split("::", 1)[-1]
+        return TmuxSnapshot(self._snapshots, index, f"{test}::{name}")
+
+    def cells(self) -> TmuxCells:
+        """
+        Capture the screen with its colors and attributes
+        (`capture-pane -e`) into a grid of cells.
+
+        Trailing spaces are kept (`-N`) to get the style of the padding
+        of a highlighted line. The pane size is fetched in the same tmux
+        call. Unlike
+        [screen][pytest_tmux.client.TmuxClient.screen], the capture is not
+        retried: wait for the screen first (ex: with
+        [wait_idle][pytest_tmux.client.TmuxClient.wait_idle]).
+
+        Example:
+            from pytest_tmux.cells import BOLD, REVERSE
+
+            cells = tmux.cells()
+            assert cells[0, 0:10].text == "status"
+            assert set(cells[0, 0:10].bg) == {2}
+            assert cells[-1].has(BOLD | REVERSE)
+
+        Returns:
+            a [TmuxCells][pytest_tmux.cells.TmuxCells] instance
 
-        return TmuxOutput(_capture, timeout=timeout, delay=delay)
+        Raises:
+            LibTmuxException: if the pane could not be captured (ex: the
+                pane is gone)
+        """
+        assert isinstance(self.pane, TmuxPane)
+        pane_id = str(self.pane.pane_id)
+        args = ["display-message", "-p", "-t", pane_id, "#{pane_width} #{pane_height}"]
+        args += [";", "capture-pane", "-p", "-e", "-N", "-t", pane_id]
+        with self._timed("capture"):
+            proc = self.server.cmd(*args)
+        size = proc.stdout[0].split() if proc.stdout else []
+        if len(size) != 2:
+            raise LibTmuxException(
+                proc.stderr or [f"Could not capture the cells of pane {pane_id}"]
+            )
+        width, height = (int(value) for value in size)
+        return TmuxCells(proc.stdout[1:], width, height)
+
+    def _capture_screen(self) -> str:
+        assert isinstance(self.pane, TmuxPane)
+        with self._timed("capture"):
+            return "\n".join(self.pane.capture_pane())
 
     def row(
         self,
         row: int,
         timeout: Optional[int] = None,
         delay: Optional[Union[int, float]] = None,
+        policy: Optional[str] = None,
     ) -> TmuxOutput:
         """
         Get row content from pane with retry capability on operators
 
+        Only the requested row is captured.
+
         Args:
             row: which row from libtmux.pane.Pane.capture_pane to set in [TmuxOutput][pytest_tmux.output.TmuxOutput]
             timeout: how long to wait for the assertion to failed
             delay: how long before retrying the assertion
+            policy: how delays between two retries are computed
+                (see [retry][pytest_tmux.output.retry])
 
         Returns:
             a [TmuxOutput][pytest_tmux.output.TmuxOutput] instance
         """
+        if not isinstance(row, int):
+            raise TypeError("row should be an integer")
+
+        self.debug(
+            f"""
+            Check tmux row {row}
+            """
+        )
+
+        def _capture() -> str:
+            if row < 0:
+                assert isinstance(self.pane, TmuxPane)
+                with self._timed("capture"):
+                    lines = self.pane.capture_pane()
+                try:
+                    return str(lines[row])
+                except IndexError:
+                    return ""
+            output = self._capture_rows(row, row + 1)
+            return output[0] if output else ""
+
+        return self._output(_capture, timeout=timeout, delay=delay, policy=policy)
+
+    def rows(
+        self,
+        start: int,
+        end: Optional[int] = None,
+        timeout: Optional[int] = None,
+        delay: Optional[Union[int, float]] = None,
+        policy: Optional[str] = None,
+    ) -> TmuxOutput:
+        """
+        Get rows `start` to `end` (excluded) from pane with retry capability on
+        operators
+
+        Only the requested rows are captured.
+
+        Args:
+            start: first row to set in [TmuxOutput][pytest_tmux.output.TmuxOutput]
+            end: row where to stop (excluded), default to the end of the pane
+            timeout: how long to wait for the assertion to failed
+            delay: how long before retrying the assertion
+            policy: how delays between two retries are computed
+                (see [retry][pytest_tmux.output.retry])
+
+        Returns:
+            a [TmuxOutput][pytest_tmux.output.TmuxOutput] instance
+        """
+        if not isinstance(start, int) or not isinstance(end, (int, type(None))):
+            raise TypeError("start and end should be integers")
+
+        self.debug(
+            f"""
+            Check tmux rows {start} to {end}
+            """
+        )
+
+        def _capture() -> str:
+            return "\n".join(self._capture_rows(start, end))
+
+        return self._output(_capture, timeout=timeout, delay=delay, policy=policy)
+
+    def stream(
+        self,
+        timeout: Optional[int] = None,
+        delay: Optional[Union[int, float]] = None,
+        policy: Optional[str] = None,
+    ) -> TmuxStream:
+        """
+        Get the whole output of the pane with retry capability on
+        [wait_for][pytest_tmux.stream.TmuxStream.wait_for]
+
+        The pane output is logged to a file of the test with `pipe-pane -o`.
+        With the plugin `stream` setting (`--tmux-stream` or
+        `tmux.config.plugin.stream = True` before the session is created),
+        it is logged from the session creation. Otherwise it is logged from
+        the first call, and earlier output is not part of the stream.
+        Following calls return the same stream (timeout, delay and policy
+        are only used on first call).
+
+        Args:
+            timeout: how long to wait for a pattern
+            delay: how long before checking the output again
+            policy: how delays between two checks are computed
+                (see [retry][pytest_tmux.output.retry])
+
+        Returns:
+            a [TmuxStream][pytest_tmux.stream.TmuxStream] instance
+        """
         if TYPE_CHECKING:
             assert isinstance(self.config, TmuxConfig)
-            assert isinstance(self.config.server, TmuxConfigAssert)
+            assert isinstance(self.config.assertion, TmuxConfigAssert)
+        if self._stream is None:
+            self.debug(
+                """
+                Stream tmux pane output
+                """
+            )
+            assert isinstance(self.pane, TmuxPane)
+            if self._stream_path is None:
+                self._pipe(str(self.pane.pane_id), self._stream_log())
+            assert self._stream_path is not None
+            self._stream = TmuxStream(
+                self._stream_path,
+                timeout=self.config.assertion.timeout if timeout is None else timeout,
+                delay=self.config.assertion.delay if delay is None else delay,
+                wait=self._wait(),
+                policy=self.config.assertion.policy if policy is None else policy,
+                record=self._recorder,
+            )
+        return self._stream
 
-        if not isinstance(row, int):
-            raise TypeError("row should be an integer")
+    def _conditions(
+        self,
+        conditions: Union[Mapping[Hashable, TmuxCondition], Iterable[TmuxCondition]],
+    ) -> Dict[Hashable, TmuxCondition]:
+        if isinstance(conditions, Mapping):
+            return dict(conditions)
+        return {condition: condition for condition in conditions}
+
+    def wait_for_any(
+        self,
+        conditions: Union[Mapping[Hashable, TmuxCondition], Iterable[TmuxCondition]],
+        timeout: Optional[int] = None,
+        delay: Optional[Union[int, float]] = None,
+        policy: Optional[str] = None,
+    ) -> Optional[Hashable]:
+        """
+        Wait for the first of several conditions to be fulfilled by the
+        screen.
+
+        Every condition is checked against the same capture on each retry,
+        so the wait lasts one timeout whatever the number of conditions.
+
+        Args:
+            conditions: a dict of named conditions, or an iterable of
+                conditions (see [check][pytest_tmux.client.check])
+            timeout: how long to wait for a condition
+            delay: how long before capturing the screen again
+            policy: how delays between two retries are computed
+                (see [retry][pytest_tmux.output.retry])
+
+        Returns:
+            the name (or the condition itself) of the first fulfilled
+            condition, or None
+        """
+        named = self._conditions(conditions)
+        self.debug(
+            f"""
+            Wait for any of {list(named)}
+            """
+        )
+
+        # the name is wrapped in a tuple to fire on a false name (ex: 0)
+        def _fired(value: str) -> Optional[Tuple[Hashable]]:
+            for name, condition in named.items():
+                if check(condition, value):
+                    return (name,)
+            return None
+
+        fired = self._output(
+            self._capture_screen, timeout=timeout, delay=delay, policy=policy
+        )._satisfies(_fired, "wait_for_any")
+        return fired[0] if fired else None
+
+    def wait_for_all(
+        self,
+        conditions: Union[Mapping[Hashable, TmuxCondition], Iterable[TmuxCondition]],
+        timeout: Optional[int] = None,
+        delay: Optional[Union[int, float]] = None,
+        policy: Optional[str] = None,
+    ) -> bool:
+        """
+        Wait for several conditions to be fulfilled by the same screen.
+
+        Every condition is checked against the same capture on each retry.
+
+        Args:
+            conditions: a dict of named conditions, or an iterable of
+                conditions (see [check][pytest_tmux.client.check])
+            timeout: how long to wait for the conditions
+            delay: how long before capturing the screen again
+            policy: how delays between two retries are computed
+                (see [retry][pytest_tmux.output.retry])
+
+        Returns:
+            True if every condition was fulfilled before the timeout
+        """
+        named = self._conditions(conditions)
+        self.debug(
+            f"""
+            Wait for all of {list(named)}
+            """
+        )
+
+        def _fired(value: str) -> bool:
+            return all(check(condition, value) for condition in named.values())
+
+        return bool(
+            self._output(
+                self._capture_screen, timeout=timeout, delay=delay, policy=policy
+            )._satisfies(_fired, "wait_for_all")
+        )
+
+    def wait_idle(
+        self,
+        quiet_ms: Union[int, float] = 100,
+        timeout: Optional[Union[int, float]] = None,
+        delay: Optional[Union[int, float]] = None,
+    ) -> bool:
+        """
+        Wait for the pane to stop changing for `quiet_ms` milliseconds, so
+        the screen can be captured once a program is done repainting it.
+
+        With the 'control' assertion engine, the pane is idle when it did
+        not output anything for `quiet_ms`. Otherwise the screen is captured
+        every `min(delay, quiet_ms / 4)` and is idle when its content did not
+        change for `quiet_ms`.
+
+        Example:
+            assert tmux.wait_idle(quiet_ms=200)
+            assert tmux.screen(timeout=0) == "..."
 
+        Args:
+            quiet_ms: how long the pane should be unchanged, in milliseconds
+            timeout: how long to wait for the pane to be idle
+            delay: how long before capturing the screen again
+                ('poll' engine only)
+
+        Returns:
+            True if the pane was idle before the timeout
+        """
+        if TYPE_CHECKING:
+            assert isinstance(self.config, TmuxConfig)
+            assert isinstance(self.config.assertion, TmuxConfigAssert)
         if timeout is None:
             timeout = self.config.assertion.timeout
         if delay is None:
             delay = self.config.assertion.delay
+        self.debug(
+            f"""
+            Wait for tmux pane to be idle for {quiet_ms}ms
+            """
+        )
+        quiet = quiet_ms / 1000
+        start = monotonic()
+        deadline = start + timeout
+        last_change = start
+        polls = 0
+        idle = False
+        assert isinstance(self.pane, TmuxPane)
+        pane_id = str(self.pane.pane_id)
+        control = self.control if self.config.assertion.engine == "control" else None
 
+        if control is not None:
+            seen = control.outputs(pane_id)
+            while control.alive:
+                now = monotonic()
+                if now - last_change >= quiet:
+                    idle = True
+                    break
+                if now >= deadline:
+                    break
+                polls += 1
+                outputs = control.wait_output(
+                    pane_id, seen, min(last_change + quiet, deadline) - now
+                )
+                if outputs != seen:
+                    seen = outputs
+                    last_change = monotonic()
+
+        if not idle and (control is None or not control.alive):
+            interval = min(delay, quiet / 4)
+            digest = hash(self._capture_screen())
+            while True:
+                now = monotonic()
+                if now - last_change >= quiet:
+                    idle = True
+                    break
+                if now >= deadline:
+                    break
+                sleep(min(interval, deadline - now))
+                polls += 1
+                screen = hash(self._capture_screen())
+                if screen != digest:
+                    digest = screen
+                    last_change = monotonic()
+
+        if self._recorder is not None:
+            self._record(
+                "match" if idle else "timeout",
+                monotonic() - start,
+                op="wait_idle",
+                polls=polls,
+                timeout=timeout,
+            )
+        return idle
+
+    def history(self, chunk_lines: int = 1000) -> Iterator[List[str]]:
+        """
+        Read the scrollback history and the screen of the pane, from the
+        oldest line to the last one, by chunks of `chunk_lines` lines
+        captured with `capture-pane -S/-E`.
+
+        Only one chunk is kept in memory at a time, whatever the
+        `history-limit` of the pane. Lines written while the history is
+        read shift it and may be missed or read twice.
+
+        Args:
+            chunk_lines: number of lines of each chunk
+
+        Yields:
+            lists of lines, the last one without its trailing empty lines
+        """
+        if chunk_lines < 1:
+            raise ValueError("chunk_lines should be greater than 0")
+        assert isinstance(self.pane, TmuxPane)
+        pane_id = str(self.pane.pane_id)
+        stdout = self.server.cmd(
+            "display-message", "-p", "-t", pane_id, "#{history_size} #{pane_height}"
+        ).stdout
+        if not stdout:
+            return
+        history_size, height = (int(value) for value in stdout[0].split())
+        start = -history_size
+        while start < height:
+            end = min(start + chunk_lines, height)
+            args = ["capture-pane", "-p", "-t", pane_id, "-S", str(start)]
+            args += ["-E", str(end - 1)]
+            with self._timed("capture"):
+                lines = self.server.cmd(*args).stdout
+            if end < height:
+                # tmux_cmd strips trailing empty lines
+                lines += [""] * (end - start - len(lines))
+            yield lines
+            start = end
+
+    def history_contains(
+        self,
+        pattern: Union[str, Pattern[str]],
+        chunk_lines: int = 1000,
+        timeout: Optional[int] = None,
+        delay: Optional[Union[int, float]] = None,
+        policy: Optional[str] = None,
+    ) -> bool:
+        """
+        Retry until a substring or a compiled regular expression is found in
+        the scrollback history or the screen of the pane.
+
+        Each retry reads the [history][pytest_tmux.client.TmuxClient.history]
+        chunk by chunk and stops at the first match. The end of the previous
+        chunk is kept to find matches across two chunks (as many lines as
+        the substring has, one line for a regular expression).
+
+        Args:
+            pattern: a substring or a compiled regular expression
+            chunk_lines: number of lines captured at once
+            timeout: how long to wait for the pattern
+            delay: how long before reading the history again
+            policy: how delays between two retries are computed
+                (see [retry][pytest_tmux.output.retry])
+
+        Returns:
+            True if the pattern was found before the timeout
+        """
+        if TYPE_CHECKING:
+            assert isinstance(self.config, TmuxConfig)
+            assert isinstance(self.config.assertion, TmuxConfigAssert)
         self.debug(
             f"""
-            Check tmux row {row}
+            Check tmux history for {pattern!r}
             """
         )
+        if isinstance(pattern, str):
+            overlap = pattern.count("\n")
+        else:
+            overlap = 1
 
-        def _capture() -> str:
-            assert isinstance(self.pane, TmuxPane)
-            try:
-                output = self.pane.capture_pane()[row]
-            except IndexError:
-                output = ""
-            return output
+        @retry(
+            timeout=self.config.assertion.timeout if timeout is None else timeout,
+            delay=self.config.assertion.delay if delay is None else delay,
+            wait=self._wait(),
+            policy=self.config.assertion.policy if policy is None else policy,
+            record=None
+            if self._recorder is None
+            else partial(self._record, op="history_contains"),
+        )
+        def _test() -> bool:
+            previous = []  # type: List[str]
+            for chunk in self.history(chunk_lines):
+                lines = previous + chunk
+                if check(pattern, "\n".join(lines)):
+                    return True
+                previous = lines[-overlap:] if overlap else []
+            return False
 
-        return TmuxOutput(_capture, timeout=timeout, delay=delay)
+        return _test()
@@ -1,12 +1,119 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Mapping
+from typing import TYPE_CHECKING, Any, Mapping
 
 if TYPE_CHECKING:
-    from typing import Any, Dict, Iterator, Optional, Union
+    from typing import Dict, Iterator, Optional, Tuple, Union
 
     import pytest
 
+# Cmd args (and their env defaults) of each config section:
+# (option dest, config key, applied even if false (but not None))
+OPTIONS = {
+    "server": (
+        ("tmux_socket_path", "socket_path", False),
+        ("tmux_config_file", "config_file", False),
+        ("tmux_colors", "colors", False),
+    ),
+    "session": (
+        ("tmux_start_directory", "start_directory", False),
+        ("tmux_window_command", "window_command", False),
+        ("tmux_window_width", "x", False),
+        ("tmux_window_height", "y", False),
+    ),
+    "assertion": (
+        ("tmux_assertion_timeout", "timeout", False),
+        ("tmux_assertion_delay", "delay", False),
+        ("tmux_assertion_policy", "policy", False),
+        ("tmux_assertion_engine", "engine", False),
+    ),
+    "plugin": (
+        ("tmux_debug", "debug", False),
+        ("tmux_transport", "transport", False),
+        ("tmux_warmup", "warmup", False),
+        ("tmux_session_pool", "session_pool", False),
+        ("tmux_diff_context", "diff_context", True),
+        ("tmux_diff_max_lines", "diff_max_lines", True),
+        ("tmux_stats", "stats", True),
+        ("tmux_durations", "durations", True),
+        ("tmux_trace", "trace", False),
+        ("tmux_snapshot_update", "snapshot_update", False),
+        ("tmux_stream", "stream", False),
+    ),
+}  # type: Dict[str, Tuple[Tuple[str, str, bool], ...]]
+
+
+def parse_options(pytestconfig: pytest.Config) -> Dict[str, Dict[str, Any]]:
+    """
+    Read the pytest-tmux cmd args (and their env defaults) who take
+    precedence over the other settings.
+
+    Called once by the plugin in `pytest_configure`, the result is shared by
+    every [TmuxConfig][pytest_tmux.config.TmuxConfig].
+
+    Args:
+        pytestconfig: a pytest config object
+
+    Returns:
+        the settings given on the cmd line, by config section
+    """
+    options = {}  # type: Dict[str, Dict[str, Any]]
+    for section, section_options in OPTIONS.items():
+        options[section] = {}
+        for dest, key, keep_false in section_options:
+            value = pytestconfig.getoption(dest)
+            if value or (keep_false and value is not None):
+                options[section][key] = value
+    return options
+
+
+def cmd_options(pytestconfig: pytest.Config) -> Dict[str, Dict[str, Any]]:
+    """
+    Returns:
+        the cmd args parsed by the plugin, parsed now if the plugin is not
+        registered yet (see [parse_options][pytest_tmux.config.parse_options])
+    """
+    options = getattr(pytestconfig.pluginmanager.getplugin("tmux"), "options", None)
+    if options is None:
+        return parse_options(pytestconfig)
+    return options
+
+
+class TmuxConfigSnapshot(Mapping[str, Any]):
+    """
+    Read only settings of a [TmuxConfig][pytest_tmux.config.TmuxConfig],
+    resolved once (defaults, fixtures, markers, settings set in tests,
+    env, cmd args).
+
+    Settings are readable as attributes (None if not set) or as a mapping.
+
+    Args:
+        values: the resolved settings
+    """
+
+    __slots__ = ("_values",)
+
+    def __init__(self, values: Mapping[str, Any]) -> None:
+        object.__setattr__(self, "_values", dict(values))
+
+    def __getattr__(self, key: str) -> Any:
+        return self._values.get(key, None)
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is read only")
+
+    def __getitem__(self, key: str) -> Any:
+        return self._values[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._values!r})"
+
 
 class TmuxConfig(Mapping[str, str]):
     """
@@ -27,6 +134,9 @@ class TmuxConfig(Mapping[str, str]):
         plugin: a [TmuxConfigPlugin][pytest_tmux.config.TmuxConfigPlugin] instance
     """
 
+    # Section of the cmd args who apply to this config (see OPTIONS)
+    _section = None  # type: Optional[str]
+
     def __init__(
         self,
         request: Optional[pytest.FixtureRequest] = None,
@@ -43,12 +153,41 @@ class TmuxConfig(Mapping[str, str]):
         super().__setattr__("_server_cfg_fixture", server_cfg_fixture)
         super().__setattr__("_session_cfg_fixture", session_cfg_fixture)
         super().__setattr__("_assertion_cfg_fixture", assertion_cfg_fixture)
+        super().__setattr__("_snapshot", None)
         self._default()
 
     def _default(self) -> None:
         assert isinstance(self._config, dict)
         self._config.update({})
 
+    def _update(self) -> None:
+        """
+        Apply settings who take precedence over the stored ones (cmd args)
+        """
+        if self._section is not None:
+            if TYPE_CHECKING:
+                assert isinstance(self._config, dict)
+                assert isinstance(self._pytestconfig, pytest.Config)
+            self._config.update(cmd_options(self._pytestconfig)[self._section])
+
+    def snapshot(self) -> TmuxConfigSnapshot:
+        """
+        The resolved settings, computed on first need and kept until a
+        setting is changed (ex: `tmux.config.session.x = 100` in a test)
+
+        Returns:
+            a [TmuxConfigSnapshot][pytest_tmux.config.TmuxConfigSnapshot]
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            if TYPE_CHECKING:
+                assert isinstance(self._config, dict)
+            self._update()
+            snapshot = TmuxConfigSnapshot(self._config)
+            super().__setattr__("_snapshot", snapshot)
+        assert isinstance(snapshot, TmuxConfigSnapshot)
+        return snapshot
+
     def __getattr__(self, key: str) -> str:
         if TYPE_CHECKING:
             assert isinstance(self._config, dict)
@@ -82,26 +221,28 @@ class TmuxConfig(Mapping[str, str]):
                 self._config[key] = TmuxConfigPlugin(
                     pytestconfig=self._pytestconfig,
                 )
+            super().__setattr__("_snapshot", None)
         return self._config.get(key, None)
 
     def __contains__(self, other: object) -> bool:
         if TYPE_CHECKING:
             assert isinstance(self._config, dict)
-        return other in self._config
+        return other in self.snapshot()
 
     def __setattr__(self, key: str, value: Any) -> None:
         if TYPE_CHECKING:
             assert isinstance(self._config, dict)
         self._config[key] = value
+        super().__setattr__("_snapshot", None)
 
     def __getitem__(self, key: str) -> Any:
         return getattr(self, key)
 
     def __iter__(self) -> Iterator[str]:
-        return iter(self._config)
+        return iter(self.snapshot())
 
     def __len__(self) -> int:
-        return len(self._config)
+        return len(self.snapshot())
 
 
 class TmuxConfigServer(TmuxConfig):
@@ -124,6 +265,8 @@ class TmuxConfigServer(TmuxConfig):
         **args: All args accepted by libtmux.server.Server()
     """
 
+    _section = "server"
+
     def _default(self) -> None:
         if TYPE_CHECKING:
             assert isinstance(self._config, dict)
@@ -134,20 +277,7 @@ class TmuxConfigServer(TmuxConfig):
         self._config.update(self._server_cfg_fixture or {})
 
     def __getattr__(self, key: str) -> str:
-        if TYPE_CHECKING:
-            assert isinstance(self._config, dict)
-            assert isinstance(self._pytestconfig, pytest.Config)
-        if self._pytestconfig.getoption("tmux_socket_path"):
-            self._config["socket_path"] = self._pytestconfig.getoption(
-                "tmux_socket_path"
-            )
-        if self._pytestconfig.getoption("tmux_config_file"):
-            self._config["config_file"] = self._pytestconfig.getoption(
-                "tmux_config_file"
-            )
-        if self._pytestconfig.getoption("tmux_colors"):
-            self._config["colors"] = self._pytestconfig.getoption("tmux_colors")
-        return self._config.get(key, None)
+        return self.snapshot().get(key, None)
 
 
 class TmuxConfigSession(TmuxConfig):
@@ -169,6 +299,8 @@ class TmuxConfigSession(TmuxConfig):
         **attrs: All args accepted by libtmux.server.Server.new_session()
     """
 
+    _section = "session"
+
     def _default(self) -> None:
         if TYPE_CHECKING:
             assert isinstance(self._config, dict)
@@ -194,22 +326,7 @@ class TmuxConfigSession(TmuxConfig):
         self._config.update(self._session_cfg_fixture or {})
 
     def __getattr__(self, key: str) -> str:
-        if TYPE_CHECKING:
-            assert isinstance(self._config, dict)
-            assert isinstance(self._pytestconfig, pytest.Config)
-        if self._pytestconfig.getoption("tmux_start_directory"):
-            self._config["start_directory"] = self._pytestconfig.getoption(
-                "tmux_start_directory"
-            )
-        if self._pytestconfig.getoption("tmux_window_command"):
-            self._config["window_command"] = self._pytestconfig.getoption(
-                "tmux_window_command"
-            )
-        if self._pytestconfig.getoption("tmux_window_width"):
-            self._config["x"] = self._pytestconfig.getoption("tmux_window_width")
-        if self._pytestconfig.getoption("tmux_window_height"):
-            self._config["y"] = self._pytestconfig.getoption("tmux_window_height")
-        return self._config.get(key, None)
+        return self.snapshot().get(key, None)
 
 
 class TmuxConfigAssert(TmuxConfig):
@@ -232,30 +349,34 @@ class TmuxConfigAssert(TmuxConfig):
 
           - [pytest_tmux.client.TmuxClient.screen][pytest_tmux.client.TmuxClient.screen]
           - [pytest_tmux.client.TmuxClient.row][pytest_tmux.client.TmuxClient.row]
+          - [pytest_tmux.client.TmuxClient.rows][pytest_tmux.client.TmuxClient.rows]
+
+        policy (str): how delays between two retries are computed
+            (see [retry][pytest_tmux.output.retry])
+        engine (str): how to wait between two retries:
+
+          - poll: sleep `delay` seconds
+          - control: wake up as soon as the pane output changed, using a
+            tmux control mode client attached to the session
     """
 
+    _section = "assertion"
+
     def _default(self) -> None:
         if TYPE_CHECKING:
             assert isinstance(self._config, dict)
             assert isinstance(self._assertion_cfg_fixture, dict)
             assert isinstance(self._request, pytest.FixtureRequest)
-        self._config.update({"timeout": 2, "delay": 0.5})
+        self._config.update(
+            {"timeout": 2, "delay": 0.5, "engine": "poll", "policy": "fixed"}
+        )
         self._config.update(self._assertion_cfg_fixture or {})
         marker = self._request.node.get_closest_marker("tmux_assertion_cfg")
         if marker:
             self._config.update(marker.kwargs)
 
     def __getattr__(self, key: str) -> str:
-        if TYPE_CHECKING:
-            assert isinstance(self._config, dict)
-            assert isinstance(self._pytestconfig, pytest.Config)
-        if self._pytestconfig.getoption("tmux_assertion_timeout"):
-            self._config["timeout"] = self._pytestconfig.getoption(
-                "tmux_assertion_timeout"
-            )
-        if self._pytestconfig.getoption("tmux_assertion_delay"):
-            self._config["delay"] = self._pytestconfig.getoption("tmux_assertion_delay")
-        return self._config.get(key, None)
+        return self.snapshot().get(key, None)
 
 
 class TmuxConfigPlugin(TmuxConfig):
@@ -272,17 +393,53 @@ class TmuxConfigPlugin(TmuxConfig):
 
     Attributes:
         debug (bool):  pytest-tmux debug setting
+        transport (str): how commands are sent to the tmux server:
+
+          - subprocess: one tmux process per command
+          - control: one long-lived tmux control mode client
+        session_pool (int): number of idle sessions spawned ahead of time
+            with the session cmd args, a test who overrides its session
+            settings gets a new session (0 to disable)
+        warmup (bool): start the tmux server in background during the
+            collection
+        diff_context (int): number of common lines displayed around each
+            difference of a failed assertion (-1 to display every line)
+        diff_max_lines (int): maximum number of screen lines displayed in
+            a failed assertion report (0 for no limit)
+        stats (str): record the tmux operations of each test and report
+            them in the terminal summary, and in this JSON file if not empty
+            (None to disable)
+        durations (int): report the N slowest assertions with their
+            location (0 for every assertion, None to disable)
+        trace (str): write a timeline of the tmux interactions to this
+            Trace Event Format JSON file (None to disable)
+        snapshot_update (bool): rewrite the
+            [snapshots][pytest_tmux.client.TmuxClient.snapshot] who do not
+            exist or do not match
+        stream (bool): log the pane output from the session creation for
+            [stream][pytest_tmux.client.TmuxClient.stream]
     """
 
+    _section = "plugin"
+
     def _default(self) -> None:
         if TYPE_CHECKING:
             assert isinstance(self._config, dict)
-        self._config.update({"debug": False})
+        self._config.update(
+            {
+                "debug": False,
+                "transport": "subprocess",
+                "session_pool": 0,
+                "warmup": False,
+                "diff_context": 3,
+                "diff_max_lines": 200,
+                "stats": None,
+                "durations": None,
+                "trace": None,
+                "snapshot_update": False,
+                "stream": False,
+            }
+        )
 
     def __getattr__(self, key: str) -> str:
-        if TYPE_CHECKING:
-            assert isinstance(self._config, dict)
-            assert isinstance(self._pytestconfig, pytest.Config)
-        if self._pytestconfig.getoption("tmux_debug"):
-            self._config["debug"] = self._pytestconfig.getoption("tmux_debug")
-        return self._config.get(key, None)
+        return self.snapshot().get(key, None)
@@ -0,0 +1,515 @@
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import threading
+from collections import deque
+from time import sleep
+from typing import TYPE_CHECKING
+
+from libtmux.server import Server as TmuxServer
+
+if TYPE_CHECKING:
+    from typing import Any, Deque, Dict, List, Optional, Sequence, Union
+
+    import libtmux
+
+# Commands whose result depends on the client who sent them (working
+# directory, environment) are never sent through a control mode client
+CLIENT_COMMANDS = (
+    "new-session",
+    "new-window",
+    "split-window",
+    "respawn-pane",
+    "respawn-window",
+    "kill-server",
+)
+
+
+def parse_commands(args: Sequence[Union[str, int]]) -> List[List[str]]:
+    """
+    Split arguments into commands the way tmux parses its command line: an
+    argument ending with ";" ends a command (a trailing "\\;" is kept as a
+    literal ";") and empty commands are skipped.
+
+    Args:
+        args: a command and its arguments, several commands could be chained
+            with ";"
+
+    Returns:
+        the arguments of each chained command
+    """
+    parsed = []  # type: List[List[str]]
+    command = []  # type: List[str]
+    for arg in map(str, args):
+        if arg.endswith("\\;"):
+            command.append(arg[:-2] + ";")
+        elif arg.endswith(";"):
+            if arg[:-1]:
+                command.append(arg[:-1])
+            if command:
+                parsed.append(command)
+                command = []
+        else:
+            command.append(arg)
+    if command:
+        parsed.append(command)
+    return parsed
+
+
+def commands(args: Sequence[Union[str, int]]) -> List[str]:
+    """
+    Args:
+        args: a command and its arguments, several commands could be chained
+            with ";"
+
+    Returns:
+        the name of each chained command
+    """
+    return [command[0] for command in parse_commands(args)]
+
+
+def server_args(server: libtmux.server.Server) -> List[str]:
+    """
+    Build the tmux client flags needed to reach the same server as
+    libtmux.server.Server.cmd()
+
+    Args:
+        server: a libtmux.server.Server object
+
+    Returns:
+        a list of tmux client flags
+    """
+    args = []
+    if server.socket_name:
+        args.append(f"-L{server.socket_name}")
+    if server.socket_path:
+        args.append(f"-S{server.socket_path}")
+    if server.config_file:
+        args.append(f"-f{server.config_file}")
+    if server.colors == 256:
+        args.append("-2")
+    elif server.colors == 88:
+        args.append("-8")
+    return args
+
+
+def quote(arg: Union[str, int]) -> str:
+    """
+    Quote an argument for the tmux command parser.
+
+    Args:
+        arg: a tmux command argument, taken literally (";" included)
+
+    Returns:
+        the quoted argument
+    """
+    return "'{}'".format(str(arg).replace("'", "'\\''"))
+
+
+class TmuxControlResult:
+    """
+    Result of a command sent through a [TmuxControl][pytest_tmux.control.TmuxControl]
+    client, with the same attributes as libtmux.common.tmux_cmd
+
+    Args:
+        cmd: the command sent
+        count: number of commands chained with ";"
+    """
+
+    def __init__(self, cmd: List[str], count: int) -> None:
+        self.cmd = cmd
+        self.stdout = []  # type: List[str]
+        self.stderr = []  # type: List[str]
+        self.returncode = 0
+        self._count = count
+        self._done = threading.Event()
+
+    def _block(self, lines: List[str], error: bool) -> None:
+        if error:
+            self.stderr.extend(filter(None, lines))
+            self.returncode = 1
+        else:
+            self.stdout.extend(lines)
+        self._count -= 1
+        # tmux skip the remaining commands of a list when one failed
+        if error or self._count <= 0:
+            self._finish()
+
+    def _abort(self) -> None:
+        self.stderr.append("tmux control mode client exited")
+        self.returncode = 1
+        self._finish()
+
+    def _finish(self) -> None:
+        while self.stdout and self.stdout[-1] == "":
+            self.stdout.pop()
+        if "has-session" in self.cmd and self.stderr and not self.stdout:
+            self.stdout = [self.stderr[0]]
+        self._done.set()
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Args:
+            timeout: how long to wait for the result
+
+        Returns:
+            whether the result was received (or the client exited)
+        """
+        return self._done.wait(timeout)
+
+
+class TmuxControl:
+    """
+    A tmux control mode client (`tmux -C`) attached to a session.
+
+    A reader thread consumes the notifications sent by tmux and keeps a
+    counter of `%output` notifications per pane, which allows to wait for a
+    pane to change instead of sleeping.
+
+    Commands could also be sent through the client with
+    [cmd][pytest_tmux.control.TmuxControl.cmd], which avoid to spawn a tmux
+    process for each of them.
+
+    Args:
+        server: a libtmux.server.Server object
+        target: the session to attach the control client to
+        timeout: how long to wait for the client to be attached or for the
+            result of a command
+        create: create the session if it does not exist
+    """
+
+    def __init__(
+        self,
+        server: libtmux.server.Server,
+        target: str,
+        timeout: float = 5,
+        create: bool = False,
+    ) -> None:
+        self._server = server
+        self._target = target
+        self._timeout = timeout
+        self._create = create
+        self._lock = threading.Lock()
+        self._pending = deque()  # type: Deque[TmuxControlResult]
+        self._block = None  # type: Optional[List[str]]
+        self._block_id = ""
+        self._process = None  # type: Optional[subprocess.Popen[bytes]]
+        self._reader = None  # type: Optional[threading.Thread]
+        self._ready = threading.Event()
+        self._changed = threading.Condition()
+        self._outputs = {}  # type: Dict[str, int]
+        self._alive = False
+
+    def start(self) -> TmuxControl:
+        """
+        Spawn the control mode client and wait for it to be attached.
+
+        Returns:
+            the [TmuxControl][pytest_tmux.control.TmuxControl] instance
+        """
+        tmux_bin = shutil.which("tmux")
+        if tmux_bin is None:
+            return self
+        env = os.environ.copy()
+        env.pop("TMUX", None)
+        self._process = subprocess.Popen(
+            [tmux_bin, *server_args(self._server), "-C", *self._command()],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env,
+        )
+        self._alive = True
+        self._reader = threading.Thread(
+            target=self._read, name="pytest-tmux-control", daemon=True
+        )
+        self._reader.start()
+        if not self._ready.wait(self._timeout):
+            self.close()
+        return self
+
+    def _command(self) -> List[str]:
+        if self._create:
+            # cat keeps the session alive without starting a shell
+            return ["new-session", "-A", "-s", self._target, "cat"]
+        return ["attach-session", "-t", self._target]
+
+    @property
+    def alive(self) -> bool:
+        """
+        Whether the control mode client is attached and still running
+        """
+        return self._alive
+
+    def outputs(self, pane_id: str) -> int:
+        """
+        Args:
+            pane_id: a tmux pane id (ex: %1)
+
+        Returns:
+            the number of `%output` notifications received for the pane
+        """
+        with self._changed:
+            return self._outputs.get(pane_id, 0)
+
+    def wait_output(self, pane_id: str, seen: int, timeout: float) -> int:
+        """
+        Block until the pane produced output since `seen` or until timeout.
+
+        Args:
+            pane_id: a tmux pane id (ex: %1)
+            seen: the last output counter known by the caller
+            timeout: how long to wait for new output
+
+        Returns:
+            the actual output counter of the pane
+        """
+        with self._changed:
+            self._changed.wait_for(
+                lambda: not self._alive or self._outputs.get(pane_id, 0) != seen,
+                timeout,
+            )
+            return self._outputs.get(pane_id, 0)
+
+    def cmd(self, *args: Union[str, int]) -> Optional[TmuxControlResult]:
+        """
+        Send a command through the control mode client and wait for its result.
+
+        Args:
+            args: the command and its arguments, several commands could be
+                chained with ";"
+
+        Returns:
+            a [TmuxControlResult][pytest_tmux.control.TmuxControlResult]
+            instance or None if the command could not be sent or its result
+            was not received in time (the client is then closed)
+        """
+        cmd = [str(arg) for arg in args]
+        parsed = parse_commands(cmd)
+        if not parsed or any("\n" in arg for arg in cmd):
+            return None
+        # every argument is quoted, the only separators are the ones added
+        # here so tmux answers with one block per command
+        result = TmuxControlResult(cmd, len(parsed))
+        line = " ; ".join(" ".join(map(quote, command)) for command in parsed)
+        with self._lock:
+            process = self._process
+            if not self._alive or process is None or process.stdin is None:
+                return None
+            self._pending.append(result)
+            try:
+                process.stdin.write(f"{line}\n".encode("utf-8"))
+                process.stdin.flush()
+            except OSError:
+                self._pending.remove(result)
+                return None
+        if not result.wait(self._timeout):
+            # the next blocks can not be matched with their commands anymore
+            self.close()
+            return None
+        return result
+
+    def waiter(self, pane_id: str) -> TmuxControlWaiter:
+        """
+        Args:
+            pane_id: a tmux pane id (ex: %1)
+
+        Returns:
+            a [TmuxControlWaiter][pytest_tmux.control.TmuxControlWaiter] instance
+        """
+        return TmuxControlWaiter(self, pane_id)
+
+    def close(self) -> None:
+        """
+        Detach the control mode client and wait for it to exit.
+        """
+        process = self._process
+        self._process = None
+        if process is not None:
+            try:
+                assert process.stdin is not None
+                process.stdin.close()
+            except OSError:
+                pass
+            try:
+                process.wait(self._timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        if self._reader is not None and self._reader is not threading.current_thread():
+            self._reader.join(self._timeout)
+        self._stop()
+
+    def _stop(self) -> None:
+        with self._lock:
+            self._alive = False
+            while self._pending:
+                self._pending.popleft()._abort()
+        with self._changed:
+            self._changed.notify_all()
+        self._ready.set()
+
+    def _read(self) -> None:
+        assert self._process is not None and self._process.stdout is not None
+        try:
+            for raw in self._process.stdout:
+                self._notify(raw.decode("utf-8", "replace").rstrip("\n"))
+        finally:
+            self._stop()
+
+    def _notify(self, line: str) -> None:
+        if self._block is not None:
+            if line.startswith(("%end ", "%error ")) and line.split(" ", 1)[1] == (
+                self._block_id
+            ):
+                self._result(self._block, line.startswith("%error "))
+                self._block = None
+            else:
+                self._block.append(line)
+        elif line.startswith("%begin "):
+            self._block_id = line.split(" ", 1)[1]
+            self._block = []
+        elif line.startswith("%output "):
+            pane_id = line.split(" ", 2)[1]
+            with self._changed:
+                self._outputs[pane_id] = self._outputs.get(pane_id, 0) + 1
+                self._changed.notify_all()
+        elif line.startswith("%exit"):
+            self._stop()
+
+    def _result(self, lines: List[str], error: bool) -> None:
+        # Blocks whose flags is not 1 are not answers to our commands
+        if not self._block_id.endswith(" 1"):
+            if not self._ready.is_set():
+                if error:
+                    self._stop()
+                self._ready.set()
+            return
+        with self._lock:
+            result = self._pending[0] if self._pending else None
+        if result is None:
+            return
+        result._block(lines, error)
+        if result._done.is_set():
+            with self._lock:
+                self._pending.popleft()
+
+
+class TmuxControlWaiter:
+    """
+    Callable used by [retry][pytest_tmux.output.retry] instead of sleep.
+
+    Each call blocks until the pane produced output since the previous call
+    (or the creation of the waiter), or until the timeout expired.
+
+    Args:
+        control: a [TmuxControl][pytest_tmux.control.TmuxControl] instance
+        pane_id: a tmux pane id (ex: %1)
+    """
+
+    def __init__(self, control: TmuxControl, pane_id: str) -> None:
+        self._control = control
+        self._pane_id = pane_id
+        self._seen = control.outputs(pane_id)
+
+    def __call__(self, timeout: float) -> bool:
+        """
+        Args:
+            timeout: how long to wait for the pane to change
+
+        Returns:
+            True if the pane changed (or if the control client is gone),
+            False otherwise
+        """
+        if not self._control.alive:
+            sleep(timeout)
+            return True
+        seen = self._control.wait_output(self._pane_id, self._seen, timeout)
+        changed = seen != self._seen
+        self._seen = seen
+        return changed or not self._control.alive
+
+
+class TmuxControlServer(TmuxServer):
+    """
+    A libtmux.server.Server who send its commands through one long-lived
+    [TmuxControl][pytest_tmux.control.TmuxControl] client instead of
+    spawning a tmux process for each of them.
+
+    The control client is attached to a dedicated session, started on the
+    first command. Commands fallback to libtmux.server.Server.cmd() when the
+    client is not available or when one of the chained commands is in
+    [CLIENT_COMMANDS][pytest_tmux.control.CLIENT_COMMANDS].
+
+    The dedicated session runs `cat` while the server lives: tmux has no
+    hidden session, so it is listed by `tmux list-sessions` but excluded
+    from `sessions`, `windows` and `panes`.
+
+    Args:
+        control_session: name of the session used by the control client
+        **kwargs: All args accepted by libtmux.server.Server()
+    """
+
+    def __init__(
+        self, control_session: str = "pytest_tmux_control", **kwargs: Any
+    ) -> None:
+        super().__init__(**kwargs)
+        self._control_session = control_session
+        self._control = None  # type: Optional[TmuxControl]
+
+    @property
+    def control(self) -> TmuxControl:
+        """
+        The control mode client used to send commands.
+
+        The client is started on the first call who need it.
+
+        Returns:
+            a [TmuxControl][pytest_tmux.control.TmuxControl] object
+        """
+        if self._control is None:
+            self._control = TmuxControl(self, self._control_session, create=True)
+            self._control.start()
+        return self._control
+
+    def cmd(self, *args: Any, **kwargs: Any) -> Any:
+        if (
+            args
+            and not kwargs
+            and not any(name in CLIENT_COMMANDS for name in commands(args))
+        ):
+            result = self.control.cmd(*args)
+            if result is not None:
+                return result
+        return super().cmd(*args, **kwargs)
+
+    @property
+    def sessions(self) -> Any:
+        return super().sessions.filter(
+            lambda session: session.session_name != self._control_session
+        )
+
+    @property
+    def windows(self) -> Any:
+        return super().windows.filter(
+            lambda window: window.session_name != self._control_session
+        )
+
+    @property
+    def panes(self) -> Any:
+        return super().panes.filter(
+            lambda pane: pane.session_name != self._control_session
+        )
+
+    def close(self) -> None:
+        """
+        Detach the control mode client.
+        """
+        if self._control is not None:
+            self._control.close()
+
+    def kill_server(self) -> None:
+        self.close()
+        super().kill_server()
@@ -4,11 +4,17 @@ from typing import TYPE_CHECKING
 
 import pytest
 
-from pytest_tmux.client import TmuxClient
+from pytest_tmux.trace import span
 
 if TYPE_CHECKING:
     from typing import Dict, Generator, Union
 
+    from pytest_tmux.async_client import AsyncTmuxClient
+    from pytest_tmux.client import TmuxClient
+
+# The clients (and libtmux) are imported by the fixtures on their first
+# setup, so the plugin loading stays cheap for sessions who never use tmux
+
 
 @pytest.fixture(scope="session")
 def tmux_server_config() -> Dict[str, Union[str, int]]:
@@ -49,6 +55,7 @@ def tmux_assertion_config() -> Dict[str, Union[str, int]]:
 
           - [pytest_tmux.client.TmuxClient.screen][pytest_tmux.client.TmuxClient.screen]
           - [pytest_tmux.client.TmuxClient.row][pytest_tmux.client.TmuxClient.row]
+          - [pytest_tmux.client.TmuxClient.rows][pytest_tmux.client.TmuxClient.rows]
     """
     return {}
 
@@ -69,17 +76,32 @@ def _tmux_server(
         A [pytest_tmux.client.TmuxClient][pytest_tmux.client.TmuxClient] object
     """
 
-    tmux_server = TmuxClient(
-        tmpdir_factory=tmpdir_factory,
-        request=request,
-        pytestconfig=pytestconfig,
-        server_cfg_fixture=tmux_server_config,
-    )
+    from pytest_tmux.client import TmuxClient
+
+    plugin = pytestconfig.pluginmanager.getplugin("tmux")
+    trace = getattr(plugin, "trace", None)
+
+    with span(trace, "_tmux_server setup", "fixture"):
+        tmux_server = TmuxClient(
+            tmpdir_factory=tmpdir_factory,
+            request=request,
+            pytestconfig=pytestconfig,
+            server_cfg_fixture=tmux_server_config,
+        )
+
+        if plugin is not None and plugin.warmup is not None:
+            server, pool = plugin.warmup.take(tmux_server.config.server)
+            if server is not None:
+                tmux_server._server = server
+                tmux_server._pool = pool
 
     yield tmux_server
 
-    if tmux_server.server:
-        tmux_server.server.kill_server()
+    with span(trace, "_tmux_server teardown", "fixture"):
+        if tmux_server._pool is not None:
+            tmux_server._pool.close()
+        if tmux_server.server:
+            tmux_server.server.kill_server()
 
 
 @pytest.fixture()
@@ -100,23 +122,50 @@ def tmux(
         A [pytest_tmux.client.TmuxClient][pytest_tmux.client.TmuxClient] object
     """
 
-    tmux_client = TmuxClient(
-        request=request,
-        pytestconfig=pytestconfig,
-        tmpdir_factory=tmpdir_factory,
-        server=_tmux_server.server,
-        server_cfg_fixture=_tmux_server._server_cfg_fixture,
-        session_cfg_fixture=tmux_session_config,
-        assertion_cfg_fixture=tmux_assertion_config,
-    )
+    from pytest_tmux.client import TmuxClient
+
+    trace = getattr(pytestconfig.pluginmanager.getplugin("tmux"), "trace", None)
+
+    with span(trace, "tmux setup", "fixture"):
+        tmux_client = TmuxClient(
+            request=request,
+            pytestconfig=pytestconfig,
+            tmpdir_factory=tmpdir_factory,
+            server=_tmux_server.server,
+            server_cfg_fixture=_tmux_server._server_cfg_fixture,
+            session_cfg_fixture=tmux_session_config,
+            assertion_cfg_fixture=tmux_assertion_config,
+            pool=_tmux_server.pool,
+        )
 
     yield tmux_client
 
-    if tmux_client:
-        if tmux_client.sessions > 0:
-            tmux_client.debug(
-                """
-                Closing session
-                """
-            )
-            tmux_client.session.kill_session()
+    with span(trace, "tmux teardown", "fixture"):
+        if tmux_client:
+            if tmux_client.sessions > 0:
+                tmux_client.debug(
+                    """
+                    Closing session
+                    """
+                )
+                if tmux_client._control is not None:
+                    tmux_client._control.close()
+                if tmux_client._stream is not None:
+                    tmux_client._stream.close()
+                tmux_client.session.kill_session()
+
+
+@pytest.fixture()
+def atmux(tmux: TmuxClient) -> AsyncTmuxClient:
+    """
+    Fixture intended to be used with asyncio tests (ex: with pytest-asyncio),
+    driving the session of the [tmux][pytest_tmux.fixtures.tmux] fixture
+
+    Scope: function
+
+    Returns:
+        A [pytest_tmux.async_client.AsyncTmuxClient][pytest_tmux.async_client.AsyncTmuxClient] object
+    """
+    from pytest_tmux.async_client import AsyncTmuxClient
+
+    return AsyncTmuxClient(tmux)
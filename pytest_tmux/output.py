@@ -1,29 +1,147 @@
 from __future__ import annotations
 
-from datetime import datetime
-from functools import wraps
-from time import sleep
-from typing import Any, Callable, TypeVar, Union, cast
+import re
+from functools import lru_cache, partial, wraps
+from time import monotonic, sleep
+from typing import TYPE_CHECKING, Any, Callable, Optional, TypeVar, Union, cast
+
+from pytest_tmux.snapshot import TmuxSnapshot
+
+if TYPE_CHECKING:
+    from typing import Iterator, List, Match, Pattern
 
 TRetry = TypeVar("TRetry", bound=Callable[..., bool])
 
+POLICIES = ("fixed", "adaptive")
+"""Available [retry][pytest_tmux.output.retry] policies"""
+
+ADAPTIVE_FIRST_DELAY = 0.005
+"""First delay used by the adaptive policy, doubled on each retry"""
+
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern: str, flags: int = 0) -> Pattern[str]:
+    """
+    re.compile() with a cache kept for the whole test session
+
+    Args:
+        pattern: a regular expression
+        flags: flags given to re.compile()
+
+    Returns:
+        the compiled regular expression
+    """
+    return re.compile(pattern, flags)
+
 
 class retry(object):
-    def __init__(self, timeout: Union[int, float], delay: Union[int, float]) -> None:
+    """
+    Retry a function until it returns something else than False
+
+    The timeout is computed with a monotonic clock and the last wait is
+    shortened to never go past it.
+
+    Args:
+        timeout: how long to retry before giving up
+        delay: how long to wait between two calls
+        wait: function called with the delay between two calls instead of
+            sleep. When it returns False, nothing changed and the function
+            is not called again until the next wait.
+        policy: how delays between two calls are computed:
+
+          - fixed: always wait `delay`
+          - adaptive: start with 5ms, doubled on each retry up to `delay`
+        record: function called with the name and the duration of each
+            call (poll), each wait (sleep) and of the whole retry (match or
+            timeout, with the number of `polls`, the `timeout` and
+            `last_chance` if the match happened after a wait shortened by
+            the timeout), see [TmuxStats][pytest_tmux.stats.TmuxStats]
+    """
+
+    def __init__(
+        self,
+        timeout: Union[int, float],
+        delay: Union[int, float],
+        wait: Optional[Callable[[float], Optional[bool]]] = None,
+        policy: str = "fixed",
+        record: Optional[Callable[..., None]] = None,
+    ) -> None:
         assert isinstance(timeout, (int, float))
         assert isinstance(delay, (int, float))
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown retry policy '{policy}'")
         self.timeout = timeout
         self.delay = delay
+        self.wait = wait or sleep
+        self.policy = policy
+        self.record = record
+
+    def delays(self) -> Iterator[float]:
+        """
+        Returns:
+            the delays to wait between two calls according to the policy
+        """
+        if self.policy == "adaptive":
+            delay = ADAPTIVE_FIRST_DELAY
+            while delay < self.delay:
+                yield delay
+                delay *= 2
+        while True:
+            yield self.delay
 
     def __call__(self, func: TRetry) -> TRetry:
+        record = self.record
+
+        def poll(*args: Any, **kwargs: Any) -> bool:
+            if record is None:
+                return func(*args, **kwargs)
+            start = monotonic()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record("poll", monotonic() - start)
+
+        def wait(delay: float) -> Optional[bool]:
+            if record is None:
+                return self.wait(delay)
+            start = monotonic()
+            try:
+                return self.wait(delay)
+            finally:
+                record("sleep", monotonic() - start)
+
         @wraps(func)
         def wrapped(*args: Any, **kwargs: Any) -> bool:
-            start_time = datetime.now()
-            while func(*args, **kwargs) is False:
-                if (datetime.now() - start_time).total_seconds() <= self.timeout:
-                    sleep(self.delay)
-                else:
-                    return False
+            start = monotonic()
+            deadline = start + self.timeout
+            delays = self.delays()
+            polls = 1
+            last_chance = False
+            while poll(*args, **kwargs) is False:
+                while True:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        if record is not None:
+                            record(
+                                "timeout",
+                                monotonic() - start,
+                                polls=polls,
+                                timeout=self.timeout,
+                            )
+                        return False
+                    delay = next(delays)
+                    last_chance = remaining <= delay
+                    if wait(min(delay, remaining)) is not False:
+                        break
+                polls += 1
+            if record is not None:
+                record(
+                    "match",
+                    monotonic() - start,
+                    polls=polls,
+                    timeout=self.timeout,
+                    last_chance=last_chance,
+                )
             return True
 
         return cast(TRetry, wrapped)
@@ -33,10 +151,32 @@ class TmuxOutput(object):
     """
     Sucharge some operator to add @retry property
 
+    `==`, `!=` and `in` also accept a compiled regular expression, matched
+    with fullmatch() for `==`/`!=` and search() for `in`.
+
+    `==` also accepts a [TmuxSnapshot][pytest_tmux.snapshot.TmuxSnapshot],
+    who is replaced by the last captured value if it still does not match
+    on timeout and the snapshots are updated (`--tmux-snapshot-update`).
+    A snapshot who does not exist yet can not match: it is not retried
+    until the timeout, the value is stored as soon as two captures in a
+    row are equal.
+
+    The value is usually a string, or a list of strings for
+    [screens][pytest_tmux.client.TmuxClient.screens].
+
+    The value is not captured on instantiation but by the first operator
+    call (or the first access to `value`, `str()` or `repr()`).
+
     Args:
         func: function used to get the value to use when required
         timeout: how long to wait for the operator call to fail
         delay: how long before retrying the operator call
+        wait: a function called instead of sleep between two retries
+            (see [retry][pytest_tmux.output.retry])
+        policy: how delays between two retries are computed
+            (see [retry][pytest_tmux.output.retry])
+        record: a function who records the retries
+            (see [retry][pytest_tmux.output.retry])
 
     Returns:
         a [TmuxOutput][pytest_tmux.output.TmuxOutput] instance
@@ -47,11 +187,30 @@ class TmuxOutput(object):
         func: Callable[..., str],
         timeout: Union[int, float],
         delay: Union[int, float],
+        wait: Optional[Callable[[float], Optional[bool]]] = None,
+        policy: str = "fixed",
+        record: Optional[Callable[..., None]] = None,
     ) -> None:
         self.func = func
-        self.value = self.func()
+        self.__value = None  # type: Optional[str]
         self.__timeout = timeout
         self.__delay = delay
+        self.__wait = wait
+        self.__policy = policy
+        self.__record = record
+
+    @property
+    def value(self) -> str:
+        """
+        The last captured value, captured on first access if needed
+        """
+        if self.__value is None:
+            self.__value = self.func()
+        return self.__value
+
+    @value.setter
+    def value(self, value: str) -> None:
+        self.__value = value
 
     def __str__(self) -> str:
         return str(self.value)
@@ -59,26 +218,123 @@ class TmuxOutput(object):
     def __repr__(self) -> str:
         return str(self.value)
 
+    def _retry(self, op: str) -> retry:
+        return retry(
+            timeout=self.__timeout,
+            delay=self.__delay,
+            wait=self.__wait,
+            policy=self.__policy,
+            record=None if self.__record is None else partial(self.__record, op=op),
+        )
+
     def __eq__(self, other: object) -> bool:
-        @retry(timeout=self.__timeout, delay=self.__delay)
+        @self._retry("==")
         def _test() -> bool:
             self.value = self.func()
+            if isinstance(other, re.Pattern):
+                return other.fullmatch(self.value) is not None
             return self.value == other
 
+        if isinstance(other, TmuxSnapshot):
+            if other.text is None:
+                if not other.store.update:
+                    self.value = self.func()
+                    return False
+                self._stable()
+                return other.update(self.value)
+            return _test() or other.update(self.value)
         return _test()
 
+    def _stable(self) -> None:
+        """
+        Capture the value until two captures in a row are equal (or until
+        timeout)
+        """
+        previous = []  # type: List[str]
+
+        @self._retry("stable")
+        def _test() -> bool:
+            self.value = self.func()
+            stable = previous == [self.value]
+            previous[:] = [self.value]
+            return stable
+
+        _test()
+
     def __ne__(self, other: object) -> bool:
-        @retry(timeout=self.__timeout, delay=self.__delay)
+        @self._retry("!=")
         def _test() -> bool:
             self.value = self.func()
+            if isinstance(other, re.Pattern):
+                return other.fullmatch(self.value) is None
             return not self.value == other
 
         return _test()
 
-    def __contains__(self, other: str) -> bool:
-        @retry(timeout=self.__timeout, delay=self.__delay)
+    def __contains__(self, other: Union[str, Pattern[str]]) -> bool:
+        @self._retry("in")
         def _test() -> bool:
             self.value = self.func()
+            if isinstance(other, re.Pattern):
+                return other.search(self.value) is not None
             return other in self.value
 
         return _test()
+
+    def satisfies(self, predicate: Callable[[str], Any]) -> Any:
+        """
+        Retry until `predicate` returns a true value for the output
+
+        Args:
+            predicate: a function called with the captured value
+
+        Returns:
+            the last value returned by the predicate
+        """
+        return self._satisfies(predicate, "satisfies")
+
+    def _satisfies(self, predicate: Callable[[str], Any], op: str) -> Any:
+        result = []  # type: List[Any]
+
+        @self._retry(op)
+        def _test() -> bool:
+            self.value = self.func()
+            result[:] = [predicate(self.value)]
+            return bool(result[0])
+
+        _test()
+        return result[0] if result else None
+
+    def matches(
+        self, pattern: Union[str, Pattern[str]], flags: int = 0
+    ) -> Optional[Match[str]]:
+        """
+        Retry until the output matches `pattern` from its start (re.match())
+
+        Args:
+            pattern: a regular expression, compiled or not
+            flags: flags used to compile the regular expression
+
+        Returns:
+            the match object, or None
+        """
+        if isinstance(pattern, str):
+            pattern = compile_pattern(pattern, flags)
+        return cast("Optional[Match[str]]", self._satisfies(pattern.match, "matches"))
+
+    def search(
+        self, pattern: Union[str, Pattern[str]], flags: int = 0
+    ) -> Optional[Match[str]]:
+        """
+        Retry until `pattern` is found anywhere in the output (re.search())
+
+        Args:
+            pattern: a regular expression, compiled or not
+            flags: flags used to compile the regular expression
+
+        Returns:
+            the match object, or None
+        """
+        if isinstance(pattern, str):
+            pattern = compile_pattern(pattern, flags)
+        return cast("Optional[Match[str]]", self._satisfies(pattern.search, "search"))
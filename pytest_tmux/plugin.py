@@ -4,21 +4,36 @@ from __future__ import annotations
 import os
 from typing import TYPE_CHECKING
 
+from pytest_tmux.config import TmuxConfigPlugin, parse_options
 from pytest_tmux.fixtures import (
     _tmux_server,
+    atmux,
     tmux,
     tmux_assertion_config,
     tmux_server_config,
     tmux_session_config,
 )
 from pytest_tmux.rewrite import tmux_rewrite
+from pytest_tmux.snapshot import TmuxSnapshots
+from pytest_tmux.stats import TmuxDurations, TmuxStats
+from pytest_tmux.trace import TmuxTrace
 
-(tmux, _tmux_server, tmux_server_config, tmux_session_config, tmux_assertion_config)
+(
+    tmux,
+    atmux,
+    _tmux_server,
+    tmux_server_config,
+    tmux_session_config,
+    tmux_assertion_config,
+)
 
 if TYPE_CHECKING:
     from typing import List, Optional
 
     import pytest
+    from _pytest.terminal import TerminalReporter
+
+    from pytest_tmux.warmup import TmuxWarmup
 
 
 def pytest_addoption(parser: pytest.Parser) -> None:
@@ -33,6 +48,43 @@ def pytest_addoption(parser: pytest.Parser) -> None:
             Env: PYTEST_TMUX_DEBUG
         """,
     )
+    group.addoption(
+        "--tmux-transport",
+        dest="tmux_transport",
+        action="store",
+        choices=("subprocess", "control"),
+        default=os.getenv("PYTEST_TMUX_TRANSPORT", None),
+        help="""
+            How commands are sent to the tmux server (subprocess: one tmux
+            process per command, control: one tmux control mode client)
+            Default: subprocess
+            Env: PYTEST_TMUX_TRANSPORT
+        """,
+    )
+    group.addoption(
+        "--tmux-session-pool",
+        dest="tmux_session_pool",
+        type=int,
+        action="store",
+        default=os.getenv("PYTEST_TMUX_SESSION_POOL", None),
+        help="""
+            Number of idle sessions spawned ahead of time with the session
+            cmd args (tests who change the session settings are not pooled).
+            Default: 0 (disabled)
+            Env: PYTEST_TMUX_SESSION_POOL
+        """,
+    )
+    group.addoption(
+        "--tmux-warmup",
+        dest="tmux_warmup",
+        action="store_true",
+        default=os.getenv("PYTEST_TMUX_WARMUP", False) in ("True", "1"),
+        help="""
+            Start the tmux server in background as soon as a test who use tmux
+            fixture is collected.
+            Env: PYTEST_TMUX_WARMUP
+        """,
+    )
     group.addoption(
         "--tmux-socket-path",
         dest="tmux_socket_path",
@@ -137,6 +189,124 @@ def pytest_addoption(parser: pytest.Parser) -> None:
             Env: PYTEST_TMUX_ASSERTION_DELAY
         """,
     )
+    group.addoption(
+        "--tmux-assertion-policy",
+        dest="tmux_assertion_policy",
+        action="store",
+        choices=("fixed", "adaptive"),
+        default=os.getenv("PYTEST_TMUX_ASSERTION_POLICY", None),
+        help="""
+            How tmux assertion delays are computed (fixed: always wait delay,
+            adaptive: start with 5ms, doubled on each retry up to delay)
+            Default: fixed
+            Env: PYTEST_TMUX_ASSERTION_POLICY
+        """,
+    )
+    group.addoption(
+        "--tmux-assertion-engine",
+        dest="tmux_assertion_engine",
+        action="store",
+        choices=("poll", "control"),
+        default=os.getenv("PYTEST_TMUX_ASSERTION_ENGINE", None),
+        help="""
+            How tmux assertion wait before retrying (poll: sleep delay,
+            control: wake up on pane output through a tmux control mode client)
+            Default: poll
+            Env: PYTEST_TMUX_ASSERTION_ENGINE
+        """,
+    )
+    group.addoption(
+        "--tmux-diff-context",
+        dest="tmux_diff_context",
+        type=int,
+        action="store",
+        default=os.getenv("PYTEST_TMUX_DIFF_CONTEXT", None),
+        help="""
+            Number of common lines displayed around each difference of a
+            failed tmux assertion (-1 to display every line)
+            Default: 3
+            Env: PYTEST_TMUX_DIFF_CONTEXT
+        """,
+    )
+    group.addoption(
+        "--tmux-diff-max-lines",
+        dest="tmux_diff_max_lines",
+        type=int,
+        action="store",
+        default=os.getenv("PYTEST_TMUX_DIFF_MAX_LINES", None),
+        help="""
+            Maximum number of screen lines displayed in a failed tmux
+            assertion report (0 for no limit)
+            Default: 200
+            Env: PYTEST_TMUX_DIFF_MAX_LINES
+        """,
+    )
+    group.addoption(
+        "--tmux-stats",
+        dest="tmux_stats",
+        action="store",
+        nargs="?",
+        const="",
+        metavar="PATH",
+        default=os.getenv("PYTEST_TMUX_STATS", None),
+        help="""
+            Record counts and durations of tmux operations per test, report
+            them in the terminal summary and in the PATH JSON file if given
+            Default: None
+            Env: PYTEST_TMUX_STATS
+        """,
+    )
+    group.addoption(
+        "--tmux-durations",
+        dest="tmux_durations",
+        type=int,
+        action="store",
+        metavar="N",
+        default=os.getenv("PYTEST_TMUX_DURATIONS", None),
+        help="""
+            Report the N slowest tmux assertions with their location and the
+            ones who passed on their last retry (0 for every assertion)
+            Default: None
+            Env: PYTEST_TMUX_DURATIONS
+        """,
+    )
+    group.addoption(
+        "--tmux-trace",
+        dest="tmux_trace",
+        action="store",
+        metavar="PATH",
+        default=os.getenv("PYTEST_TMUX_TRACE", None),
+        help="""
+            Write a timeline of tmux commands, assertions retries, sleeps and
+            fixtures per test to the PATH Trace Event Format JSON file (to be
+            loaded in chrome://tracing or ui.perfetto.dev)
+            Default: None
+            Env: PYTEST_TMUX_TRACE
+        """,
+    )
+    group.addoption(
+        "--tmux-snapshot-update",
+        dest="tmux_snapshot_update",
+        action="store_true",
+        default=os.getenv("PYTEST_TMUX_SNAPSHOT_UPDATE", False) in ("True", "1"),
+        help="""
+            Rewrite the tmux screen snapshots who do not exist or do not match
+            Default: False
+            Env: PYTEST_TMUX_SNAPSHOT_UPDATE
+        """,
+    )
+    group.addoption(
+        "--tmux-stream",
+        dest="tmux_stream",
+        action="store_true",
+        default=os.getenv("PYTEST_TMUX_STREAM", False) in ("True", "1"),
+        help="""
+            Log the pane output from the session creation, so tmux.stream()
+            sees the output written before its first call
+            Default: False
+            Env: PYTEST_TMUX_STREAM
+        """,
+    )
 
 
 def pytest_configure(config: pytest.Config) -> None:
@@ -150,12 +320,83 @@ def pytest_configure(config: pytest.Config) -> None:
 class PyTestTmuxPlugin:
     def __init__(self, config: pytest.Config) -> None:
         self.config = config
+        # cmd args are read once, for every TmuxConfig of the session
+        self.options = parse_options(config)
+        # the plugin settings only come from cmd args (their defaults are
+        # None / False), no need to resolve a TmuxConfigPlugin
+        options = self.options["plugin"]
+        self.warmup = None  # type: Optional[TmuxWarmup]
+        self.stats = None  # type: Optional[TmuxStats]
+        if options.get("stats") is not None:
+            self.stats = TmuxStats()
+        self.durations = None  # type: Optional[TmuxDurations]
+        if options.get("durations") is not None:
+            self.durations = TmuxDurations(int(options["durations"]))
+        self.trace = None  # type: Optional[TmuxTrace]
+        if options.get("trace"):
+            self.trace = TmuxTrace()
+        self.snapshots = TmuxSnapshots(update=bool(options.get("snapshot_update")))
+
+    def pytest_itemcollected(self, item: pytest.Item) -> None:
+        if self.warmup is not None:
+            return
+        if "tmux" not in getattr(item, "fixturenames", ()):
+            return
+        if self.options["plugin"].get("warmup"):
+            # Imported only when needed, it loads the client and libtmux
+            from pytest_tmux.warmup import TmuxWarmup
+
+            self.warmup = TmuxWarmup(self.config)
+            self.warmup.start()
+
+    def pytest_runtest_logstart(self, nodeid: str) -> None:
+        if self.trace is not None:
+            self.trace.test(nodeid)
+
+    def pytest_runtest_logfinish(self) -> None:
+        if self.trace is not None:
+            self.trace.test(None)
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        if self.stats is not None:
+            self.stats.duration(report.nodeid, report.duration)
+
+    def pytest_sessionfinish(self) -> None:
+        if self.warmup is not None:
+            self.warmup.close()
+        path = self.options["plugin"].get("stats")
+        if self.stats is not None and path:
+            self.stats.dump(path)
+        if self.trace is not None:
+            self.trace.dump(str(self.options["plugin"]["trace"]))
+        self.snapshots.save()
+
+    def pytest_terminal_summary(self, terminalreporter: TerminalReporter) -> None:
+        if self.stats is not None and self.stats.tests:
+            terminalreporter.section("tmux stats")
+            for line in self.stats.summary():
+                terminalreporter.write_line(line)
+        if self.durations is not None and self.durations.assertions:
+            terminalreporter.section("tmux durations")
+            for line in self.durations.summary():
+                terminalreporter.write_line(line)
+        if self.snapshots.updated:
+            terminalreporter.section("tmux snapshots")
+            for index, key in self.snapshots.updated:
+                terminalreporter.write_line(f"updated {key} ({index})")
 
 
 def pytest_assertrepr_compare(
-    op: str, left: object, right: object
+    config: pytest.Config, op: str, left: object, right: object
 ) -> Optional[List[str]]:
     if type(left).__name__ == "TmuxOutput" or type(right).__name__ == "TmuxOutput":
-        return tmux_rewrite(op, left, right)
+        plugin_config = TmuxConfigPlugin(pytestconfig=config)
+        return tmux_rewrite(
+            op,
+            left,
+            right,
+            context=int(plugin_config.diff_context),
+            max_lines=int(plugin_config.diff_max_lines),
+        )
     else:
         return None
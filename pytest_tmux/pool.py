@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import threading
+from collections import deque
+from itertools import count
+from queue import Queue
+from typing import TYPE_CHECKING
+
+from libtmux.exc import LibTmuxException
+from libtmux.server import Server as TmuxServer
+from libtmux.session import Session as TmuxSession
+
+if TYPE_CHECKING:
+    from typing import Any, Deque, Dict, Mapping, Optional, Tuple
+
+    import libtmux
+
+    from pytest_tmux.trace import TmuxTrace
+
+    TmuxPoolKey = Tuple[Tuple[str, str], ...]
+
+# Session settings who only give a name to the session, every other settings
+# change how the session is spawned and are part of the pool key
+NAME_SETTINGS = ("session_name", "window_name")
+
+
+class TmuxSessionPool:
+    """
+    Keep idle tmux sessions spawned ahead of time.
+
+    Sessions are grouped by the settings used to spawn them (everything but
+    their names). Only the settings given to
+    [fill][pytest_tmux.pool.TmuxSessionPool.fill] (the session cmd args) are
+    pooled: when a session is requested with them, an idle one is renamed
+    and returned and a background thread spawns a new one. Sessions
+    requested with any other settings (ex: a `window_command` set by a test)
+    are created on demand, so their command is never run ahead of time.
+
+    Sessions are never reused: the caller kills a session when its test is
+    done.
+
+    The background thread spawns sessions through its own
+    libtmux.server.Server on the same socket, so it does not interfere with
+    the commands sent by the tests.
+
+    Args:
+        server: a libtmux.server.Server object
+        size: number of idle sessions to keep for the pooled settings
+        trace: a [TmuxTrace][pytest_tmux.trace.TmuxTrace] who records the
+            commands of the background thread
+    """
+
+    def __init__(
+        self,
+        server: libtmux.server.Server,
+        size: int,
+        trace: Optional[TmuxTrace] = None,
+    ) -> None:
+        self._server = server
+        self._size = size
+        self._trace = trace
+        self._lock = threading.Lock()
+        self._idle = {}  # type: Dict[TmuxPoolKey, Deque[str]]
+        self._spawning = {}  # type: Dict[TmuxPoolKey, int]
+        self._settings = {}  # type: Dict[TmuxPoolKey, Dict[str, Any]]
+        self._names = count()
+        self._queue = Queue()  # type: Queue[Optional[TmuxPoolKey]]
+        self._worker = None  # type: Optional[threading.Thread]
+        self._closed = False
+
+    @staticmethod
+    def key(settings: Mapping[str, Any]) -> TmuxPoolKey:
+        """
+        Args:
+            settings: args given to libtmux.server.Server.new_session()
+
+        Returns:
+            the key of the sessions spawned with these settings
+        """
+        return tuple(
+            sorted(
+                (k, str(v))
+                for k, v in settings.items()
+                if k not in NAME_SETTINGS and v is not None
+            )
+        )
+
+    def session(self, settings: Mapping[str, Any]) -> libtmux.session.Session:
+        """
+        Get a session spawned with `settings`, from the pool if these
+        settings are pooled.
+
+        Args:
+            settings: args given to libtmux.server.Server.new_session()
+
+        Returns:
+            a libtmux.session.Session object
+        """
+        settings = dict(settings)
+        key = self.key(settings)
+        with self._lock:
+            idle = self._idle.get(key)
+        if idle is None:
+            return self._server.new_session(**settings)
+        session = None
+        while session is None:
+            with self._lock:
+                session_id = idle.popleft() if idle else None
+            if session_id is None:
+                break
+            session = self._checkout(session_id, settings)
+        if session is None:
+            session = self._server.new_session(**settings)
+        self._refill(key)
+        return session
+
+    def fill(self, settings: Mapping[str, Any]) -> None:
+        """
+        Pool the sessions spawned with `settings` and spawn idle ones in the
+        background, before any session is requested.
+
+        Args:
+            settings: args given to libtmux.server.Server.new_session()
+        """
+        settings = dict(settings)
+        key = self.key(settings)
+        with self._lock:
+            self._settings.setdefault(
+                key, {k: v for k, v in settings.items() if k not in NAME_SETTINGS}
+            )
+            self._idle.setdefault(key, deque())
+        self._refill(key)
+
+    def _checkout(
+        self, session_id: str, settings: Mapping[str, Any]
+    ) -> Optional[libtmux.session.Session]:
+        args = []
+        if settings.get("session_name"):
+            args += ["rename-session", "-t", session_id, settings["session_name"]]
+        if settings.get("window_name"):
+            args += [";"] if args else []
+            args += ["rename-window", "-t", f"{session_id}:", settings["window_name"]]
+        if args:
+            proc = self._server.cmd(*args)
+            if proc.stderr:
+                self._kill(session_id)
+                return None
+        try:
+            return TmuxSession.from_session_id(self._server, session_id)
+        except (LibTmuxException, ValueError):
+            return None
+
+    def _name(self) -> str:
+        return f"pytest_tmux_pool_{id(self):x}_{next(self._names)}"
+
+    def _refill(self, key: TmuxPoolKey) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._work, name="pytest-tmux-pool", daemon=True
+                )
+                self._worker.start()
+        self._queue.put(key)
+
+    def _work(self) -> None:
+        server = TmuxServer(
+            socket_name=self._server.socket_name,
+            socket_path=self._server.socket_path,
+            config_file=self._server.config_file,
+            colors=self._server.colors,
+        )
+        if self._trace is not None:
+            self._trace.server(server)
+        while True:
+            key = self._queue.get()
+            if key is None:
+                return
+            while True:
+                with self._lock:
+                    missing = self._size - len(self._idle[key])
+                    missing -= self._spawning.get(key, 0)
+                    if self._closed or missing <= 0:
+                        break
+                    self._spawning[key] = self._spawning.get(key, 0) + 1
+                try:
+                    session = server.new_session(
+                        session_name=self._name(), **self._settings[key]
+                    )
+                except LibTmuxException:
+                    session = None
+                with self._lock:
+                    self._spawning[key] -= 1
+                    if session is None:
+                        break
+                    self._idle[key].append(str(session.session_id))
+
+    def _kill(self, session_id: str) -> None:
+        self._server.cmd("kill-session", "-t", session_id)
+
+    def close(self) -> None:
+        """
+        Stop refilling the pool and kill idle sessions.
+        """
+        with self._lock:
+            self._closed = True
+            worker = self._worker
+        if worker is not None:
+            self._queue.put(None)
+            worker.join()
+        with self._lock:
+            idle = [session_id for ids in self._idle.values() for session_id in ids]
+            self._idle.clear()
+        for session_id in idle:
+            self._kill(session_id)
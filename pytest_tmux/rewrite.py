@@ -1,54 +1,186 @@
 from __future__ import annotations
 
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+from itertools import zip_longest
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from typing import List, Optional
+    from typing import List, Optional, Sequence, Tuple
 
+SEPARATOR = "-------------"
 
-def tmux_rewrite(op: str, left: object, right: object) -> Optional[List[str]]:
+# Above this number of line comparisons, the difflib autojunk heuristic is
+# kept to bound the alignment time of long and repetitive histories
+AUTOJUNK_COST = 1_000_000
+
+
+def tmux_rewrite(
+    op: str, left: object, right: object, context: int = 3, max_lines: int = 200
+) -> Optional[List[str]]:
+    """
+    Build the report of a failed assertion on a
+    [TmuxOutput][pytest_tmux.output.TmuxOutput]
+
+    Screens are aligned with difflib.SequenceMatcher, only the differences
+    and `context` common lines around them are displayed, longer common
+    regions are collapsed.
+
+    Args:
+        op: the assertion operator
+        left: the left operand
+        right: the right operand
+        context: number of common lines displayed around each difference
+            (-1 to display every line)
+        max_lines: maximum number of displayed lines, shared by the two
+            texts of a `in` or pattern report (0 for no limit)
+
+    Returns:
+        the lines of the report
+    """
     diff = []
-    left_arr = str(left).split("\n")
-    right_arr = str(right).split("\n")
-    if op == "==":
+    left_arr = _lines(left)
+    right_arr = _lines(right)
+    if op in ("==", "!=") and isinstance(right, re.Pattern):
+        left_arr, right_arr = _cap_both(left_arr, right_arr, max_lines)
+        diff.append("failed")
+        diff.append(SEPARATOR)
+        diff.extend(left_arr)
+        diff.append(SEPARATOR)
+        diff.append("does not match" if op == "==" else "matches")
+        diff.append(SEPARATOR)
+        diff.extend(right_arr)
+        diff.append(SEPARATOR)
+    elif op == "==":
         diff.append("failed")
         diff.append("> Common line")
         diff.append("- Left")
         diff.append("+ Right")
-        diff.append("-------------")
-        for i in range(len(max([left_arr, right_arr], key=len))):
-            try:
-                left_v = left_arr[i]
-            except IndexError:
-                left_v = None
-
-            try:
-                right_v = right_arr[i]
-            except IndexError:
-                right_v = None
-
-            if op == "==":
-                if left_v != right_v:
-                    if left_v is not None:
-                        diff.append(f"- {left_v}")
-                    if right_v is not None:
-                        diff.append(f"+ {right_v}")
-                else:
-                    diff.append(f"> {left_v}")
-        diff.append("-------------")
+        diff.append(SEPARATOR)
+        diff.extend(_cap(_diff(left_arr, right_arr, context), max_lines))
+        diff.append(SEPARATOR)
     elif op == "!=":
         diff.append("failed")
         diff.append("left and right are equal")
-        diff.append("-------------")
-        diff.extend(left_arr)
-        diff.append("-------------")
+        diff.append(SEPARATOR)
+        diff.extend(_cap(left_arr, max_lines))
+        diff.append(SEPARATOR)
     elif op == "in":
+        left_arr, right_arr = _cap_both(
+            left_arr, _closest(left_arr, right_arr, context), max_lines
+        )
         diff.append("failed")
-        diff.append("-------------")
+        diff.append(SEPARATOR)
         diff.extend(left_arr)
-        diff.append("-------------")
+        diff.append(SEPARATOR)
         diff.append("was not found in")
-        diff.append("-------------")
+        diff.append(SEPARATOR)
         diff.extend(right_arr)
-        diff.append("-------------")
+        diff.append(SEPARATOR)
     return diff
+
+
+def _lines(value: object) -> List[str]:
+    if isinstance(value, re.Pattern):
+        return str(value.pattern).split("\n")
+    # Several screens (TmuxClient.screens) are displayed one after the other
+    screens = getattr(value, "value", value)
+    if isinstance(screens, (list, tuple)):
+        lines = []
+        for i, screen in enumerate(screens):
+            lines.append(f"[pane {i}]")
+            lines.extend(str(screen).split("\n"))
+        return lines
+    return str(value).split("\n")
+
+
+def _matcher(left: Sequence[str], right: Sequence[str]) -> SequenceMatcher:
+    """
+    Returns:
+        a difflib.SequenceMatcher of the lines, without the autojunk
+        heuristic (who ignores the frequent lines, like blank rows, and
+        misaligns what follows) unless the alignment would be too slow
+    """
+    counts = Counter(right)
+    cost = sum(counts[line] for line in left)
+    return SequenceMatcher(None, left, right, autojunk=cost > AUTOJUNK_COST)
+
+
+def _collapsed(count: int) -> str:
+    return f"> ... {count} common line{'s' if count > 1 else ''}"
+
+
+def _diff(left: Sequence[str], right: Sequence[str], context: int) -> List[str]:
+    """
+    Returns:
+        the common lines prefixed by `> `, the left ones by `- ` and the
+        right ones by `+ `, changed lines being interleaved
+    """
+    matcher = _matcher(left, right)
+    if context < 0:
+        groups = [matcher.get_opcodes()]
+    else:
+        groups = list(matcher.get_grouped_opcodes(context))
+    lines = []
+    position = 0
+    for group in groups:
+        if group[0][1] > position:
+            lines.append(_collapsed(group[0][1] - position))
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                lines.extend(f"> {line}" for line in left[i1:i2])
+                continue
+            for left_v, right_v in zip_longest(left[i1:i2], right[j1:j2]):
+                if left_v is not None:
+                    lines.append(f"- {left_v}")
+                if right_v is not None:
+                    lines.append(f"+ {right_v}")
+        position = group[-1][2]
+    if len(left) > position and groups:
+        lines.append(_collapsed(len(left) - position))
+    return lines
+
+
+def _closest(needle: Sequence[str], text: Sequence[str], context: int) -> List[str]:
+    """
+    Returns:
+        the lines of `text` around the longest block of lines shared with
+        `needle`, the other ones being collapsed
+    """
+    if context < 0:
+        return list(text)
+    match = _matcher(text, needle).find_longest_match(0, len(text), 0, len(needle))
+    if match.size:
+        start = max(match.a - context, 0)
+        end = min(match.a + match.size + context, len(text))
+    else:
+        start, end = 0, len(text)
+    lines = []
+    if start > 0:
+        lines.append(f"... {start} lines")
+    lines.extend(text[start:end])
+    if end < len(text):
+        lines.append(f"... {len(text) - end} lines")
+    return lines
+
+
+def _cap(lines: List[str], max_lines: int) -> List[str]:
+    if max_lines <= 0 or len(lines) <= max_lines:
+        return lines
+    return lines[:max_lines] + [f"... {len(lines) - max_lines} more lines"]
+
+
+def _cap_both(
+    first: List[str], second: List[str], max_lines: int
+) -> Tuple[List[str], List[str]]:
+    """
+    Returns:
+        both texts capped to `max_lines` lines in total, a short text leaves
+        its unused lines to the other one (at least one line each)
+    """
+    if max_lines <= 0 or len(first) + len(second) <= max_lines:
+        return first, second
+    first_max = max(max_lines - len(second), max_lines // 2, 1)
+    second_max = max(max_lines - min(len(first), first_max), 1)
+    return _cap(first, first_max), _cap(second, second_max)
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from io import BytesIO
+from tempfile import NamedTemporaryFile
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+SNAPSHOTS_DIR = "__tmux_snapshots__"
+
+
+def _write(path: str, data: bytes) -> None:
+    """
+    Atomically write `data` to `path`
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as f:
+        f.write(data)
+    os.replace(f.name, path)
+
+
+@contextmanager
+def _locked(directory: str) -> Iterator[None]:
+    """
+    Hold an exclusive lock on `directory`, shared by every process (ex:
+    xdist workers) who updates the indexes stored in it
+    """
+    os.makedirs(directory, exist_ok=True)
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def _compress(data: bytes) -> bytes:
+    """
+    gzip `data` without timestamp, so a screen is always stored the same way
+    """
+    buffer = BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as f:
+        f.write(data)
+    return buffer.getvalue()
+
+
+class TmuxSnapshots:
+    """
+    Content addressed store of the screen snapshots.
+
+    Snapshots are stored next to the tests, in a `__tmux_snapshots__`
+    directory:
+
+      - `<test module>.json`: index of the snapshots of a test module
+        (`<test id in the module>::<snapshot name>` -> sha256 of the screen)
+      - `objects/<sha256>.gz`: compressed screens, identical screens of any
+        test being stored once
+
+    An index is read on the first lookup of a snapshot of its module, a
+    screen on its first comparison. Indexes changed by updates are written
+    on [save][pytest_tmux.snapshot.TmuxSnapshots.save].
+
+    Args:
+        update: rewrite the snapshots who do not match
+    """
+
+    def __init__(self, update: bool = False) -> None:
+        self.update = update
+        self._lock = threading.Lock()
+        self._indexes = {}  # type: Dict[str, Dict[str, str]]
+        self._changed = set()  # type: Set[str]
+        self.updated = []  # type: List[Tuple[str, str]]
+
+    def _index(self, index: str) -> Dict[str, str]:
+        snapshots = self._indexes.get(index)
+        if snapshots is None:
+            try:
+                with open(index) as f:
+                    snapshots = dict(json.load(f)["snapshots"])
+            except FileNotFoundError:
+                snapshots = {}
+            self._indexes[index] = snapshots
+        return snapshots
+
+    @staticmethod
+    def _object(index: str, digest: str) -> str:
+        return os.path.join(os.path.dirname(index), "objects", f"{digest}.gz")
+
+    def get(self, index: str, key: str) -> Optional[str]:
+        """
+        Args:
+            index: the index file of the test module
+            key: the snapshot key (`<test id in the module>::<snapshot name>`)
+
+        Returns:
+            the stored screen, or None if there is no such snapshot
+        """
+        with self._lock:
+            digest = self._index(index).get(key)
+        if digest is None:
+            return None
+        with gzip.open(self._object(index, digest), "rb") as f:
+            return f.read().decode("utf-8")
+
+    def put(self, index: str, key: str, text: str) -> None:
+        """
+        Store a screen as the snapshot `key`
+
+        Args:
+            index: the index file of the test module
+            key: the snapshot key (`<test id in the module>::<snapshot name>`)
+            text: the screen
+        """
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object(index, digest)
+        if not os.path.exists(path):
+            _write(path, _compress(data))
+        with self._lock:
+            self._index(index)[key] = digest
+            self._changed.add(index)
+            self.updated.append((index, key))
+
+    def save(self) -> None:
+        """
+        Write the indexes changed by
+        [put][pytest_tmux.snapshot.TmuxSnapshots.put], merged with their
+        content on disk (ex: updated by another xdist worker).
+
+        The directory of an index is locked while it is read, merged and
+        replaced, so concurrent writers do not lose each other's entries.
+        """
+        with self._lock:
+            for index in sorted(self._changed):
+                with _locked(os.path.dirname(index)):
+                    try:
+                        with open(index) as f:
+                            snapshots = dict(json.load(f)["snapshots"])
+                    except FileNotFoundError:
+                        snapshots = {}
+                    snapshots.update(self._indexes[index])
+                    content = {
+                        "version": 1,
+                        "snapshots": snapshots,
+                    }  # type: Dict[str, Any]
+                    _write(
+                        index,
+                        (json.dumps(content, indent=2, sort_keys=True) + "\n").encode(),
+                    )
+            self._changed.clear()
+
+
+class TmuxSnapshot(object):
+    """
+    A golden screen compared with `==` / `!=` to a
+    [TmuxOutput][pytest_tmux.output.TmuxOutput] (see
+    [snapshot][pytest_tmux.client.TmuxClient.snapshot]).
+
+    The screen is loaded on the first comparison.
+
+    Args:
+        store: the [TmuxSnapshots][pytest_tmux.snapshot.TmuxSnapshots] store
+        index: the index file of the test module
+        key: the snapshot key (`<test id in the module>::<snapshot name>`)
+    """
+
+    def __init__(self, store: TmuxSnapshots, index: str, key: str) -> None:
+        self.store = store
+        self.index = index
+        self.key = key
+        self._loaded = False
+        self._text = None  # type: Optional[str]
+
+    @property
+    def text(self) -> Optional[str]:
+        """
+        The stored screen, None if the snapshot does not exist yet
+        """
+        if not self._loaded:
+            self._text = self.store.get(self.index, self.key)
+            self._loaded = True
+        return self._text
+
+    def matches(self, value: str) -> bool:
+        """
+        Returns:
+            True if the snapshot exists and is equal to `value`
+        """
+        return self.text is not None and self.text == value
+
+    def update(self, value: str) -> bool:
+        """
+        Replace the snapshot by `value` when the store is in update mode
+
+        Returns:
+            True if the snapshot was updated
+        """
+        if not self.store.update or not isinstance(value, str):
+            return False
+        self.store.put(self.index, self.key, value)
+        self._text = value
+        self._loaded = True
+        return True
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, str):
+            return self.matches(other)
+        return NotImplemented
+
+    def __ne__(self, other: object) -> bool:
+        if isinstance(other, str):
+            return not self.matches(other)
+        return NotImplemented
+
+    def __str__(self) -> str:
+        if self.text is None:
+            return f"<no snapshot {self.key}, run with --tmux-snapshot-update>"
+        return self.text
+
+    def __repr__(self) -> str:
+        return str(self)
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import json
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, List
+
+
+OPERATIONS = (
+    "session",
+    "send_keys",
+    "paste",
+    "capture",
+    "debug",
+    "poll",
+    "sleep",
+    "match",
+    "timeout",
+)
+"""
+Operations recorded by [TmuxStats][pytest_tmux.stats.TmuxStats]:
+
+  - session: session creation
+  - send_keys, paste: inputs sent to a pane
+  - capture: every capture of a pane
+  - debug: time spent in [debug][pytest_tmux.client.TmuxClient.debug]
+  - poll: each evaluation of an assertion
+  - sleep: each wait between two evaluations of an assertion
+  - match, timeout: assertions who succeeded / failed, with their duration
+"""
+
+
+class TmuxStats:
+    """
+    Count and time the tmux operations of each test.
+
+    Args:
+        top: number of tests displayed in the terminal summary
+    """
+
+    def __init__(self, top: int = 20) -> None:
+        self._top = top
+        self._lock = threading.Lock()
+        self.tests = {}  # type: Dict[str, Dict[str, Any]]
+
+    def _test(self, nodeid: str) -> Dict[str, Any]:
+        return self.tests.setdefault(nodeid, {"duration": 0.0, "operations": {}})
+
+    def record(self, nodeid: str, name: str, duration: float) -> None:
+        """
+        Args:
+            nodeid: the test who did the operation
+            name: one of [OPERATIONS][pytest_tmux.stats.OPERATIONS]
+            duration: how long the operation lasted
+        """
+        with self._lock:
+            operations = self._test(nodeid)["operations"]
+            operation = operations.setdefault(
+                name, {"count": 0, "total": 0.0, "max": 0.0}
+            )
+            operation["count"] += 1
+            operation["total"] += duration
+            operation["max"] = max(operation["max"], duration)
+
+    def duration(self, nodeid: str, duration: float) -> None:
+        """
+        Args:
+            nodeid: a test who used tmux
+            duration: the wall time of the test (setup, call and teardown)
+        """
+        with self._lock:
+            if nodeid in self.tests:
+                self.tests[nodeid]["duration"] += duration
+
+    def _total(self, nodeid: str, name: str) -> float:
+        operation = self.tests[nodeid]["operations"].get(name)
+        return float(operation["total"]) if operation else 0.0
+
+    def summary(self) -> List[str]:
+        """
+        Returns:
+            the lines of the terminal summary, tests who spent the most time
+            sleeping first
+        """
+        lines = []
+        nodeids = sorted(
+            self.tests, key=lambda nodeid: self._total(nodeid, "sleep"), reverse=True
+        )
+        for nodeid in nodeids[: self._top]:
+            test = self.tests[nodeid]
+            sleep = self._total(nodeid, "sleep")
+            ratio = sleep / test["duration"] * 100 if test["duration"] else 0.0
+            lines.append(
+                f"{nodeid}: {test['duration']:.3f}s, "
+                f"{sleep:.3f}s sleeping ({ratio:.0f}%)"
+            )
+            for name in OPERATIONS:
+                operation = test["operations"].get(name)
+                if operation is None:
+                    continue
+                lines.append(
+                    f"    {name:<10}{operation['count']:>6} x "
+                    f"{operation['total']:>8.3f}s total {operation['max']:>8.3f}s max"
+                )
+        if len(nodeids) > self._top:
+            lines.append(f"... {len(nodeids) - self._top} more tests")
+        return lines
+
+    def dump(self, path: str) -> None:
+        """
+        Write the stats of every test to a JSON file.
+
+        Args:
+            path: the JSON file
+        """
+        with self._lock, open(path, "w") as f:
+            json.dump({"tests": self.tests}, f, indent=2, sort_keys=True)
+
+
+class TmuxDurations:
+    """
+    Time each assertion (retried output, stream or history), to find the
+    slowest ones and the ones who passed on their last retry before the
+    timeout (good candidates to be flaky).
+
+    Args:
+        top: number of assertions displayed in the terminal summary
+            (0 to display every assertion)
+    """
+
+    def __init__(self, top: int = 10) -> None:
+        self._top = top
+        self._lock = threading.Lock()
+        self.assertions = []  # type: List[Dict[str, Any]]
+
+    def record(
+        self,
+        nodeid: str,
+        location: str,
+        op: str,
+        duration: float,
+        polls: int = 1,
+        timeout: float = 0,
+        passed: bool = True,
+        last_chance: bool = False,
+    ) -> None:
+        """
+        Args:
+            nodeid: the test who did the assertion
+            location: where the assertion is in the test (ex: tests/test_x.py:12)
+            op: the assertion operator (ex: ==, in, wait_for)
+            duration: how long the assertion lasted
+            polls: number of evaluations of the assertion
+            timeout: the timeout of the assertion
+            passed: if the assertion succeeded
+            last_chance: if the assertion succeeded on its last retry before
+                the timeout
+        """
+        with self._lock:
+            self.assertions.append(
+                {
+                    "nodeid": nodeid,
+                    "location": location,
+                    "op": op,
+                    "duration": duration,
+                    "polls": polls,
+                    "timeout": timeout,
+                    "passed": passed,
+                    "last_chance": last_chance,
+                }
+            )
+
+    @staticmethod
+    def _line(assertion: Dict[str, Any]) -> str:
+        status = "passed" if assertion["passed"] else "failed"
+        return (
+            f"{assertion['duration']:>8.3f}s {status} {assertion['op']:<8} "
+            f"{assertion['polls']:>4} polls {assertion['location']} "
+            f"({assertion['nodeid']})"
+        )
+
+    def summary(self) -> List[str]:
+        """
+        Returns:
+            the lines of the terminal summary, slowest assertions first
+        """
+        with self._lock:
+            assertions = sorted(
+                self.assertions,
+                key=lambda assertion: assertion["duration"],
+                reverse=True,
+            )
+        top = assertions[: self._top] if self._top > 0 else assertions
+        lines = [self._line(assertion) for assertion in top]
+        if len(assertions) > len(top):
+            lines.append(f"... {len(assertions) - len(top)} more assertions")
+        last_chance = [
+            assertion for assertion in assertions if assertion["last_chance"]
+        ]
+        if last_chance:
+            lines.append("passed on their last retry:")
+            lines.extend(self._line(assertion) for assertion in last_chance)
+        return lines
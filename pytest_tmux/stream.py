@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import codecs
+import re
+from functools import partial
+from typing import TYPE_CHECKING, Union
+
+from pytest_tmux.output import retry
+
+if TYPE_CHECKING:
+    from typing import BinaryIO, Callable, Match, Optional, Pattern
+
+
+class TmuxStream(object):
+    """
+    Output of a pane logged to a file by `pipe-pane`, with retry capability
+    on [wait_for][pytest_tmux.stream.TmuxStream.wait_for].
+
+    Unlike [TmuxOutput][pytest_tmux.output.TmuxOutput], every byte written
+    by the pane since the stream was attached is seen, even if it scrolled
+    out of the screen between two checks. The logged output is the raw
+    output of the pane (escape sequences, `\\r\\n` line endings).
+
+    Each check only reads what was appended to the file since the previous
+    one. A successful [wait_for][pytest_tmux.stream.TmuxStream.wait_for]
+    consumes the output up to the end of the match, the next one starts
+    after it.
+
+    Args:
+        path: the file where the pane output is logged
+        timeout: how long to wait for a pattern
+        delay: how long before checking the file again
+        wait: a function called instead of sleep between two checks
+            (see [retry][pytest_tmux.output.retry]), the file is checked
+            again after each call as `pipe-pane` may write it after the
+            output woke it up
+        policy: how delays between two checks are computed
+            (see [retry][pytest_tmux.output.retry])
+        record: a function who records the retries
+            (see [retry][pytest_tmux.output.retry])
+    """
+
+    def __init__(
+        self,
+        path: str,
+        timeout: Union[int, float],
+        delay: Union[int, float],
+        wait: Optional[Callable[[float], Optional[bool]]] = None,
+        policy: str = "fixed",
+        record: Optional[Callable[..., None]] = None,
+    ) -> None:
+        self.path = path
+        self.__timeout = timeout
+        self.__delay = delay
+        self.__wait = wait
+        self.__policy = policy
+        self.__record = record
+        self._file = None  # type: Optional[BinaryIO]
+        self._decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        self._text = ""
+
+    def read(self) -> str:
+        """
+        Read what was appended to the file since the previous read.
+
+        Returns:
+            the new output of the pane
+        """
+        if self._file is None:
+            try:
+                self._file = open(self.path, "rb")
+            except FileNotFoundError:
+                return ""
+        text = self._decoder.decode(self._file.read())
+        self._text += text
+        return text
+
+    def wait_for(
+        self,
+        pattern: Union[str, Pattern[str]],
+        timeout: Optional[Union[int, float]] = None,
+        delay: Optional[Union[int, float]] = None,
+    ) -> Optional[Match[str]]:
+        """
+        Wait for the pane to output a substring or to match a regular
+        expression.
+
+        The output not consumed yet is scanned once, then each retry only
+        scans what was appended since (from the length of a substring or the
+        start of the last line for a regular expression, to catch matches
+        across two reads).
+
+        Args:
+            pattern: a substring or a compiled regular expression
+            timeout: how long to wait for the pattern, default to the
+                stream timeout
+            delay: how long before checking the file again, default to the
+                stream delay
+
+        Returns:
+            the match object, or None if the pattern was not found in time
+        """
+        if isinstance(pattern, str):
+            regex = re.compile(re.escape(pattern))
+        else:
+            regex = pattern
+        found = []
+        start = 0
+
+        def _wait(delay: float) -> None:
+            assert self.__wait is not None
+            self.__wait(delay)
+
+        @retry(
+            timeout=self.__timeout if timeout is None else timeout,
+            delay=self.__delay if delay is None else delay,
+            wait=None if self.__wait is None else _wait,
+            policy=self.__policy,
+            record=None
+            if self.__record is None
+            else partial(self.__record, op="wait_for"),
+        )
+        def _test() -> bool:
+            nonlocal start
+            self.read()
+            match = regex.search(self._text, start)
+            if match is None:
+                if isinstance(pattern, str):
+                    start = max(len(self._text) - len(pattern) + 1, 0)
+                else:
+                    start = max(self._text.rfind("\n"), self._text.rfind("\r")) + 1
+                return False
+            end = match.end()
+            self._text = self._text[end:]
+            found.append(match)
+            return True
+
+        _test()
+        return found[0] if found else None
+
+    def close(self) -> None:
+        """
+        Close the log file.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import glob
+import json
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+from time import monotonic
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, ContextManager, Dict, Iterator, List, Optional
+
+    import libtmux
+
+
+def span(trace: Optional[TmuxTrace], name: str, cat: str) -> ContextManager[None]:
+    """
+    Args:
+        trace: a [TmuxTrace][pytest_tmux.trace.TmuxTrace] or None when the
+            trace is disabled
+        name: name of the span
+        cat: category of the span
+
+    Returns:
+        a context manager who records a span around its block
+    """
+    if trace is None:
+        return nullcontext()
+    return trace.span(name, cat)
+
+
+class TmuxTrace:
+    """
+    Record spans of the tmux interactions in the Trace Event Format, to be
+    loaded in chrome://tracing or https://ui.perfetto.dev
+
+    Each process (xdist worker) is displayed as a process, each test and
+    each background thread (warm-up, session pool) as a thread of it.
+
+    Spans are timed with time.monotonic(), who is shared by the processes of
+    a host, so the traces of several xdist workers can be merged.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._worker = os.environ.get("PYTEST_XDIST_WORKER")
+        self._lanes = {}  # type: Dict[str, int]
+        self._test = "session"
+        self.events = []  # type: List[Dict[str, Any]]
+
+    def test(self, nodeid: Optional[str]) -> None:
+        """
+        Set the test who owns the next spans of the main thread
+
+        Args:
+            nodeid: the running test, None between two tests
+        """
+        self._test = "session" if nodeid is None else nodeid
+
+    def _tid(self) -> int:
+        thread = threading.current_thread()
+        lane = self._test if thread is threading.main_thread() else thread.name
+        tid = self._lanes.get(lane)
+        if tid is None:
+            tid = self._lanes[lane] = len(self._lanes) + 1
+        return tid
+
+    def complete(
+        self,
+        name: str,
+        cat: str,
+        duration: float,
+        end: Optional[float] = None,
+        **args: Any,
+    ) -> None:
+        """
+        Record a span who just ended
+
+        Args:
+            name: name of the span
+            cat: category of the span (command, operation, retry, fixture)
+            duration: duration of the span in seconds
+            end: monotonic() at the end of the span, default to now
+            args: details displayed with the span
+        """
+        if end is None:
+            end = monotonic()
+        with self._lock:
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": cat,
+                    "ph": "X",
+                    "ts": (end - duration) * 1e6,
+                    "dur": duration * 1e6,
+                    "pid": self._pid,
+                    "tid": self._tid(),
+                    "args": args,
+                }
+            )
+
+    @contextmanager
+    def span(self, name: str, cat: str, **args: Any) -> Iterator[None]:
+        """
+        Record a span around the block
+        """
+        start = monotonic()
+        try:
+            yield
+        finally:
+            end = monotonic()
+            self.complete(name, cat, end - start, end=end, **args)
+
+    def server(self, server: libtmux.server.Server) -> libtmux.server.Server:
+        """
+        Record a span for every command sent to `server` (by libtmux or by
+        pytest-tmux)
+
+        Args:
+            server: a libtmux.server.Server object
+
+        Returns:
+            the server
+        """
+        cmd = server.cmd
+
+        def _cmd(*args: Any, **kwargs: Any) -> Any:
+            name = str(args[0]) if args else "tmux"
+            with self.span(name, "command", cmd=" ".join(str(arg) for arg in args)):
+                return cmd(*args, **kwargs)
+
+        setattr(server, "cmd", _cmd)
+        return server
+
+    def _metadata(self) -> List[Dict[str, Any]]:
+        events = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": self._pid,
+                "args": {"name": self._worker or "pytest"},
+            }
+        ]
+        for lane, tid in self._lanes.items():
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self._pid,
+                    "tid": tid,
+                    "args": {"name": lane},
+                }
+            )
+            events.append(
+                {
+                    "name": "thread_sort_index",
+                    "ph": "M",
+                    "pid": self._pid,
+                    "tid": tid,
+                    "args": {"sort_index": tid},
+                }
+            )
+        return events
+
+    def dump(self, path: str) -> None:
+        """
+        Write the trace to a JSON file.
+
+        An xdist worker writes its trace next to `path` (suffixed by the
+        worker id), the controller merges the traces of every worker into
+        `path`.
+
+        Args:
+            path: the JSON file
+        """
+        with self._lock:
+            events = self._metadata() + self.events
+        if self._worker is not None:
+            path = f"{path}.{self._worker}"
+        else:
+            for part in sorted(glob.glob(f"{glob.escape(path)}.gw*")):
+                with open(part) as f:
+                    events.extend(json.load(f)["traceEvents"])
+                os.remove(part)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING
+
+from pytest_tmux.client import new_server
+from pytest_tmux.config import TmuxConfig, cmd_options
+from pytest_tmux.pool import TmuxSessionPool
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, Mapping, Optional, Tuple
+
+    import libtmux
+    import pytest
+
+    from pytest_tmux.config import TmuxConfigPlugin, TmuxConfigServer
+
+
+class TmuxWarmup:
+    """
+    Start the tmux server in a background thread, before the first test who
+    use the tmux fixture is set up.
+
+    The server is started with the settings known at collection time
+    (default, env, cmd args) and the global `exit-empty` option is turned off
+    to keep it alive without sessions. When the session pool is enabled, it
+    is also filled with sessions spawned with the session cmd args.
+
+    The [_tmux_server][pytest_tmux.fixtures._tmux_server] fixture takes the
+    server only if its config matches the warm-up one.
+
+    Args:
+        pytestconfig: a pytest config object
+    """
+
+    def __init__(self, pytestconfig: pytest.Config) -> None:
+        self._pytestconfig = pytestconfig
+        self._thread = None  # type: Optional[threading.Thread]
+        self._server = None  # type: Optional[libtmux.server.Server]
+        self._pool = None  # type: Optional[TmuxSessionPool]
+        self._settings = {}  # type: Dict[str, Any]
+        self._taken = False
+
+    def start(self) -> bool:
+        """
+        Start the warm-up thread.
+
+        Returns:
+            False if the warm-up could not be started
+        """
+        # Same object as the one returned by the tmpdir_factory fixture
+        tmpdir_factory = getattr(self._pytestconfig, "_tmpdirhandler", None)
+        if tmpdir_factory is None:
+            return False
+        config = TmuxConfig(
+            pytestconfig=self._pytestconfig, tmpdir_factory=tmpdir_factory
+        )
+        if TYPE_CHECKING:
+            assert isinstance(config.server, TmuxConfigServer)
+            assert isinstance(config.plugin, TmuxConfigPlugin)
+        self._settings = dict(config.server)
+        plugin = self._pytestconfig.pluginmanager.getplugin("tmux")
+        trace = getattr(plugin, "trace", None)
+        self._server = new_server(config, trace=trace)
+        if config.plugin.session_pool:
+            self._pool = TmuxSessionPool(
+                self._server, int(config.plugin.session_pool), trace=trace
+            )
+        self._thread = threading.Thread(
+            target=self._run, name="pytest-tmux-warmup", daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def _run(self) -> None:
+        assert self._server is not None
+        self._server.cmd("start-server", ";", "set-option", "-g", "exit-empty", "off")
+        if self._pool is not None:
+            self._pool.fill(cmd_options(self._pytestconfig)["session"])
+
+    def take(
+        self, settings: Mapping[str, Any]
+    ) -> Tuple[Optional[libtmux.server.Server], Optional[TmuxSessionPool]]:
+        """
+        Wait for the warm-up to finish and hand over the server and the pool.
+
+        Args:
+            settings: the server config of the
+                [_tmux_server][pytest_tmux.fixtures._tmux_server] fixture
+
+        Returns:
+            the warmed up server and pool, or None if the settings differs
+            from the warm-up ones
+        """
+        if self._thread is not None:
+            self._thread.join()
+        if self._taken or dict(settings) != self._settings:
+            self.close()
+            return None, None
+        self._taken = True
+        return self._server, self._pool
+
+    def close(self) -> None:
+        """
+        Kill the warmed up server if nobody took it.
+        """
+        if self._thread is not None:
+            self._thread.join()
+        if self._taken or self._server is None:
+            return
+        if self._pool is not None:
+            self._pool.close()
+        self._server.kill_server()
+        self._server = None
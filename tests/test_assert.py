@@ -8,7 +8,6 @@ if TYPE_CHECKING:
 
 
 def test_assert_screen(pytester: pytest.Pytester) -> None:
-
     src = r'''
         import pytest
         from inspect import cleandoc
@@ -54,3 +53,328 @@ def test_wait_sleep(pytester: pytest.Pytester) -> None:
     result = pytester.runpytest("-vv", "-s")
 
     assert result.ret == 0
+
+
+def test_assert_control_engine(pytester: pytest.Pytester) -> None:
+    src = r'''
+        import pytest
+        import time
+        from inspect import cleandoc
+
+        @pytest.mark.tmux_assertion_cfg(engine="control", delay=5)
+        def test_assert(tmux):
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            assert tmux.screen() == '$'
+            assert tmux.control.alive
+            start = time.monotonic()
+            tmux.send_keys(r'sleep 0.2; printf "Hello World\n"')
+            expected=r"""
+            $ sleep 0.2; printf "Hello World\n"
+            Hello World
+            $
+            """
+            assert tmux.screen(timeout=10) == cleandoc(expected)
+            assert time.monotonic() - start < 5
+    '''
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv", "-s")
+
+    assert result.ret == 0
+
+
+def test_assert_adaptive_policy(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import pytest
+        import time
+
+        def test_assert(tmux):
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            assert tmux.row(0) == '$'
+            tmux.send_keys('sleep 0.1')
+            start = time.monotonic()
+            assert tmux.row(1, delay=3, policy='adaptive') == '$'
+            assert time.monotonic() - start < 1
+            start = time.monotonic()
+            assert not tmux.row(1, timeout=0.2, delay=3) == 'never'
+            assert time.monotonic() - start < 1
+    """
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv", "-s")
+
+    assert result.ret == 0
+
+
+def test_lazy_capture(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import pytest
+
+        def test_lazy(tmux):
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            assert tmux.screen() == '$'
+            calls = []
+            capture_pane = tmux.pane.capture_pane
+            def _capture_pane(*args, **kwargs):
+                calls.append(args)
+                return capture_pane(*args, **kwargs)
+            tmux.pane.capture_pane = _capture_pane
+            output = tmux.screen()
+            assert len(calls) == 0
+            assert output == '$'
+            assert len(calls) == 1
+            assert str(output) == '$'
+            assert repr(output) == '$'
+            assert len(calls) == 1
+            assert str(tmux.screen()) == '$'
+            assert len(calls) == 2
+    """
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv", "-s")
+
+    assert result.ret == 0
+
+
+def test_assert_rows(pytester: pytest.Pytester) -> None:
+    src = r'''
+        import pytest
+        from inspect import cleandoc
+
+        @pytest.mark.tmux_session_cfg(x=40, y=10)
+        def test_assert(tmux):
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            assert tmux.row(0) == '$'
+            tmux.send_keys(r'printf "a\nb\n\nc\n"')
+            expected = r"""
+            a
+            b
+
+            c
+            """
+            assert tmux.rows(1, 5) == cleandoc(expected)
+            assert tmux.rows(2, 4) == 'b'
+            assert tmux.rows(5) == '$'
+            assert tmux.rows(3, 3) == ''
+            assert tmux.row(3) == ''
+            assert tmux.row(4) == 'c'
+            assert tmux.row(-1) == '$'
+            assert tmux.row(9) == ''
+            assert tmux.row(10) == ''
+            assert tmux.rows(10, 20) == ''
+    '''
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv", "-s")
+
+    assert result.ret == 0
+
+
+def test_assert_patterns(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import pytest
+        import re
+        from pytest_tmux.output import compile_pattern
+
+        def test_assert(tmux):
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            assert tmux.screen() == re.compile(r"\$")
+            tmux.send_keys(r'sleep 0.5; printf "Build 42 ok\n"')
+            match = tmux.screen(timeout=5, delay=0.1).search(r"Build (\d+) ok")
+            assert match is not None and match.group(1) == "42"
+            assert tmux.row(0).matches(r"\$ sleep") is not None
+            assert tmux.row(1).matches("build", re.I) is not None
+            assert compile_pattern(r"Build (\d+) ok") is compile_pattern(r"Build (\d+) ok")
+            assert tmux.screen().satisfies(lambda s: s.count("\n") == 2)
+            assert re.compile(r"^Build \d+", re.M) in tmux.screen()
+            assert tmux.row(1) != re.compile(r"Build")
+            assert tmux.screen(timeout=0.2).search("nothing") is None
+            assert tmux.screen(timeout=0.2).satisfies(len) == 49
+
+        def test_failure(tmux):
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            assert tmux.screen(timeout=0.2) == re.compile(r"\$ nothing")
+    """
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv", "-s")
+
+    result.assert_outcomes(passed=1, failed=1)
+    result.stdout.fnmatch_lines(["*does not match*", "*-------------", r"*\$ nothing"])
+
+
+def test_wait_for_any_all(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import pytest
+        import re
+        import time
+
+        def test_assert(tmux):
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            assert tmux.screen() == '$'
+            tmux.send_keys(r'sleep 0.5; printf "Error: disk full\n"')
+            fired = tmux.wait_for_any(
+                {
+                    "success": "Done",
+                    "error": re.compile(r"^Error: .*$", re.M),
+                    "prompt": lambda s: s.endswith("? "),
+                },
+                timeout=5,
+                delay=0.1,
+            )
+            assert fired == "error"
+            assert tmux.wait_for_any(["Done", "disk full"]) == "disk full"
+            start = time.monotonic()
+            assert tmux.wait_for_any({0: "disk full", 1: "nothing"}, timeout=5) == 0
+            assert time.monotonic() - start < 1
+            start = time.monotonic()
+            assert tmux.wait_for_any({"a": "nothing", "b": "none"}, timeout=0.5) is None
+            assert time.monotonic() - start < 1.5
+            assert tmux.wait_for_all(["Error", re.compile(r"full"), lambda s: s.endswith("$")])
+            assert not tmux.wait_for_all(["Error", "Done"], timeout=0.5)
+    """
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv", "-s")
+
+    assert result.ret == 0
+
+
+def test_wait_idle(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import pytest
+        import time
+
+        def test_assert(tmux):
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            assert tmux.screen() == '$'
+            assert tmux.wait_idle(quiet_ms=100)
+            tmux.send_keys(r'for i in 1 2 3 4 5 6 7 8 9 10; do echo $i; sleep 0.05; done')
+            start = time.monotonic()
+            assert tmux.wait_idle(quiet_ms=500, timeout=5, delay=0.05)
+            assert time.monotonic() - start >= 0.5
+            assert tmux.screen(timeout=0).value.endswith("10\n$")
+            tmux.send_keys(r'while true; do date +%N; sleep 0.02; done')
+            start = time.monotonic()
+            assert not tmux.wait_idle(quiet_ms=500, timeout=1, delay=0.05)
+            assert time.monotonic() - start < 2
+    """
+
+    pytester.makepyfile(src)
+    for engine in ("poll", "control"):
+        result = pytester.runpytest("-vv", f"--tmux-assertion-engine={engine}")
+        assert result.ret == 0
+
+
+def test_assert_screens(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import pytest
+
+        def test_assert(tmux):
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            assert tmux.screen() == '$'
+            tmux.window.split_window(shell='env -i PS1="> " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile')
+            panes = tmux.panes
+            assert len(panes) == 2
+            assert tmux.screens() == ["$", ">"]
+            panes[0].send_keys("echo left")
+            panes[1].send_keys("echo right")
+            calls = []
+            cmd = tmux.server.cmd
+            def _cmd(*args, **kwargs):
+                calls.append(args)
+                return cmd(*args, **kwargs)
+            tmux.server.cmd = _cmd
+            assert tmux.screens(delay=0.1) == ["$ echo left\nleft\n$", "> echo right\nright\n>"]
+            assert len(calls) >= 1
+            assert all(call.count("capture-pane") == 2 for call in calls)
+            assert tmux.capture_panes([panes[1], "%999"]) == ["> echo right\nright\n>", ""]
+            calls.clear()
+            assert tmux.capture_panes([panes[0], "%999", panes[1]]) == ["$ echo left\nleft\n$", "", "> echo right\nright\n>"]
+            assert len(calls) == 2
+            assert tmux.screens([panes[1]]).satisfies(lambda screens: "right" in screens[0])
+
+        def test_failure(tmux):
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            tmux.window.split_window(shell='env -i PS1="> " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile')
+            assert tmux.screens(timeout=0.2) == ["$", "<"]
+    """
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv", "-s")
+
+    result.assert_outcomes(passed=1, failed=1)
+    result.stdout.fnmatch_lines(
+        ["*> [[]pane 0]", "*> $", "*> [[]pane 1]", "*- >", "*+ <"]
+    )
+
+
+def test_async_client(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import asyncio
+        import pytest
+        import re
+        import time
+
+        SHELL = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+
+        def test_assert(atmux):
+            atmux.config.session.window_command = SHELL
+            assert atmux.pane is atmux.tmux.pane
+            clients = [atmux] + [
+                atmux.for_pane(atmux.tmux.window.split_window(shell=SHELL))
+                for _ in range(3)
+            ]
+            atmux.tmux.window.select_layout("even-vertical")
+
+            async def scenario(client, i):
+                assert await client.screen().equals("$")
+                await client.send_keys(f"sleep 1; echo done {i}")
+                assert await client.screen(timeout=5, delay=0.1).contains(f"done {i}")
+                assert await client.row(1).equals(f"done {i}")
+                assert await client.row(-1).equals("$")
+                match = await client.screen().search(r"done (\d)")
+                assert match is not None and match.group(1) == str(i)
+                assert await client.screen().not_equals(re.compile("nothing"))
+                assert not await client.screen(timeout=0.2).contains("nothing")
+
+            async def main():
+                start = time.monotonic()
+                await asyncio.gather(*(scenario(client, i) for i, client in enumerate(clients)))
+                return time.monotonic() - start
+
+            assert asyncio.get_event_loop().run_until_complete(main()) < 3
+    """
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv", "-s")
+
+    assert result.ret == 0
+
+
+def test_history(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import pytest
+        import re
+
+        def test_history(tmux):
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            tmux.server.cmd("start-server", ";", "set-option", "-g", "exit-empty", "off", ";", "set-option", "-g", "history-limit", "100000")
+            assert tmux.screen() == '$'
+            tmux.send_keys("seq 1 5000")
+            assert tmux.row(-1, timeout=5) == "$"
+            chunks = list(tmux.history(chunk_lines=500))
+            assert all(len(chunk) <= 500 for chunk in chunks)
+            lines = [line for chunk in chunks for line in chunk]
+            assert lines == ["$ seq 1 5000"] + [str(i) for i in range(1, 5001)] + ["$"]
+            assert tmux.history_contains("2500\n2501", chunk_lines=500)
+            assert tmux.history_contains(re.compile(r"^4999$", re.M), chunk_lines=100)
+            assert not tmux.history_contains("99999", timeout=0.2)
+            with pytest.raises(ValueError):
+                next(tmux.history(chunk_lines=0))
+    """
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv", "-s")
+
+    assert result.ret == 0
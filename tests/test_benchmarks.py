@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BENCH = Path(__file__).parent.parent / "benchmarks" / "bench.py"
+
+
+def test_benchmarks(tmp_path: Path) -> None:
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(
+        json.dumps({"benchmarks": {"new_session": {"time": {"median": 1000}}}})
+    )
+    output = tmp_path / "bench.json"
+    proc = subprocess.run(
+        [
+            sys.executable,
+            str(BENCH),
+            "-r",
+            "2",
+            "-b",
+            "new_session",
+            "-b",
+            "libtmux_capture_pane_80x24",
+            "-b",
+            "client_row_200x50",
+            "-o",
+            str(output),
+            "--compare",
+            str(baseline),
+        ],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+
+    assert proc.returncode == 0
+    assert proc.stdout.splitlines()[-1].split() == ["new_session", "0.00x", "ok"]
+    results = json.loads(output.read_text())
+    assert set(results["environment"]) == {"python", "platform", "tmux", "libtmux"}
+    assert set(results["benchmarks"]) == {
+        "new_session",
+        "libtmux_capture_pane_80x24",
+        "client_row_200x50",
+    }
+    for result in results["benchmarks"].values():
+        assert result["runs"] == 2
+        assert 0 < result["time"]["min"] <= result["time"]["median"]
+        assert result["time"]["median"] <= result["time"]["max"]
+
+
+def test_benchmarks_regression(tmp_path: Path) -> None:
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(
+        json.dumps({"benchmarks": {"kill_session": {"time": {"median": 1e-9}}}})
+    )
+    proc = subprocess.run(
+        [
+            sys.executable,
+            str(BENCH),
+            "-r",
+            "1",
+            "-b",
+            "kill_session",
+            "-o",
+            str(tmp_path / "bench.json"),
+            "--compare",
+            str(baseline),
+        ],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+
+    assert proc.returncode == 1
+    assert proc.stdout.splitlines()[-1].split()[-1] == "REGRESSION"
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from pytest_tmux.cells import BOLD, DEFAULT, REVERSE, UNDERLINE, TmuxCells, rgb
+
+if TYPE_CHECKING:
+    import pytest
+
+
+def test_cells_parse() -> None:
+    lines = [
+        "\x1b[1;31mred\x1b[0m \x1b[7mrev\x1b[27m plain",
+        "\x1b[38;5;196;48;2;1;2;3mext\x1b[39;49m \x1b[4:3mcurly\x1b[4:0m",
+        "\x1b[32m日本 ok",
+        "still green\x1b]8;;https://example.org\x1b\\ link\x1b[m",
+    ]
+    cells = TmuxCells(lines, 20, 5)
+
+    assert cells.text == "red rev plain\next curly\n日本 ok\nstill green link"
+    assert list(cells[0, 0:3].fg) == [1, 1, 1]
+    assert cells[0, 0:3].has(BOLD)
+    assert not cells[0, 0:4].has(BOLD)
+    assert cells[0, 4:7].has(REVERSE)
+    assert set(cells[0, 7:].attr) == {0}
+    assert set(cells[1, 0:3].fg) == {196}
+    assert set(cells[1, 0:3].bg) == {rgb(1, 2, 3)}
+    assert set(cells[1, 3:].bg) == {DEFAULT}
+    assert cells[1, 4:9].has(UNDERLINE)
+    assert cells[1, 9].attr[0] == 0
+    # wide characters take two cells
+    assert cells[2, 4:7].text == " ok"
+    assert set(cells[2, 0:7].fg) == {2}
+    # the style is kept across lines
+    assert set(cells[3, 0:16].fg) == {2}
+    assert cells[3, 16].fg[0] == DEFAULT
+    assert cells[-1].text == ""
+    assert list(cells[0:2, 0:3].fg) == [1, 1, 1, 196, 196, 196]
+    assert list(cells[0, 0:2]) == [("r", 1, DEFAULT, BOLD), ("e", 1, DEFAULT, BOLD)]
+
+
+def test_cells(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import pytest
+        from libtmux.exc import LibTmuxException
+        from pytest_tmux.cells import BOLD, REVERSE
+
+        def test_cells(tmux):
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            assert tmux.screen() == '$'
+            tmux.send_keys(r"clear; printf '\e[1;31mError\e[0m \e[7mselected\e[0m\n'")
+            assert tmux.screen() == 'Error selected\n$'
+            cells = tmux.cells()
+            assert (cells.width, cells.height) == (80, 24)
+            assert cells.text == 'Error selected\n$'
+            assert cells[0, 0:5].has(BOLD)
+            assert set(cells[0, 0:5].fg) == {1}
+            assert cells[0, 6:14].has(REVERSE)
+            assert not cells[1].has(REVERSE)
+            tmux.send_keys(r"clear; printf '\e[42mAB      \e[0m\n'")
+            assert tmux.screen() == 'AB\n$'
+            assert list(tmux.cells()[0, 0:9].bg) == [2] * 8 + [-1]
+            tmux.window.split_window()
+            tmux.pane.cmd("kill-pane")
+            with pytest.raises(LibTmuxException):
+                tmux.cells()
+    """
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv")
+
+    assert result.ret == 0
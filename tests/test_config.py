@@ -23,8 +23,10 @@ def test_default_cfg(
             assert tmux.window.name == 'test_default_config'
             assert tmux.config.assertion.timeout == 2
             assert tmux.config.assertion.delay == 0.5
+            assert tmux.config.assertion.policy == 'fixed'
             assert tmux.screen()._TmuxOutput__timeout == 2
             assert tmux.screen()._TmuxOutput__delay == 0.5
+            assert tmux.screen()._TmuxOutput__policy == 'fixed'
     """
     ).format(
         "{}/basetemp/tmux.socket".format(str(tmp_path_factory.getbasetemp())),
@@ -93,7 +95,7 @@ def test_env_cfg(pytester: pytest.Pytester, monkeypatch: pytest.MonkeyPatch) ->
     monkeypatch.setenv(
         "PYTEST_TMUX_CONFIG_FILE", "{}/tmux.cfg_env".format(pytester.path)
     )
-    monkeypatch.setenv("PYTEST_TMUX_COLORS", "8")
+    monkeypatch.setenv("PYTEST_TMUX_COLORS", "256")
     monkeypatch.setenv("PYTEST_TMUX_START_DIRECTORY", "/tmp")
     monkeypatch.setenv("PYTEST_TMUX_WINDOW_COMMAND", "sh")
     monkeypatch.setenv("PYTEST_TMUX_WINDOW_WIDTH", "34")
@@ -107,7 +109,7 @@ def test_env_cfg(pytester: pytest.Pytester, monkeypatch: pytest.MonkeyPatch) ->
             assert tmux.config.plugin.debug == True
             assert tmux.config.server.socket_path == "{}"
             assert tmux.config.server.config_file == "{}"
-            assert tmux.config.server.colors == 8
+            assert tmux.config.server.colors == 256
             assert tmux.config.session.start_directory == '/tmp'
             assert tmux.config.session.window_command == 'sh'
             assert tmux.config.session.x == 34
@@ -169,6 +171,45 @@ def test_live_cfg(pytester: pytest.Pytester) -> None:
     assert result.ret == 0
 
 
+def test_snapshot_cfg(pytester: pytest.Pytester) -> None:
+    src = cleandoc(
+        """
+        import pytest
+
+        @pytest.mark.tmux_session_cfg(y=32)
+        def test_snapshot_config(tmux, pytestconfig, monkeypatch):
+            getoption = pytestconfig.getoption
+            calls = []
+            monkeypatch.setattr(
+                pytestconfig,
+                "getoption",
+                lambda *args, **kwargs: calls.append(args) or getoption(*args, **kwargs),
+            )
+            snapshot = tmux.config.session.snapshot()
+            for _ in range(100):
+                assert tmux.config.plugin.debug is False
+                assert tmux.config.session.y == 32
+                assert tmux.config.session.snapshot() is snapshot
+            assert calls == []
+            with pytest.raises(AttributeError):
+                snapshot.y = 10
+            tmux.config.session.y = 10
+            tmux.config.session.x = 10
+            assert snapshot.y == 32
+            assert tmux.config.session.snapshot() is not snapshot
+            assert tmux.config.session.y == 10
+            assert tmux.config.session.x == 40
+            assert dict(tmux.config.session)["y"] == 10
+            assert tmux.screen() != "nothing"
+            assert tmux.pane.display_message("#{pane_width}", get_text=True) == ["40"]
+    """
+    )
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-s", "--tmux-window-width=40")
+    assert result.ret == 0
+
+
 def test_fixture_cfg(pytester: pytest.Pytester) -> None:
     src = cleandoc(
         """
@@ -237,7 +278,8 @@ def test_marker_cfg(pytester: pytest.Pytester) -> None:
         )
         @pytest.mark.tmux_assertion_cfg(
             timeout=3,
-            delay=3
+            delay=3,
+            policy='adaptive',
         )
         def test_marker_config(tmux):
             assert tmux.config.session.start_directory == '/test'
@@ -246,8 +288,10 @@ def test_marker_cfg(pytester: pytest.Pytester) -> None:
             assert tmux.config.session.y == 33
             assert tmux.config.assertion.timeout == 3
             assert tmux.config.assertion.delay == 3
+            assert tmux.config.assertion.policy == 'adaptive'
             assert tmux.screen()._TmuxOutput__timeout == 3
             assert tmux.screen()._TmuxOutput__delay == 3
+            assert tmux.screen()._TmuxOutput__policy == 'adaptive'
     """
     )
     pytester.makepyfile(src)
@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import time
+from inspect import cleandoc
 from typing import TYPE_CHECKING
 
+from pytest_tmux.stream import TmuxStream
+
 if TYPE_CHECKING:
+    from pathlib import Path
+
     import pytest
 
 
@@ -47,3 +53,304 @@ def test_send_keys_suppress_history(pytester: pytest.Pytester) -> None:
     result = pytester.runpytest("-vv", "-s")
 
     assert result.ret == 0
+
+
+def test_send_keys_batch(pytester: pytest.Pytester) -> None:
+    src = r'''
+        import pytest
+        from inspect import cleandoc
+
+        def test_send_keys(tmux):
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            assert tmux.screen() == '$'
+            calls = []
+            cmd = tmux.server.cmd
+            def _cmd(*args, **kwargs):
+                calls.append(args)
+                return cmd(*args, **kwargs)
+            tmux.server.cmd = _cmd
+            tmux.send_keys(["echo", " a", "Space", "b"])
+            assert len(calls) == 1
+            with tmux.batch():
+                tmux.send_keys("cho c", enter=False)
+                with tmux.batch():
+                    tmux.send_keys(["C-a"], enter=False)
+                    tmux.send_keys("e", enter=False, literal=True)
+                tmux.send_keys([])
+                tmux.resize(x=40, y=10)
+                assert len(calls) == 1
+            assert len(calls) == 2
+            expected=r"""
+            $ echo a b
+            a b
+            $ echo c
+            c
+            $
+            """
+            assert tmux.screen() == cleandoc(expected)
+            assert tmux.window.cmd("display-message", "-p", "#{window_width}x#{window_height}").stdout == ["40x10"]
+    '''
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv", "-s")
+
+    assert result.ret == 0
+
+
+def test_paste(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import pytest
+        import time
+        from pathlib import Path
+
+        def wait_file(path, content):
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline:
+                if path.exists() and path.read_text() == content:
+                    return True
+                time.sleep(0.05)
+            return False
+
+        def test_paste(tmux, tmp_path):
+            out = tmp_path / "out"
+            tmux.config.session.window_command = f"cat > {out}"
+            data = "".join(f"line {i}\n" for i in range(10000))
+            tmux.paste(data)
+            assert wait_file(out, data)
+            src = tmp_path / "src"
+            src.write_text("from file\n")
+            with tmux.batch():
+                tmux.send_keys("first", enter=True)
+                tmux.paste(src, bracketed=False)
+            assert wait_file(out, data + "first\nfrom file\n")
+            assert tmux.server.cmd("list-buffers").stdout == []
+    """
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv", "-s")
+
+    assert result.ret == 0
+
+
+def test_stream(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import pytest
+        import re
+
+        def test_stream(tmux):
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            tmux.config.session.y = 5
+            assert tmux.screen() == '$'
+            stream = tmux.stream(timeout=5, delay=0.1)
+            assert tmux.stream() is stream
+            tmux.send_keys("seq 1 3000 ; echo DONE")
+            match = stream.wait_for(re.compile(r"^(15\d\d)\r?$", re.M))
+            assert match is not None and match.group(1) == "1500"
+            assert stream.wait_for("1501") is not None
+            assert stream.wait_for("1500", timeout=0.5) is None
+            assert stream.wait_for("DONE\r\n") is not None
+            assert "1500" not in tmux.screen().value
+    """
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv", "-s")
+
+    assert result.ret == 0
+
+
+def test_stream_early_output(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import pytest
+
+        def test_early(tmux):
+            tmux.config.session.window_command = 'sh -c "echo early; exec cat"'
+            assert tmux.screen() == 'early'
+            tmux.send_keys("typed")
+            assert tmux.screen() == 'early\ntyped\ntyped'
+            stream = tmux.stream(timeout=1, delay=0.1)
+            assert stream.wait_for("early\r\n") is not None
+            assert stream.wait_for("typed\r\ntyped") is not None
+            assert tmux.server.cmd("show-options", "-gv", "exit-empty").stdout == ["on"]
+
+        def test_other_sessions(tmux):
+            tmux.config.session.window_command = 'sh -c "echo mine; exec cat"'
+            other = tmux.server.new_session(window_command='sh -c "echo other; exec cat"')
+            stream = tmux.stream(timeout=1, delay=0.1)
+            assert stream.wait_for("mine") is not None
+            assert other.attached_pane.display_message("#{pane_pipe}", get_text=True) == ["0"]
+            other.kill_session()
+    """
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv", "-s", "--tmux-stream")
+
+    assert result.ret == 0
+
+
+def test_stream_late_write(tmp_path: Path) -> None:
+    path = tmp_path / "pane.log"
+    path.write_bytes(b"")
+
+    def wait(delay: float) -> bool:
+        # the output is notified before pipe-pane wrote it
+        time.sleep(delay)
+        with open(path, "ab") as f:
+            f.write(b"late\r\n")
+        return False
+
+    stream = TmuxStream(str(path), timeout=0.3, delay=0.1, wait=wait)
+    assert stream.wait_for("late") is not None
+
+
+def test_control_transport(pytester: pytest.Pytester) -> None:
+    src = r'''
+        import pytest
+        from inspect import cleandoc
+        from pytest_tmux.control import TmuxControlResult, TmuxControlServer, commands
+
+        def test_send_keys(tmux):
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            assert isinstance(tmux.server, TmuxControlServer)
+            assert tmux.screen() == '$'
+            assert tmux.server.control.alive
+            tmux.send_keys("echo 'it'\\''s ; done'")
+            expected=r"""
+            $ echo 'it'\''s ; done'
+            it's ; done
+            $
+            """
+            assert tmux.screen() == cleandoc(expected)
+            assert not tmux.server.has_session("no_such_session")
+
+        def test_chained_commands(tmux):
+            assert commands(["display-message", "-p", "a;b", ";", "new-window", "-d"]) == ["display-message", "new-window"]
+            tmux.session
+            result = tmux.server.cmd("display-message", "-p", "x", ";", "new-window", "-d", "-t", tmux.session.session_id)
+            assert not isinstance(result, TmuxControlResult)
+            assert len(tmux.session.windows) == 2
+            assert isinstance(tmux.server.cmd("display-message", "-p", "x"), TmuxControlResult)
+            assert tmux.session.session_name in [session.session_name for session in tmux.server.sessions]
+            assert "pytest_tmux_control" not in [session.session_name for session in tmux.server.sessions]
+            assert "pytest_tmux_control" not in {pane.session_name for pane in tmux.server.panes}
+            assert tmux.server.cmd("has-session", "-t", "pytest_tmux_control").returncode == 0
+    '''
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv", "-s", "--tmux-transport", "control")
+
+    assert result.ret == 0
+
+
+def test_transport_semicolon(pytester: pytest.Pytester) -> None:
+    src = r'''
+        import time
+        from inspect import cleandoc
+        from pytest_tmux.control import parse_commands
+
+        def test_semicolon(tmux):
+            assert parse_commands(["a;", "b\\;", ";", ";", "c"]) == [["a"], ["b;"], ["c"]]
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            assert tmux.screen() == '$'
+            start = time.monotonic()
+            # ";" ends a tmux command, "\;" is a literal ";"
+            tmux.send_keys(";", enter=False)
+            tmux.send_keys("echo a\\;", enter=False)
+            with tmux.batch():
+                tmux.send_keys(["echo b", ";"], enter=False)
+                tmux.send_keys("\\;")
+            assert time.monotonic() - start < 2
+            expected=r"""
+            $ echo a;echo b;
+            a
+            b
+            $
+            """
+            assert tmux.screen() == cleandoc(expected)
+    '''
+
+    pytester.makepyfile(src)
+    for transport in ("subprocess", "control"):
+        result = pytester.runpytest("-vv", f"--tmux-transport={transport}")
+        assert result.ret == 0
+
+
+def test_warmup(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import time
+        import pytest
+
+        def test_not_tmux(pytestconfig):
+            warmup = pytestconfig.pluginmanager.getplugin("tmux").warmup
+            assert warmup is not None
+            assert warmup._server is not None
+
+        def test_warmup(tmux):
+            assert tmux.server.cmd("show-options", "-g", "exit-empty").stdout == ["exit-empty off"]
+            assert tmux._pool is not None
+            deadline = time.monotonic() + 5
+            idle = []
+            while not idle and time.monotonic() < deadline:
+                time.sleep(0.01)
+                with tmux._pool._lock:
+                    idle = [i for ids in tmux._pool._idle.values() for i in ids]
+            assert idle
+            assert tmux.session.session_id in idle
+            assert tmux.screen() == '$'
+    """
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest(
+        "-vv",
+        "-s",
+        "--tmux-warmup",
+        "--tmux-session-pool",
+        "1",
+        "--tmux-window-command",
+        'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile',
+    )
+
+    assert result.ret == 0
+
+
+def test_warmup_discarded(pytester: pytest.Pytester) -> None:
+    src = cleandoc(
+        """
+        import pytest
+
+        @pytest.fixture(scope='session')
+        def tmux_server_config():
+            return {{'socket_path': '{}'}}
+
+        def test_warmup(tmux):
+            assert tmux.server.socket_path == '{}'
+            assert tmux._pool is None
+            assert tmux.screen() is not None
+    """
+    ).format(
+        "{}/other.socket".format(pytester.path),
+        "{}/other.socket".format(pytester.path),
+    )
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv", "-s", "--tmux-warmup", "--tmux-session-pool=0")
+
+    assert result.ret == 0
+
+
+def test_lazy_import(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import sys
+
+        def test_no_tmux():
+            assert "libtmux" not in sys.modules
+            assert "pytest_tmux.client" not in sys.modules
+
+        def test_tmux(tmux):
+            assert "libtmux" in sys.modules
+            assert tmux.screen() is not None
+    """
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest_subprocess("-vv", "-p", "no:libtmux")
+
+    result.assert_outcomes(passed=2)
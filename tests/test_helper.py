@@ -16,6 +16,9 @@ def test_help_message(pytester: pytest.Pytester) -> None:
         [
             "tmux:",
             "  --tmux-debug *",
+            "  --tmux-transport={subprocess,control}",
+            "  --tmux-session-pool=TMUX_SESSION_POOL",
+            "  --tmux-warmup *",
             "  --tmux-socket-path=TMUX_SOCKET_PATH",
             "  --tmux-config-file=TMUX_CONFIG_FILE",
             "  --tmux-colors=TMUX_COLORS",
@@ -25,5 +28,14 @@ def test_help_message(pytester: pytest.Pytester) -> None:
             "  --tmux-window-height=TMUX_WINDOW_HEIGHT",
             "  --tmux-assertion-timeout=TMUX_ASSERTION_TIMEOUT",
             "  --tmux-assertion-delay=TMUX_ASSERTION_DELAY",
+            "  --tmux-assertion-policy={fixed,adaptive}",
+            "  --tmux-assertion-engine={poll,control}",
+            "  --tmux-diff-context=TMUX_DIFF_CONTEXT",
+            "  --tmux-diff-max-lines=TMUX_DIFF_MAX_LINES",
+            "  --tmux-stats=[[]PATH] *",
+            "  --tmux-durations=N *",
+            "  --tmux-trace=PATH *",
+            "  --tmux-snapshot-update*",
+            "  --tmux-stream*",
         ]
     )
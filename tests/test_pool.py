@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pytest
+
+SHELL = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+
+
+def test_session_pool(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import pytest
+
+        def test_first(tmux):
+            assert tmux._pool is not None
+            assert tmux.screen() == '$'
+            tmux.send_keys('echo first')
+            assert tmux.screen() == '$ echo first\nfirst\n$'
+
+        def test_second(tmux):
+            assert tmux.session.name == 'test_session_pool_test_second'
+            assert tmux.window.name == 'test_second'
+            assert tmux.screen() == '$'
+            names = [session.name for session in tmux.server.sessions]
+            assert 'test_session_pool_test_first' not in names
+    """
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest(
+        "-vv",
+        "-s",
+        "--tmux-session-pool",
+        "2",
+        "--tmux-window-command",
+        SHELL,
+        "--tmux-window-width",
+        "40",
+        "--tmux-window-height",
+        "10",
+    )
+
+    assert result.ret == 0
+
+
+def test_session_pool_settings(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import time
+        import pytest
+        from pytest_tmux.pool import TmuxSessionPool
+
+        def test_settings(tmux, tmp_path):
+            pool = TmuxSessionPool(tmux.server, 1)
+            settings = {
+                'window_command': 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile',
+                'x': 40,
+                'y': 10,
+            }
+            key = pool.key(settings)
+            pool.fill(settings)
+            deadline = time.monotonic() + 5
+            while len(pool._idle[key]) < 1 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            idle = pool._idle[key][0]
+            first = pool.session(dict(settings, session_name='first', window_name='w'))
+            assert first.session_id == idle
+            assert first.name == 'first'
+            assert first.attached_window.name == 'w'
+
+            # settings who were not given to fill() are never spawned ahead
+            log = tmp_path / 'log'
+            other = dict(settings, window_command=f'sh -c "echo run >> {log}; exec cat"')
+            second = pool.session(dict(other, session_name='second'))
+            assert second.session_id != idle
+            assert pool.key(other) not in pool._idle
+            deadline = time.monotonic() + 5
+            while not log.exists() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            time.sleep(0.5)
+            assert log.read_text() == 'run\n'
+            pool.close()
+    """
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv", "-s")
+
+    assert result.ret == 0
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import time
+
+from pytest_tmux.rewrite import tmux_rewrite
+
+
+def test_rewrite_aligned_diff() -> None:
+    left = "\n".join(["a", "b", "c", "d", "e", "f", "g", "h", "i"])
+    right = "\n".join(["a", "new", "b", "c", "d", "e", "f", "g", "x", "i"])
+
+    assert tmux_rewrite("==", left, right, context=1) == [
+        "failed",
+        "> Common line",
+        "- Left",
+        "+ Right",
+        "-------------",
+        "> a",
+        "+ new",
+        "> b",
+        "> ... 4 common lines",
+        "> g",
+        "- h",
+        "+ x",
+        "> i",
+        "-------------",
+    ]
+    full = tmux_rewrite("==", left, right, context=-1)
+    assert full is not None
+    assert "> ... 4 common lines" not in full
+    assert "> e" in full
+
+
+def test_rewrite_in_and_cap() -> None:
+    text = "\n".join(str(i) for i in range(100))
+
+    report = tmux_rewrite("in", "50\nnope", text, context=2)
+    assert report == [
+        "failed",
+        "-------------",
+        "50",
+        "nope",
+        "-------------",
+        "was not found in",
+        "-------------",
+        "... 48 lines",
+        "48",
+        "49",
+        "50",
+        "51",
+        "52",
+        "... 47 lines",
+        "-------------",
+    ]
+    report = tmux_rewrite("!=", text, text, max_lines=10)
+    assert report is not None
+    assert report[-2] == "... 90 more lines"
+    assert len(report) == 15
+    # the limit is shared by the two texts
+    report = tmux_rewrite("in", text, text + "\nend", context=-1, max_lines=10)
+    assert report is not None
+    assert report.count("... 95 more lines") == 1
+    assert report.count("... 96 more lines") == 1
+    assert len(report) == 18
+    report = tmux_rewrite("in", "nope", text, context=-1, max_lines=10)
+    assert report is not None
+    assert report[2:4] == ["nope", "-------------"]
+    assert report[-2] == "... 91 more lines"
+
+
+def test_rewrite_large_history() -> None:
+    left = [f"line {i}" for i in range(20000)]
+    right = list(left)
+    right[100] = "changed"
+    del right[15000]
+
+    start = time.monotonic()
+    report = tmux_rewrite("==", "\n".join(left), "\n".join(right))
+    assert time.monotonic() - start < 5
+    assert report is not None
+    assert "- line 100" in report
+    assert "+ changed" in report
+    assert "- line 15000" in report
+    assert len(report) < 40
+
+
+def test_rewrite_repetitive_screen() -> None:
+    left = [f"row {i % 3}" for i in range(300)]
+    right = list(left)
+    right.insert(150, "new")
+
+    report = tmux_rewrite("==", "\n".join(left), "\n".join(right))
+    assert report == [
+        "failed",
+        "> Common line",
+        "- Left",
+        "+ Right",
+        "-------------",
+        "> ... 147 common lines",
+        "> row 0",
+        "> row 1",
+        "> row 2",
+        "+ new",
+        "> row 0",
+        "> row 1",
+        "> row 2",
+        "> ... 147 common lines",
+        "-------------",
+    ]
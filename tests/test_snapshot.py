@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import json
+import multiprocessing
+from typing import TYPE_CHECKING
+
+from pytest_tmux.snapshot import SNAPSHOTS_DIR, TmuxSnapshots
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    import pytest
+
+SRC = r"""
+    import pytest
+
+    pytestmark = [
+        pytest.mark.tmux_session_cfg(
+            window_command='env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+        ),
+        pytest.mark.tmux_assertion_cfg(timeout=1, delay=0.1),
+    ]
+
+    def test_first(tmux):
+        assert tmux.screen() == '$'
+        tmux.send_keys("echo {}")
+        assert tmux.screen() == tmux.snapshot("echo")
+
+    def test_second(tmux):
+        assert tmux.screen() == tmux.snapshot("prompt")
+        tmux.send_keys("echo hello")
+        assert tmux.screen() == tmux.snapshot("echo")
+"""
+
+
+def test_snapshot(pytester: pytest.Pytester) -> None:
+    pytester.makepyfile(test_snapshot=SRC.format("hello"))
+    snapshots = pytester.path / "__tmux_snapshots__"
+
+    result = pytester.runpytest("-vv")
+    result.assert_outcomes(failed=2)
+    result.stdout.fnmatch_lines(
+        ["*<no snapshot test_first::echo, run with --tmux-snapshot-update>*"]
+    )
+    assert not snapshots.exists()
+
+    result = pytester.runpytest("-vv", "--tmux-snapshot-update")
+    result.assert_outcomes(passed=2)
+    result.stdout.fnmatch_lines(
+        [
+            "*tmux snapshots*",
+            "updated test_first::echo (*test_snapshot.json)",
+            "updated test_second::prompt (*test_snapshot.json)",
+            "updated test_second::echo (*test_snapshot.json)",
+        ]
+    )
+    index = json.loads((snapshots / "test_snapshot.json").read_text())
+    assert sorted(index["snapshots"]) == [
+        "test_first::echo",
+        "test_second::echo",
+        "test_second::prompt",
+    ]
+    assert (
+        index["snapshots"]["test_first::echo"]
+        == index["snapshots"]["test_second::echo"]
+    )
+    assert len(list((snapshots / "objects").iterdir())) == 2
+
+    result = pytester.runpytest("-vv")
+    result.assert_outcomes(passed=2)
+    assert "tmux snapshots" not in result.stdout.str()
+
+    pytester.makepyfile(test_snapshot=SRC.format("world"))
+    result = pytester.runpytest("-vv")
+    result.assert_outcomes(passed=1, failed=1)
+    result.stdout.fnmatch_lines(["*- world", "*+ hello"])
+
+    result = pytester.runpytest("-vv", "--tmux-snapshot-update")
+    result.assert_outcomes(passed=2)
+    result.stdout.fnmatch_lines(["*tmux snapshots*", "updated test_first::echo (*)"])
+    assert "updated test_second" not in result.stdout.str()
+    updated = json.loads((snapshots / "test_snapshot.json").read_text())
+    assert (
+        updated["snapshots"]["test_second::prompt"]
+        == index["snapshots"]["test_second::prompt"]
+    )
+    assert (
+        updated["snapshots"]["test_first::echo"]
+        != index["snapshots"]["test_first::echo"]
+    )
+    assert len(list((snapshots / "objects").iterdir())) == 3
+
+    result = pytester.runpytest("-vv")
+    result.assert_outcomes(passed=2)
+
+
+def test_snapshot_classes(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import pytest
+
+        pytestmark = [
+            pytest.mark.tmux_session_cfg(
+                window_command='env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            ),
+            pytest.mark.tmux_assertion_cfg(timeout=1, delay=0.1),
+        ]
+
+        class TestA:
+            def test_x(self, tmux):
+                tmux.send_keys("echo a")
+                assert tmux.screen() == tmux.snapshot("echo")
+
+        class TestB:
+            def test_x(self, tmux):
+                tmux.send_keys("echo b")
+                assert tmux.screen() == tmux.snapshot("echo")
+    """
+    pytester.makepyfile(test_classes=src)
+
+    result = pytester.runpytest("-vv", "--tmux-snapshot-update")
+    result.assert_outcomes(passed=2)
+    index = json.loads(
+        (pytester.path / "__tmux_snapshots__" / "test_classes.json").read_text()
+    )
+    assert sorted(index["snapshots"]) == ["TestA::test_x::echo", "TestB::test_x::echo"]
+
+    result = pytester.runpytest("-vv")
+    result.assert_outcomes(passed=2)
+
+
+def test_snapshot_missing(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import pytest
+        import time
+
+        pytestmark = [
+            pytest.mark.tmux_session_cfg(
+                window_command='env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            ),
+            pytest.mark.tmux_assertion_cfg(timeout=10, delay=0.1),
+        ]
+
+        def test_missing(tmux):
+            tmux.send_keys("echo a")
+            start = time.monotonic()
+            assert tmux.screen() == tmux.snapshot("echo")
+            assert time.monotonic() - start < 5
+    """
+    pytester.makepyfile(test_missing=src)
+
+    result = pytester.runpytest("-vv")
+    result.assert_outcomes(failed=1)
+    assert result.duration < 5
+
+    result = pytester.runpytest("-vv", "--tmux-snapshot-update")
+    result.assert_outcomes(passed=1)
+
+    result = pytester.runpytest("-vv")
+    result.assert_outcomes(passed=1)
+
+
+def _save(path: str, worker: int) -> None:
+    for i in range(20):
+        store = TmuxSnapshots(update=True)
+        store.put(path, f"test_{worker}_{i}::screen", f"{worker} {i}")
+        store.save()
+
+
+def test_snapshot_concurrent_save(tmp_path: Path) -> None:
+    path = str(tmp_path / SNAPSHOTS_DIR / "test_module.json")
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_save, args=(path, n)) for n in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    with open(path) as f:
+        assert len(json.load(f)["snapshots"]) == 8 * 20
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pytest
+
+
+def test_stats(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import pytest
+
+        def test_polling(tmux):
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            assert tmux.screen() == '$'
+            tmux.send_keys("sleep 0.5; echo done")
+            assert tmux.row(1, delay=0.1, timeout=5) == "done"
+            assert not tmux.screen(timeout=0.2, delay=0.1) == "nothing"
+
+        def test_no_tmux():
+            pass
+    """
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv", "--tmux-stats=stats.json")
+
+    assert result.ret == 0
+    result.stdout.fnmatch_lines(
+        [
+            "*tmux stats*",
+            "test_stats.py::test_polling: *s, *s sleeping (*%)",
+            "    session        1 x *s total *s max",
+            "    send_keys      1 x *",
+            "    capture * x *",
+            "    poll * x *",
+            "    sleep * x *",
+            "    match          2 x *",
+            "    timeout        1 x *",
+        ]
+    )
+    stats = json.loads((pytester.path / "stats.json").read_text())
+    assert list(stats["tests"]) == ["test_stats.py::test_polling"]
+    test = stats["tests"]["test_stats.py::test_polling"]
+    assert test["duration"] > 0.5
+    assert test["operations"]["sleep"]["total"] >= 0.4
+    assert test["operations"]["poll"]["count"] >= 6
+
+
+def test_stats_disabled(pytester: pytest.Pytester) -> None:
+    src = r"""
+        def test_no_stats(tmux):
+            assert tmux._stats is None
+            assert tmux.screen() != "nothing"
+    """
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv")
+
+    assert result.ret == 0
+    assert "tmux stats" not in result.stdout.str()
+
+
+def test_durations(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import pytest
+
+        def test_slow(tmux):
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            assert tmux.screen() == '$'
+            tmux.send_keys("sleep 1.2; echo done")
+            assert tmux.row(1, delay=1, timeout=1.5) == "done"
+            assert tmux.screen().search("do.e")
+    """
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv", "--tmux-durations=2")
+
+    assert result.ret == 0
+    result.stdout.fnmatch_lines(
+        [
+            "*tmux durations*",
+            "*s passed ==          3 polls test_durations.py:7 (test_durations.py::test_slow)",
+            "*s passed ==          1 polls test_durations.py:5 (test_durations.py::test_slow)",
+            "... 1 more assertions",
+            "passed on their last retry:",
+            "*s passed ==          3 polls test_durations.py:7 (test_durations.py::test_slow)",
+        ]
+    )
+    assert "tmux stats" not in result.stdout.str()
+
+
+def test_durations_location(pytester: pytest.Pytester) -> None:
+    src = r"""
+        def test_functools(tmux):
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            assert tmux.screen() == '$'
+    """
+
+    pytester.makepyfile(test_functools=src)
+    result = pytester.runpytest("-vv", "--tmux-durations=1")
+
+    assert result.ret == 0
+    result.stdout.fnmatch_lines(
+        ["*s passed ==          1 polls test_functools.py:3 (*test_functools)"]
+    )
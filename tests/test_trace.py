@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING
+
+from pytest_tmux.trace import TmuxTrace
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    import pytest
+
+
+def test_trace(pytester: pytest.Pytester) -> None:
+    src = r"""
+        import pytest
+
+        def test_trace(tmux):
+            tmux.config.session.window_command = 'env -i PS1="$ " TERM="xterm-256color" /usr/bin/env bash --norc --noprofile'
+            assert tmux.screen() == '$'
+            tmux.send_keys("sleep 0.3; echo done")
+            assert tmux.row(1, delay=0.1) == "done"
+    """
+
+    pytester.makepyfile(src)
+    result = pytester.runpytest("-vv", "--tmux-trace=trace.json")
+
+    assert result.ret == 0
+    events = json.loads((pytester.path / "trace.json").read_text())["traceEvents"]
+    lanes = {
+        event["args"]["name"]: event["tid"]
+        for event in events
+        if event["name"] == "thread_name"
+    }
+    assert "test_trace.py::test_trace" in lanes
+    spans = [
+        event
+        for event in events
+        if event["ph"] == "X" and event["tid"] == lanes["test_trace.py::test_trace"]
+    ]
+    names = {(event["cat"], event["name"]) for event in spans}
+    assert {
+        ("fixture", "_tmux_server setup"),
+        ("fixture", "tmux setup"),
+        ("fixture", "tmux teardown"),
+        ("operation", "session"),
+        ("operation", "send_keys"),
+        ("operation", "capture"),
+        ("command", "new-session"),
+        ("command", "send-keys"),
+        ("command", "capture-pane"),
+        ("retry", "poll"),
+        ("retry", "sleep"),
+        ("retry", "== match"),
+    } <= names
+    match = [event for event in spans if event["name"] == "== match"][-1]
+    assert match["dur"] >= 0.2 * 1e6
+    assert match["args"]["polls"] > 1
+    for event in spans:
+        assert event["dur"] >= 0
+        assert event["pid"] == spans[0]["pid"]
+
+
+def test_trace_workers(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = str(tmp_path / "trace.json")
+    for worker in ("gw0", "gw1"):
+        monkeypatch.setenv("PYTEST_XDIST_WORKER", worker)
+        trace = TmuxTrace()
+        trace.test(f"test_{worker}")
+        with trace.span("capture", "operation"):
+            pass
+        trace.dump(path)
+    monkeypatch.delenv("PYTEST_XDIST_WORKER")
+    TmuxTrace().dump(path)
+
+    assert [p.name for p in tmp_path.iterdir()] == ["trace.json"]
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    processes = [
+        event["args"]["name"] for event in events if event["name"] == "process_name"
+    ]
+    assert processes == ["pytest", "gw0", "gw1"]
+    lanes = [
+        event["args"]["name"] for event in events if event["name"] == "thread_name"
+    ]
+    assert lanes == ["test_gw0", "test_gw1"]
+    assert len([event for event in events if event["ph"] == "X"]) == 2